@@ -30,15 +30,76 @@
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from datetime import datetime, timedelta
-import random
+import hashlib
+import json
+import math
 import os
+import sys
+import time
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Feed schemas shared with the bronze loader
+sys.path.append(os.path.abspath("../2_DataProcessing"))
+from feed_schemas import FEED_SCHEMAS
 
 # Configuration
 CATALOG = "pedroz_catalog"
 SCHEMA = "entertainment_co"
 VOLUME_PATH = f"/Volumes/{CATALOG}/{SCHEMA}/raw_files"
 
+# Generation settings (set from the notebook widgets or job parameters)
+dbutils.widgets.text("parallel_workers", "1", "Parallel workers (1 = sequential)")
+PARALLEL_WORKERS = int(dbutils.widgets.get("parallel_workers"))
+dbutils.widgets.text("master_seed", "42", "Master random seed")
+MASTER_SEED = int(dbutils.widgets.get("master_seed"))
+
+# Scale settings: the defaults reproduce the demo volume (170K rows per file, 6 months, 5 partners x 3 facilities)
+BASE_ROWS_PER_FILE = 170000
+dbutils.widgets.text("scale_factor", "1", "Rows per file multiplier")
+SCALE_FACTOR = float(dbutils.widgets.get("scale_factor"))
+ROWS_PER_FILE = int(BASE_ROWS_PER_FILE * SCALE_FACTOR)
+# Customer universe: facts draw customer_id from CUST_000001 to CUST_<NUM_CUSTOMERS>, and dim_customers has all of them
+BASE_CUSTOMERS = 499999
+NUM_CUSTOMERS = max(1, int(BASE_CUSTOMERS * SCALE_FACTOR))
+dbutils.widgets.text("num_months", "6", "Months of data (from July 2025)")
+NUM_MONTHS = int(dbutils.widgets.get("num_months"))
+dbutils.widgets.text("num_partners", "5", "Number of partners")
+NUM_PARTNERS = int(dbutils.widgets.get("num_partners"))
+dbutils.widgets.text("facilities_per_partner", "3", "Facilities per partner")
+FACILITIES_PER_PARTNER = int(dbutils.widgets.get("facilities_per_partner"))
+dbutils.widgets.text("chunk_rows", "250000", "Rows generated and written per batch")
+CHUNK_ROWS = int(dbutils.widgets.get("chunk_rows"))
+
+# Output format: CSV, one typed Parquet file per partner-month, or Parquet partitioned by partner and month
+dbutils.widgets.dropdown("output_format", "csv", ["csv", "parquet", "parquet_partitioned"], "Output format")
+OUTPUT_FORMAT = dbutils.widgets.get("output_format")
+
+# How customers, facilities, days, hours and IPs are distributed in the facts (see DISTRIBUTION_PROFILES)
+dbutils.widgets.dropdown("distribution_profile", "uniform", ["uniform", "realistic", "extreme_skew"], "Distribution profile")
+DISTRIBUTION_PROFILE = dbutils.widgets.get("distribution_profile")
+
+# snapshot writes every partner-month file; cdc writes change files for batch cdc_batch on top of a snapshot
+# generated earlier with the same settings (see "Change Data Feed" below); stream writes small real-time
+# event files at stream_events_per_second (see "Real-Time Event Simulator" below)
+dbutils.widgets.dropdown("generation_mode", "snapshot", ["snapshot", "cdc", "stream"], "Generation mode")
+GENERATION_MODE = dbutils.widgets.get("generation_mode")
+dbutils.widgets.text("cdc_batch", "1", "CDC batch number")
+CDC_BATCH = int(dbutils.widgets.get("cdc_batch"))
+dbutils.widgets.text("cdc_change_rate", "0.02", "CDC changes per partner-month file (share of its rows)")
+CDC_CHANGE_RATE = float(dbutils.widgets.get("cdc_change_rate"))
+dbutils.widgets.text("stream_events_per_second", "500", "Stream: target events per second")
+STREAM_EVENTS_PER_SECOND = float(dbutils.widgets.get("stream_events_per_second"))
+dbutils.widgets.text("stream_duration_seconds", "300", "Stream: run time (seconds)")
+STREAM_DURATION_SECONDS = float(dbutils.widgets.get("stream_duration_seconds"))
+dbutils.widgets.text("stream_file_seconds", "2", "Stream: seconds between files")
+STREAM_FILE_SECONDS = float(dbutils.widgets.get("stream_file_seconds"))
+
 # Partners (Licensees)
 PARTNERS = ["DreamWorld_Parks", "FunZone_Entertainment", "ToyLand_Adventures", "PlayNation_Centers", "KidVenture_Group"]
 
@@ -63,26 +124,224 @@ END_DATE = datetime(2025, 12, 31)
 
 # COMMAND ----------
 
-def generate_ticket_sales(partner, month, num_rows=170000):
+def facility_market(fac):
+    """Market of one of the base facilities, from its city"""
+    return "North_America" if "Orlando" in fac or "California" in fac or "NewYork" in fac or "Chicago" in fac or "Miami" in fac or "Toronto" in fac or "Vancouver" in fac or "Montreal" in fac else \
+           "Europe" if "London" in fac or "Paris" in fac or "Berlin" in fac else \
+           "Asia_Pacific"
+
+def scale_partners(num_partners, facilities_per_partner):
+    """Partners, facilities, ID codes and facility markets for the requested scale"""
+    # The base partners come first; extra partners and facilities get synthetic names
+    # (Partner_006, P006_Site01, DW_Site04, ...) and inherit their partner's market
+    partners, facilities, codes, markets = [], {}, {}, {}
+    for i in range(num_partners):
+        if i < len(BASE_PARTNERS):
+            partner = BASE_PARTNERS[i]
+            code = partner[:3]
+            base = BASE_FACILITIES[partner]
+            prefix = base[0].split("_")[0]
+            market = facility_market(base[0])
+        else:
+            partner = f"Partner_{i + 1:03d}"
+            code = prefix = f"P{i + 1:03d}"
+            base = []
+            market = MARKETS[i % len(MARKETS)]
+        facs = base[:facilities_per_partner] + [f"{prefix}_Site{j + 1:02d}" for j in range(len(base), facilities_per_partner)]
+        partners.append(partner)
+        facilities[partner] = facs
+        codes[partner] = code
+        markets.update({fac: facility_market(fac) if fac in base else market for fac in facs})
+    return partners, facilities, codes, markets
+
+BASE_PARTNERS, BASE_FACILITIES = PARTNERS, FACILITIES
+PARTNERS, FACILITIES, PARTNER_CODES, FACILITY_MARKETS = scale_partners(NUM_PARTNERS, FACILITIES_PER_PARTNER)
+
+# (year, month) of every generated month, and the matching calendar range
+MONTH_PERIODS = pd.period_range(START_DATE, periods=NUM_MONTHS, freq="M")
+MONTHS = [(period.year, period.month) for period in MONTH_PERIODS]
+END_DATE = MONTH_PERIODS[-1].end_time.floor("D").to_pydatetime()
+
+# COMMAND ----------
+
+def unit_rng(*key):
+    """Independent random stream for a work unit, keyed by MASTER_SEED and a stable digest of the key"""
+    digest = hashlib.sha256("/".join(str(part) for part in key).encode()).digest()
+    spawn_key = tuple(int.from_bytes(digest[i:i + 4], "little") for i in range(0, 16, 4))
+    return np.random.default_rng(np.random.SeedSequence(MASTER_SEED, spawn_key=spawn_key))
+
+def format_ids(prefix, values, width):
+    """Vectorized f"{prefix}{value:0{width}d}" over an integer array, as Arrow-backed strings"""
+    digits = pc.utf8_lpad(pc.cast(pa.array(values), pa.string()), width, "0")
+    return pd.arrays.ArrowStringArray(pc.binary_join_element_wise(prefix, digits, ""))
+
+def categorical(categories, codes):
+    """Column of `categories` indexed by integer codes: one small code per row instead of a string per row"""
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def choice_codes(rng, values, num_rows, p=None):
+    """Codes of rng.choice(values, num_rows, p=p), drawing the same values without materializing them"""
+    return rng.choice(len(values), num_rows, p=p)
+
+# Lookup tables for the low-cardinality ID columns: generators draw integer
+# codes with NumPy and build Categoricals over these instead of formatting per row
+OUTLET_IDS = format_ids("OUTLET_", np.arange(50), 3)
+STORE_IDS = format_ids("STORE_", np.arange(30), 3)
+
+# Customer ids are Categoricals over a lookup too, up to CUSTOMER_LOOKUP_LIMIT customers; larger universes are
+# formatted per chunk, as a lookup of tens of millions of strings would dominate every worker's memory.
+# The lookup holds Python strings: writers decode a few thousand rows at a time, and decoding from Arrow-backed
+# categories would convert the whole lookup every time
+CUSTOMER_LOOKUP_LIMIT = 1000000
+CUSTOMER_IDS = pd.CategoricalDtype(pd.Index(format_ids("CUST_", np.arange(min(NUM_CUSTOMERS, CUSTOMER_LOOKUP_LIMIT) + 1), 6), dtype=object))
+
+def customer_ids(numbers):
+    """customer_id of customer numbers 1 to NUM_CUSTOMERS"""
+    if NUM_CUSTOMERS <= CUSTOMER_LOOKUP_LIMIT:
+        return pd.Categorical.from_codes(numbers, dtype=CUSTOMER_IDS)
+    return format_ids("CUST_", numbers, 6)
+
+# Every fact row carries a change_type and the change_batch that sent it (see "Change Data Feed" below)
+CHANGE_TYPES = pd.CategoricalDtype(["insert", "update", "delete"])
+
+def with_change_type(df, change_type, batch=0):
+    """df with every row's change_type set to change_type and change_batch to batch (0 = snapshot)"""
+    code = CHANGE_TYPES.categories.get_loc(change_type)
+    return df.assign(
+        change_type=pd.Categorical.from_codes(np.full(len(df), code, dtype=np.int8), dtype=CHANGE_TYPES),
+        change_batch=np.full(len(df), batch, dtype=np.int32),
+    )
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## Distribution Profiles
+# MAGIC 
+# MAGIC The `distribution_profile` widget shapes the fact columns, so the pipeline can be run against the hot keys and
+# MAGIC peaks of production data (shuffle skew and straggler tasks in the silver joins and gold `GROUP BY`s):
+# MAGIC - customers, a partner's facilities and IPs follow Zipf laws (weight of the k-th key ∝ 1 / k^s): `CUST_000001`,
+# MAGIC   a partner's first facility and `RoboBuddies` are the hottest
+# MAGIC - days are weighted by the `dim_dates` calendar: `is_weekend` and `is_holiday` days get their multipliers, and
+# MAGIC   the skewed profiles spread the month over all its days instead of the first 28
+# MAGIC - visit and F&B hours follow the guest-traffic curve, with peaks at 11am-2pm and 4pm-7pm
+# MAGIC 
+# MAGIC `uniform` draws every column uniformly and reproduces the files of earlier runs. All draws stay vectorized:
+# MAGIC weighted choices over small lists, and a precomputed cumulative distribution searched per chunk for customers.
+# MAGIC That table covers the first `CUSTOMER_LOOKUP_LIMIT` customers; beyond them, customers are drawn from the
+# MAGIC continuous approximation of the Zipf law, so memory stays bounded however large `scale_factor` gets.
+
+# COMMAND ----------
+
+# Profile -> Zipf exponents (0 = uniform), day multipliers, hour curve and days drawn per month
+DISTRIBUTION_PROFILES = {
+    "uniform": {
+        "customer_zipf": 0.0, "facility_zipf": 0.0, "ip_zipf": 0.0,
+        "weekend_weight": 1.0, "holiday_weight": 1.0, "hour_curve": False, "full_month": False,
+    },
+    "realistic": {
+        "customer_zipf": 0.8, "facility_zipf": 1.0, "ip_zipf": 0.7,
+        "weekend_weight": 2.0, "holiday_weight": 3.0, "hour_curve": True, "full_month": True,
+    },
+    "extreme_skew": {
+        "customer_zipf": 1.2, "facility_zipf": 2.0, "ip_zipf": 1.5,
+        "weekend_weight": 3.0, "holiday_weight": 6.0, "hour_curve": True, "full_month": True,
+    },
+}
+PROFILE = DISTRIBUTION_PROFILES[DISTRIBUTION_PROFILE]
+
+# Relative guest traffic per hour of the day: lunch (11am-2pm) and late-afternoon (4pm-7pm) peaks
+HOUR_CURVE = {9: 0.4, 10: 0.7, 11: 1.6, 12: 2.0, 13: 1.7, 14: 1.0, 15: 1.0, 16: 1.5, 17: 1.8, 18: 1.6, 19: 0.9, 20: 0.6, 21: 0.4}
+
+def zipf_weights(count, exponent):
+    """Probabilities of ranks 1 to count under a Zipf law, or None (uniform) for exponent 0"""
+    if not exponent:
+        return None
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+def hour_weights(hours):
+    """Probabilities of the hours under HOUR_CURVE, or None (uniform) without the hour curve"""
+    if not PROFILE["hour_curve"]:
+        return None
+    weights = np.array([HOUR_CURVE[hour] for hour in hours])
+    return weights / weights.sum()
+
+def calendar_flags(days):
+    """is_weekend and is_holiday of a DatetimeIndex, as in dim_dates"""
+    return days.weekday >= 5, (days.month == 12) & days.day.isin([24, 25, 31])
+
+def month_days(year, month):
+    """Days facts of a month are drawn from, and their probabilities (None = uniform) from the calendar"""
+    periods = pd.Period(year=year, month=month, freq="M").days_in_month if PROFILE["full_month"] else 28
+    days = pd.date_range(start=f"{year}-{month:02d}-01", periods=periods, freq="D")
+    if PROFILE["weekend_weight"] == PROFILE["holiday_weight"] == 1:
+        return days, None
+    is_weekend, is_holiday = calendar_flags(days)
+    weights = np.where(is_weekend, PROFILE["weekend_weight"], 1.0) * np.where(is_holiday, PROFILE["holiday_weight"], 1.0)
+    return days, weights / weights.sum()
+
+def zipf_integral(start, end, exponent):
+    """Integral of x^-exponent from start to end, the continuous approximation of the Zipf weights in between"""
+    if exponent == 1:
+        return np.log(end / start)
+    return (end ** (1 - exponent) - start ** (1 - exponent)) / (1 - exponent)
+
+def zipf_integral_end(start, mass, exponent):
+    """End where the integral of x^-exponent from start reaches mass (inverse of zipf_integral)"""
+    if exponent == 1:
+        return start * np.exp(mass)
+    return (start ** (1 - exponent) + (1 - exponent) * mass) ** (1 / (1 - exponent))
+
+# Customer draws: uniform draws searched in the cumulative Zipf distribution of the first CUSTOMER_HEAD customer
+# numbers. Like the id lookup, the table stops at CUSTOMER_LOOKUP_LIMIT: the rarer customers beyond it get the
+# remaining probability, the integral of x^-s between rank midpoints, and are drawn by inverting that integral
+CUSTOMER_HEAD = min(NUM_CUSTOMERS, CUSTOMER_LOOKUP_LIMIT)
+CUSTOMER_CDF, CUSTOMER_ZIPF_TOTAL = None, None
+if PROFILE["customer_zipf"] and NUM_CUSTOMERS == CUSTOMER_HEAD:
+    CUSTOMER_CDF = np.cumsum(zipf_weights(NUM_CUSTOMERS, PROFILE["customer_zipf"]))
+elif PROFILE["customer_zipf"]:
+    head_weights = 1.0 / np.arange(1, CUSTOMER_HEAD + 1) ** PROFILE["customer_zipf"]
+    CUSTOMER_ZIPF_TOTAL = head_weights.sum() + zipf_integral(CUSTOMER_HEAD + 0.5, NUM_CUSTOMERS + 0.5, PROFILE["customer_zipf"])
+    CUSTOMER_CDF = np.cumsum(head_weights) / CUSTOMER_ZIPF_TOTAL
+IP_WEIGHTS = zipf_weights(len(IPS), PROFILE["ip_zipf"])
+
+def draw_customers(rng, num_rows):
+    """customer_id of num_rows transactions"""
+    if CUSTOMER_CDF is None:
+        return customer_ids(rng.integers(1, NUM_CUSTOMERS + 1, num_rows))
+    draws = rng.random(num_rows)
+    numbers = np.minimum(np.searchsorted(CUSTOMER_CDF, draws, side="right"), CUSTOMER_HEAD - 1) + 1
+    if CUSTOMER_ZIPF_TOTAL is not None:
+        tail = draws >= CUSTOMER_CDF[-1]
+        ends = zipf_integral_end(CUSTOMER_HEAD + 0.5, (draws[tail] - CUSTOMER_CDF[-1]) * CUSTOMER_ZIPF_TOTAL, PROFILE["customer_zipf"])
+        numbers[tail] = np.clip(np.floor(ends + 0.5), CUSTOMER_HEAD + 1, NUM_CUSTOMERS)
+    return customer_ids(numbers)
+
+# COMMAND ----------
+
+TICKET_TYPES = ["Adult", "Child", "Senior", "Family_Pack", "VIP", "Annual_Pass"]
+TICKET_CHANNELS = ["Online", "Box_Office", "Mobile_App", "Partner_Site"]
+
+def generate_ticket_sales(partner, month, num_rows=170000, rng=None, year=2025, start_index=0):
     """Generate ticket sales data for a partner and month"""
-    np.random.seed(hash(f"{partner}_{month}") % 2**32)
+    rng = rng or unit_rng("ticket_sales", partner, year, month)
     
     facilities = FACILITIES[partner]
-    dates = pd.date_range(start=f"2025-{month:02d}-01", periods=28, freq='D')
+    dates, date_weights = month_days(year, month)
     
     data = {
-        "transaction_id": [f"TKT_{partner[:3]}_{month}_{i:06d}" for i in range(num_rows)],
-        "transaction_date": np.random.choice(dates, num_rows),
-        "facility_id": np.random.choice(facilities, num_rows),
-        "ip_name": np.random.choice(IPS, num_rows),
-        "ticket_type": np.random.choice(["Adult", "Child", "Senior", "Family_Pack", "VIP", "Annual_Pass"], num_rows, p=[0.3, 0.35, 0.1, 0.15, 0.05, 0.05]),
-        "quantity": np.random.randint(1, 6, num_rows),
-        "unit_price": np.round(np.random.uniform(25, 150, num_rows), 2),
-        "discount_pct": np.random.choice([0, 5, 10, 15, 20, 25], num_rows, p=[0.4, 0.2, 0.15, 0.1, 0.1, 0.05]),
-        "customer_id": [f"CUST_{np.random.randint(1, 500000):06d}" for _ in range(num_rows)],
-        "is_repeat_visitor": np.random.choice([True, False], num_rows, p=[0.35, 0.65]),
-        "visit_hour": np.random.choice(range(9, 21), num_rows),
-        "channel": np.random.choice(["Online", "Box_Office", "Mobile_App", "Partner_Site"], num_rows, p=[0.45, 0.25, 0.2, 0.1]),
+        "transaction_id": format_ids(f"TKT_{PARTNER_CODES[partner]}_{year % 100:02d}{month:02d}_", np.arange(start_index, start_index + num_rows), 6),
+        "transaction_date": categorical(dates, choice_codes(rng, dates, num_rows, p=date_weights)),
+        "facility_id": categorical(facilities, choice_codes(rng, facilities, num_rows, p=zipf_weights(len(facilities), PROFILE["facility_zipf"]))),
+        "ip_name": categorical(IPS, choice_codes(rng, IPS, num_rows, p=IP_WEIGHTS)),
+        "ticket_type": categorical(TICKET_TYPES, choice_codes(rng, TICKET_TYPES, num_rows, p=[0.3, 0.35, 0.1, 0.15, 0.05, 0.05])),
+        "quantity": rng.integers(1, 6, num_rows).astype(np.int8),
+        "unit_price": np.round(rng.uniform(25, 150, num_rows), 2),
+        "discount_pct": rng.choice(np.array([0, 5, 10, 15, 20, 25], dtype=np.int8), num_rows, p=[0.4, 0.2, 0.15, 0.1, 0.1, 0.05]),
+        "customer_id": draw_customers(rng, num_rows),
+        "is_repeat_visitor": rng.choice([True, False], num_rows, p=[0.35, 0.65]),
+        "visit_hour": rng.choice(np.arange(9, 21, dtype=np.int8), num_rows, p=hour_weights(range(9, 21))),
+        "channel": categorical(TICKET_CHANNELS, choice_codes(rng, TICKET_CHANNELS, num_rows, p=[0.45, 0.25, 0.2, 0.1])),
     }
     
     df = pd.DataFrame(data)
@@ -91,12 +350,15 @@ def generate_ticket_sales(partner, month, num_rows=170000):
 
 # COMMAND ----------
 
-def generate_fnb_sales(partner, month, num_rows=170000):
+FNB_CATEGORIES = ["Main", "Snack", "Beverage", "Dessert"]
+PAYMENT_METHODS = ["Credit_Card", "Debit_Card", "Cash", "Mobile_Pay"]
+
+def generate_fnb_sales(partner, month, num_rows=170000, rng=None, year=2025, start_index=0):
     """Generate Food & Beverage sales data"""
-    np.random.seed(hash(f"fnb_{partner}_{month}") % 2**32)
+    rng = rng or unit_rng("fnb_sales", partner, year, month)
     
     facilities = FACILITIES[partner]
-    dates = pd.date_range(start=f"2025-{month:02d}-01", periods=28, freq='D')
+    dates, date_weights = month_days(year, month)
     
     fnb_items = [
         ("Burger_Combo", 12.99), ("Pizza_Slice", 6.99), ("Hot_Dog", 5.99),
@@ -106,20 +368,21 @@ def generate_fnb_sales(partner, month, num_rows=170000):
         ("Frozen_Lemonade", 5.99), ("Turkey_Leg", 14.99), ("Fruit_Cup", 6.99)
     ]
     
-    items = [random.choice(fnb_items) for _ in range(num_rows)]
+    item_names, item_prices = map(np.array, zip(*fnb_items))
+    items = rng.integers(0, len(fnb_items), num_rows)
     
     data = {
-        "transaction_id": [f"FNB_{partner[:3]}_{month}_{i:06d}" for i in range(num_rows)],
-        "transaction_date": np.random.choice(dates, num_rows),
-        "facility_id": np.random.choice(facilities, num_rows),
-        "item_name": [item[0] for item in items],
-        "item_category": np.random.choice(["Main", "Snack", "Beverage", "Dessert"], num_rows, p=[0.3, 0.25, 0.25, 0.2]),
-        "unit_price": [item[1] for item in items],
-        "quantity": np.random.randint(1, 5, num_rows),
-        "customer_id": [f"CUST_{np.random.randint(1, 500000):06d}" for _ in range(num_rows)],
-        "outlet_id": [f"OUTLET_{np.random.randint(1, 50):03d}" for _ in range(num_rows)],
-        "payment_method": np.random.choice(["Credit_Card", "Debit_Card", "Cash", "Mobile_Pay"], num_rows, p=[0.4, 0.25, 0.15, 0.2]),
-        "transaction_hour": np.random.choice(range(10, 22), num_rows),
+        "transaction_id": format_ids(f"FNB_{PARTNER_CODES[partner]}_{year % 100:02d}{month:02d}_", np.arange(start_index, start_index + num_rows), 6),
+        "transaction_date": categorical(dates, choice_codes(rng, dates, num_rows, p=date_weights)),
+        "facility_id": categorical(facilities, choice_codes(rng, facilities, num_rows, p=zipf_weights(len(facilities), PROFILE["facility_zipf"]))),
+        "item_name": categorical(item_names, items),
+        "item_category": categorical(FNB_CATEGORIES, choice_codes(rng, FNB_CATEGORIES, num_rows, p=[0.3, 0.25, 0.25, 0.2])),
+        "unit_price": item_prices[items],
+        "quantity": rng.integers(1, 5, num_rows).astype(np.int8),
+        "customer_id": draw_customers(rng, num_rows),
+        "outlet_id": categorical(OUTLET_IDS, rng.integers(1, 50, num_rows)),
+        "payment_method": categorical(PAYMENT_METHODS, choice_codes(rng, PAYMENT_METHODS, num_rows, p=[0.4, 0.25, 0.15, 0.2])),
+        "transaction_hour": rng.choice(np.arange(10, 22, dtype=np.int8), num_rows, p=hour_weights(range(10, 22))),
     }
     
     df = pd.DataFrame(data)
@@ -128,12 +391,14 @@ def generate_fnb_sales(partner, month, num_rows=170000):
 
 # COMMAND ----------
 
-def generate_retail_sales(partner, month, num_rows=170000):
+PRODUCT_CATEGORIES = ["Toys", "Apparel", "Accessories", "Collectibles", "Home"]
+
+def generate_retail_sales(partner, month, num_rows=170000, rng=None, year=2025, start_index=0):
     """Generate Retail merchandise sales data"""
-    np.random.seed(hash(f"retail_{partner}_{month}") % 2**32)
+    rng = rng or unit_rng("retail_sales", partner, year, month)
     
     facilities = FACILITIES[partner]
-    dates = pd.date_range(start=f"2025-{month:02d}-01", periods=28, freq='D')
+    dates, date_weights = month_days(year, month)
     
     retail_items = [
         ("Plush_Toy_Small", 14.99), ("Plush_Toy_Large", 29.99), ("Action_Figure", 19.99),
@@ -143,20 +408,21 @@ def generate_retail_sales(partner, month, num_rows=170000):
         ("Water_Bottle", 16.99), ("Lunchbox", 22.99), ("Blanket", 44.99)
     ]
     
-    items = [random.choice(retail_items) for _ in range(num_rows)]
+    item_names, item_prices = map(np.array, zip(*retail_items))
+    items = rng.integers(0, len(retail_items), num_rows)
     
     data = {
-        "transaction_id": [f"RTL_{partner[:3]}_{month}_{i:06d}" for i in range(num_rows)],
-        "transaction_date": np.random.choice(dates, num_rows),
-        "facility_id": np.random.choice(facilities, num_rows),
-        "ip_name": np.random.choice(IPS, num_rows),
-        "product_name": [item[0] for item in items],
-        "product_category": np.random.choice(["Toys", "Apparel", "Accessories", "Collectibles", "Home"], num_rows),
-        "unit_price": [item[1] for item in items],
-        "quantity": np.random.randint(1, 4, num_rows),
-        "customer_id": [f"CUST_{np.random.randint(1, 500000):06d}" for _ in range(num_rows)],
-        "store_id": [f"STORE_{np.random.randint(1, 30):03d}" for _ in range(num_rows)],
-        "is_online": np.random.choice([True, False], num_rows, p=[0.2, 0.8]),
+        "transaction_id": format_ids(f"RTL_{PARTNER_CODES[partner]}_{year % 100:02d}{month:02d}_", np.arange(start_index, start_index + num_rows), 6),
+        "transaction_date": categorical(dates, choice_codes(rng, dates, num_rows, p=date_weights)),
+        "facility_id": categorical(facilities, choice_codes(rng, facilities, num_rows, p=zipf_weights(len(facilities), PROFILE["facility_zipf"]))),
+        "ip_name": categorical(IPS, choice_codes(rng, IPS, num_rows, p=IP_WEIGHTS)),
+        "product_name": categorical(item_names, items),
+        "product_category": categorical(PRODUCT_CATEGORIES, choice_codes(rng, PRODUCT_CATEGORIES, num_rows)),
+        "unit_price": item_prices[items],
+        "quantity": rng.integers(1, 4, num_rows).astype(np.int8),
+        "customer_id": draw_customers(rng, num_rows),
+        "store_id": categorical(STORE_IDS, rng.integers(1, 30, num_rows)),
+        "is_online": rng.choice([True, False], num_rows, p=[0.2, 0.8]),
     }
     
     df = pd.DataFrame(data)
@@ -167,34 +433,328 @@ def generate_retail_sales(partner, month, num_rows=170000):
 
 # MAGIC %md
 # MAGIC ## Generate and Save Partner Data (6 months each)
+# MAGIC 
+# MAGIC Each (partner, month, fact type) file is an independent work unit. With `parallel_workers > 1`
+# MAGIC the units are fanned out across a process pool on the driver; otherwise they run sequentially.
+# MAGIC 
+# MAGIC Every unit draws from its own `unit_rng(fact_type, partner, year, month)` stream, so output depends only on
+# MAGIC `master_seed` (and `chunk_rows`): a single shard can be regenerated byte-for-byte with
+# MAGIC `generate_work_unit(partner, year, month, fact_type)`, on any process or machine.
+# MAGIC 
+# MAGIC Files are produced in batches of `chunk_rows` rows that are appended to the output file, so peak memory
+# MAGIC per worker stays flat whatever the `scale_factor`. Within a batch the low-cardinality columns (and
+# MAGIC `transaction_date` and `customer_id`) are pandas Categoricals, integer codes into small lookups, and
+# MAGIC `transaction_id` is Arrow-backed: a 170K-row batch holds about 10 MB instead of ~90 MB of Python-object
+# MAGIC strings. The CSV writer decodes them a few thousand rows at a time; Parquet writes them as dictionaries.
+# MAGIC 
+# MAGIC | `output_format` | Layout |
+# MAGIC |---|---|
+# MAGIC | `csv` | `partners/<partner>/<fact>_<MM>_<YYYY>.csv` |
+# MAGIC | `parquet` | `partners/<partner>/<fact>_<MM>_<YYYY>.parquet` |
+# MAGIC | `parquet_partitioned` | `partitioned/<fact>/partner=<partner>/month=<YYYY-MM>/part-00000.parquet` |
+# MAGIC 
+# MAGIC Parquet files are typed with the bronze feed schemas (`feed_schemas.py`), written one row group per chunk,
+# MAGIC and dictionary-encode the low-cardinality columns. Use the same value for `source_format` in `1_load_sheets_to_bronze_tables.py`.
+# MAGIC 
+# MAGIC ### Change Data Feed
+# MAGIC 
+# MAGIC Every row carries a `change_type` and a `change_batch`: snapshot files are all `insert`s of batch 0. With
+# MAGIC `generation_mode = cdc` the units write change files next to the snapshot instead
+# MAGIC (`<fact>_cdc<batch>_<MM>_<YYYY>`, or `cdc-<batch>.parquet` in the partitioned layout), like a partner
+# MAGIC resending corrections for months already delivered. Each file
+# MAGIC holds about `cdc_change_rate` × the snapshot's rows, mixed by `CDC_CHANGE_MIX`:
+# MAGIC - `insert` — late-arriving transactions for the month, with new `transaction_id`s
+# MAGIC - `update` — corrected quantities (and totals) of transactions already sent
+# MAGIC - `delete` — voided transactions, as sent; voids come from a reserved 1-in-`VOID_STRIDE` slice of each file
+# MAGIC   that updates and duplicates never touch, so a voided transaction stays voided
+# MAGIC - duplicates — transactions already sent, resent unchanged as `insert`s
+# MAGIC 
+# MAGIC The sent rows are regenerated from their `unit_rng` streams, so a CDC run needs the snapshot's `master_seed`,
+# MAGIC `scale_factor`, `chunk_rows` and `distribution_profile`. Increase `cdc_batch` for every new batch; the bronze
+# MAGIC notebook's `incremental` mode picks the new files up and silver applies them on `transaction_id`. Every row
+# MAGIC of a batch's files has `change_batch = cdc_batch`, so silver keeps the latest batch's version of a transaction
+# MAGIC even when bronze ingests the snapshot and its change files at the same time.
+
+# COMMAND ----------
+
+FACT_GENERATORS = {
+    "ticket_sales": generate_ticket_sales,
+    "fnb_sales": generate_fnb_sales,
+    "retail_sales": generate_retail_sales,
+}
+
+# Low-cardinality string columns, generated as Categoricals and written to Parquet as dictionaries
+DICTIONARY_COLUMNS = [
+    "facility_id", "ip_name", "ticket_type", "channel", "item_name", "item_category", "outlet_id",
+    "payment_method", "product_name", "product_category", "store_id", "change_type",
+]
+
+class CsvChunkWriter:
+    """Appends DataFrame chunks to a single CSV file, writing the header once"""
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+# Arrow types of the Spark types used in feed_schemas.py
+ARROW_TYPES = {
+    "STRING": pa.string(),
+    "DATE": pa.date32(),
+    "INT": pa.int32(),
+    "BOOLEAN": pa.bool_(),
+    "DECIMAL(10,2)": pa.decimal128(10, 2),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+}
+
+class ParquetChunkWriter:
+    """Writes DataFrame chunks as row groups of a single Parquet file typed with the feed schema"""
+    def __init__(self, path, fact_type):
+        self.path = path
+        # Categorical columns stay dictionary arrays down to the file, so their values are never decoded per row
+        self.schema = pa.schema([
+            (name, pa.dictionary(pa.int32(), ARROW_TYPES[data_type]) if name in DICTIONARY_COLUMNS else ARROW_TYPES[data_type])
+            for name, data_type in FEED_SCHEMAS[fact_type]
+        ])
+        self.writer = None
+
+    def write(self, df):
+        table = pa.Table.from_pandas(df, preserve_index=False).select(self.schema.names).cast(self.schema)
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            dictionary = [column for column in DICTIONARY_COLUMNS if column in table.column_names]
+            self.writer = pq.ParquetWriter(self.path, table.schema, use_dictionary=dictionary, compression="snappy")
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def output_path(partner, year, month, fact_type):
+    """Destination file of a work unit for the selected output format and generation mode"""
+    cdc = GENERATION_MODE == "cdc"
+    if OUTPUT_FORMAT == "parquet_partitioned":
+        name = f"cdc-{CDC_BATCH:04d}" if cdc else "part-00000"
+        return f"{VOLUME_PATH}/partitioned/{fact_type}/partner={partner}/month={year}-{month:02d}/{name}.parquet"
+    extension = "csv" if OUTPUT_FORMAT == "csv" else "parquet"
+    name = f"{fact_type}_cdc{CDC_BATCH:04d}" if cdc else fact_type
+    return f"{VOLUME_PATH}/partners/{partner}/{name}_{month:02d}_{year}.{extension}"
+
+def iter_fact_chunks(partner, year, month, fact_type, num_rows, chunk_rows):
+    """Yield one partner-month fact file as DataFrames of at most chunk_rows rows"""
+    rng = unit_rng(fact_type, partner, year, month)
+    for start_index in range(0, num_rows, chunk_rows):
+        yield with_change_type(FACT_GENERATORS[fact_type](
+            partner, month, min(chunk_rows, num_rows - start_index), rng=rng, year=year, start_index=start_index
+        ), "insert")
+
+# Share of each kind of change in a CDC file
+CDC_CHANGE_MIX = {"late_insert": 0.4, "update": 0.3, "duplicate": 0.2, "delete": 0.1}
+VOID_STRIDE = 100  # every VOID_STRIDE-th row of a snapshot file can only be voided
+
+def iter_cdc_chunks(partner, year, month, fact_type, num_rows, chunk_rows, batch=1, change_rate=0.02):
+    """Yield the changes of one CDC batch to a partner-month fact file, in chunks"""
+    rng = unit_rng("cdc", batch, fact_type, partner, year, month)
+    update_p, duplicate_p = change_rate * CDC_CHANGE_MIX["update"], change_rate * CDC_CHANGE_MIX["duplicate"]
+    void_p = min(1.0, change_rate * CDC_CHANGE_MIX["delete"] * VOID_STRIDE)
+    first_row = 0
+    for sent in iter_fact_chunks(partner, year, month, fact_type, num_rows, chunk_rows):
+        reserved = (first_row + np.arange(len(sent))) % VOID_STRIDE == 0
+        draw = rng.random(len(sent))
+        voided = reserved & (draw < void_p)
+        updated = ~reserved & (draw < update_p)
+        duplicated = ~reserved & (draw >= update_p) & (draw < update_p + duplicate_p)
+        corrected = sent[updated].copy()
+        new_quantity = corrected["quantity"] + rng.integers(1, 3, len(corrected))
+        corrected["total_amount"] = np.round(corrected["total_amount"] / corrected["quantity"] * new_quantity, 2)
+        corrected["quantity"] = new_quantity
+        yield pd.concat([
+            with_change_type(corrected, "update", batch),
+            with_change_type(sent[voided], "delete", batch),
+            with_change_type(sent[duplicated], "insert", batch),
+        ], ignore_index=True)
+        first_row += len(sent)
+    # Late arrivals get transaction numbers after the snapshot's, in a range of their own per batch
+    late_rows = round(num_rows * change_rate * CDC_CHANGE_MIX["late_insert"])
+    for offset in range(0, late_rows, chunk_rows):
+        yield with_change_type(FACT_GENERATORS[fact_type](
+            partner, month, min(chunk_rows, late_rows - offset), rng=rng, year=year, start_index=batch * num_rows + offset
+        ), "insert", batch)
+
+def generate_work_unit(partner, year, month, fact_type):
+    """Generate and write one partner/month/fact file chunk by chunk, returning its timings"""
+    path = output_path(partner, year, month, fact_type)
+    writer = CsvChunkWriter(path) if OUTPUT_FORMAT == "csv" else ParquetChunkWriter(path, fact_type)
+    timing = {"partner": partner, "year": year, "month": month, "fact_type": fact_type, "rows": 0, "generate_s": 0.0, "write_s": 0.0}
+    if GENERATION_MODE == "cdc":
+        chunks = iter_cdc_chunks(partner, year, month, fact_type, ROWS_PER_FILE, CHUNK_ROWS, CDC_BATCH, CDC_CHANGE_RATE)
+    else:
+        chunks = iter_fact_chunks(partner, year, month, fact_type, ROWS_PER_FILE, CHUNK_ROWS)
+    start = time.perf_counter()
+    while True:
+        chunk_start = time.perf_counter()
+        df = next(chunks, None)
+        if df is None:
+            break
+        generated = time.perf_counter()
+        writer.write(df)
+        timing["rows"] += len(df)
+        timing["generate_s"] += generated - chunk_start
+        timing["write_s"] += time.perf_counter() - generated
+    writer.close()
+    timing["total_s"] = time.perf_counter() - start
+    timing["bytes"] = os.path.getsize(path)
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in timing.items()}
+
+def run_work_units(work_units, workers=1):
+    """Run work units sequentially or on a process pool, yielding timings as units finish"""
+    if workers <= 1:
+        for unit in work_units:
+            yield generate_work_unit(*unit)
+        return
+    # fork keeps notebook-defined functions and globals visible to the workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        futures = [pool.submit(generate_work_unit, *unit) for unit in work_units]
+        for future in as_completed(futures):
+            yield future.result()
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## Real-Time Event Simulator
+# MAGIC 
+# MAGIC With `generation_mode = stream` the notebook emulates partners' point-of-sale systems instead of a monthly
+# MAGIC delivery: every `stream_file_seconds` it writes one small file per fact type to
+# MAGIC `stream/<fact>/<run>-<tick>.<csv|parquet>` holding the events of the seconds since the previous file, at
+# MAGIC `stream_events_per_second` in total (split evenly across ticket, F&B and retail sales) for
+# MAGIC `stream_duration_seconds`, then exits without writing the monthly files or dimensions.
+# MAGIC 
+# MAGIC Rows come from the same fact generators and `distribution_profile`, with the `<fact>_stream` feed schemas: the
+# MAGIC fact columns plus `event_timestamp` (UTC), which also sets `transaction_date` and the hour column.
+# MAGIC `transaction_id`s carry the run (`TKT_Dre_S<run>_<n>`), so they never collide with the monthly files. A tick
+# MAGIC that starts late writes every event owed since the start, so the sustained rate holds while the writes keep
+# MAGIC up; the exit value reports the rate achieved and the lag of the ticks. Files are written under a hidden name
+# MAGIC and renamed, so `stream_hourly_patterns.py` never reads a partial file.
 
 # COMMAND ----------
 
-# Generate data for each partner (6 months)
-months = [7, 8, 9, 10, 11, 12]  # July to December 2025
+STREAM_PATH = f"{VOLUME_PATH}/stream"
+STREAM_ID_PREFIXES = {"ticket_sales": "TKT", "fnb_sales": "FNB", "retail_sales": "RTL"}
+STREAM_HOUR_COLUMNS = {"ticket_sales": "visit_hour", "fnb_sales": "transaction_hour"}
+
+def stream_events(fact_type, num_events, rng, run_tag, first_number, end, interval_s):
+    """num_events events of a fact type that happened in the interval_s seconds before `end`, spread over the partners"""
+    frames = []
+    for partner, count in zip(PARTNERS, rng.multinomial(num_events, [1 / len(PARTNERS)] * len(PARTNERS))):
+        if not count:
+            continue
+        df = FACT_GENERATORS[fact_type](partner, end.month, count, rng=rng, year=end.year)
+        prefix = f"{STREAM_ID_PREFIXES[fact_type]}_{PARTNER_CODES[partner]}_S{run_tag}_"
+        df["transaction_id"] = format_ids(prefix, np.arange(first_number, first_number + count), 9)
+        first_number += count
+        frames.append(df)
+    events = pd.concat(frames, ignore_index=True)
+    events["event_timestamp"] = end - pd.to_timedelta(np.round(rng.uniform(0, interval_s, len(events)), 3), unit="s")
+    events["transaction_date"] = events["event_timestamp"].dt.tz_localize(None).dt.normalize()
+    if fact_type in STREAM_HOUR_COLUMNS:
+        events[STREAM_HOUR_COLUMNS[fact_type]] = events["event_timestamp"].dt.hour
+    events = with_change_type(events, "insert").sort_values("event_timestamp", ignore_index=True)
+    return events[[name for name, _ in FEED_SCHEMAS[f"{fact_type}_stream"]]]
+
+def write_stream_file(events, path, fact_type):
+    """Write an event file under a hidden name and rename it, so readers never see a partial file"""
+    directory, name = path.rsplit("/", 1)
+    temporary = f"{directory}/.{name}"
+    writer = CsvChunkWriter(temporary) if OUTPUT_FORMAT == "csv" else ParquetChunkWriter(temporary, f"{fact_type}_stream")
+    writer.write(events)
+    writer.close()
+    os.replace(temporary, path)
+
+def run_event_stream(events_per_second, duration_s, file_interval_s):
+    """Write a file per fact type every file_interval_s seconds for duration_s seconds and return the achieved rate"""
+    run_tag = time.strftime("%y%m%d%H%M%S", time.gmtime())
+    rng = unit_rng("stream", run_tag)
+    extension = "csv" if OUTPUT_FORMAT == "csv" else "parquet"
+    for fact_type in FACT_GENERATORS:
+        os.makedirs(f"{STREAM_PATH}/{fact_type}", exist_ok=True)
+    emitted = dict.fromkeys(FACT_GENERATORS, 0)
+    ticks, files = [], 0
+    start = previous = time.time()
+    for tick in range(1, math.ceil(duration_s / file_interval_s) + 1):
+        due = start + tick * file_interval_s
+        time.sleep(max(0.0, due - time.time()))
+        tick_start = time.time()
+        end = pd.Timestamp(tick_start, unit="s", tz="UTC").floor("ms")
+        # Every event owed since the start, so a late tick catches up
+        owed = max(0, round(events_per_second * (tick_start - start)) - sum(emitted.values()))
+        for fact_type, count in zip(FACT_GENERATORS, rng.multinomial(owed, [1 / len(FACT_GENERATORS)] * len(FACT_GENERATORS))):
+            if count:
+                events = stream_events(fact_type, count, rng, run_tag, emitted[fact_type], end, tick_start - previous)
+                write_stream_file(events, f"{STREAM_PATH}/{fact_type}/{run_tag}-{tick:06d}.{extension}", fact_type)
+                emitted[fact_type] += int(count)
+                files += 1
+        ticks.append({"events": owed, "lag_s": tick_start - due, "write_s": time.time() - tick_start})
+        previous = tick_start
+    wall_s = time.time() - start
+    ticks_df = pd.DataFrame(ticks)
+    return {
+        "run": run_tag,
+        "files": files,
+        "events": sum(emitted.values()),
+        "events_by_fact": emitted,
+        "seconds": round(wall_s, 1),
+        "target_events_per_second": events_per_second,
+        "events_per_second": round(sum(emitted.values()) / wall_s, 1),
+        "max_tick_lag_s": round(ticks_df["lag_s"].max(), 3),
+        "mean_write_s": round(ticks_df["write_s"].mean(), 3),
+    }
+
+if GENERATION_MODE == "stream":
+    print(f"📡 Streaming ~{STREAM_EVENTS_PER_SECOND:,.0f} events/s to {STREAM_PATH} for {STREAM_DURATION_SECONDS:.0f}s, "
+          f"a file per fact type every {STREAM_FILE_SECONDS:g}s...")
+    stream_summary = run_event_stream(STREAM_EVENTS_PER_SECOND, STREAM_DURATION_SECONDS, STREAM_FILE_SECONDS)
+    print(f"📡 {stream_summary['events']:,} events in {stream_summary['files']:,} files over {stream_summary['seconds']}s: "
+          f"{stream_summary['events_per_second']:,.0f} events/s (target {STREAM_EVENTS_PER_SECOND:,.0f}), "
+          f"ticks up to {stream_summary['max_tick_lag_s']}s late")
+    dbutils.notebook.exit(json.dumps(stream_summary))
 
+# COMMAND ----------
+
+# Generate data for each partner (6 months by default, see num_months)
 for partner in PARTNERS:
-    print(f"🎯 Generating data for {partner}...")
-    
     # Create partner folder
-    partner_path = f"{VOLUME_PATH}/partners/{partner}"
-    dbutils.fs.mkdirs(partner_path)
-    
-    for month in months:
-        # Ticket Sales
-        ticket_df = generate_ticket_sales(partner, month)
-        ticket_df.to_csv(f"/{partner_path}/ticket_sales_{month:02d}_2025.csv", index=False)
-        
-        # F&B Sales
-        fnb_df = generate_fnb_sales(partner, month)
-        fnb_df.to_csv(f"/{partner_path}/fnb_sales_{month:02d}_2025.csv", index=False)
-        
-        # Retail Sales
-        retail_df = generate_retail_sales(partner, month)
-        retail_df.to_csv(f"/{partner_path}/retail_sales_{month:02d}_2025.csv", index=False)
-        
-        print(f"  ✅ Month {month} - Generated ~510K records (tickets + F&B + retail)")
+    dbutils.fs.mkdirs(f"{VOLUME_PATH}/partners/{partner}")
+
+work_units = [(partner, year, month, fact_type) for partner in PARTNERS for year, month in MONTHS for fact_type in FACT_GENERATORS]
+if GENERATION_MODE == "cdc":
+    print(f"🎯 Generating CDC batch {CDC_BATCH}: {len(work_units)} change files of ~{CDC_CHANGE_RATE:.1%} of {ROWS_PER_FILE:,} rows "
+          f"with {PARALLEL_WORKERS} worker(s)...")
+else:
+    print(f"🎯 Generating {len(work_units)} files of {ROWS_PER_FILE:,} rows with {PARALLEL_WORKERS} worker(s)...")
+
+run_start = time.perf_counter()
+timings = []
+for timing in run_work_units(work_units, PARALLEL_WORKERS):
+    timings.append(timing)
+    print(f"  ✅ {timing['partner']} {timing['fact_type']} {timing['year']}-{timing['month']:02d} - "
+          f"{timing['rows']:,} rows in {timing['total_s']:.2f}s")
+wall_s = time.perf_counter() - run_start
+
+# COMMAND ----------
 
+# Per-unit timing report
+timings_df = pd.DataFrame(timings).sort_values("total_s", ascending=False)
+busy_s = timings_df["total_s"].sum()
+slowest = timings_df.iloc[0]
+print(timings_df.to_string(index=False))
+print(f"\n⏱️ {len(timings_df)} units, {timings_df['rows'].sum():,} rows ({timings_df['bytes'].sum() / 1e6:,.1f} MB {OUTPUT_FORMAT}) in {wall_s:.1f}s wall "
+      f"({busy_s:.1f}s of unit time, {busy_s / wall_s:.1f}x effective parallelism)")
+print(f"   Slowest unit: {slowest['partner']} {slowest['fact_type']} {slowest['year']}-{slowest['month']:02d} ({slowest['total_s']:.2f}s)")
 print("\n🎉 All partner data generated!")
 
 # COMMAND ----------
@@ -211,6 +771,7 @@ dbutils.fs.mkdirs(dim_path)
 # COMMAND ----------
 
 # Dimension: Campaigns
+rng = unit_rng("dim_campaigns")
 campaigns = []
 campaign_names = [
     "Summer_Splash", "Back_to_School", "Halloween_Spooktacular", 
@@ -223,9 +784,9 @@ for i, name in enumerate(campaign_names):
         "campaign_name": name,
         "start_date": (START_DATE + timedelta(days=i*30)).strftime("%Y-%m-%d"),
         "end_date": (START_DATE + timedelta(days=(i+1)*30-1)).strftime("%Y-%m-%d"),
-        "budget_usd": random.randint(100000, 500000),
-        "channel": random.choice(["TV", "Digital", "Social", "Print", "Multi-Channel"]),
-        "target_demographic": random.choice(["Families", "Kids_5-12", "Teens", "All_Ages"]),
+        "budget_usd": int(rng.integers(100000, 500001)),
+        "channel": rng.choice(["TV", "Digital", "Social", "Print", "Multi-Channel"]),
+        "target_demographic": rng.choice(["Families", "Kids_5-12", "Teens", "All_Ages"]),
         "is_active": i >= 3  # Last 3 campaigns are active
     })
 
@@ -235,6 +796,7 @@ print("✅ dim_campaigns.csv created")
 # COMMAND ----------
 
 # Dimension: Products (for retail)
+rng = unit_rng("dim_products")
 products = []
 product_list = [
     ("Plush_Toy_Small", "Toys", "RoboBuddies"), ("Plush_Toy_Large", "Toys", "MagicPonies"),
@@ -250,9 +812,9 @@ for i, (name, category, ip) in enumerate(product_list):
         "product_name": name,
         "category": category,
         "ip_name": ip,
-        "base_price": round(random.uniform(9.99, 49.99), 2),
-        "cost": round(random.uniform(3.99, 19.99), 2),
-        "supplier": random.choice(["ToyMaster_Inc", "GlobalGoods", "QualityPlush", "ApparelPro"]),
+        "base_price": round(rng.uniform(9.99, 49.99), 2),
+        "cost": round(rng.uniform(3.99, 19.99), 2),
+        "supplier": rng.choice(["ToyMaster_Inc", "GlobalGoods", "QualityPlush", "ApparelPro"]),
         "launch_date": "2024-01-15"
     })
 
@@ -261,67 +823,100 @@ print("✅ dim_products.csv created")
 
 # COMMAND ----------
 
-# Dimension: Facilities
-facilities_dim = []
-for partner, facs in FACILITIES.items():
-    for fac in facs:
-        market = "North_America" if "Orlando" in fac or "California" in fac or "NewYork" in fac or "Chicago" in fac or "Miami" in fac or "Toronto" in fac or "Vancouver" in fac or "Montreal" in fac else \
-                 "Europe" if "London" in fac or "Paris" in fac or "Berlin" in fac else \
-                 "Asia_Pacific"
-        facilities_dim.append({
-            "facility_id": fac,
-            "facility_name": fac.replace("_", " "),
-            "partner_name": partner,
-            "market": market,
-            "country": fac.split("_")[1] if "_" in fac else "Unknown",
-            "capacity": random.randint(5000, 25000),
-            "opened_date": f"20{random.randint(15, 23)}-0{random.randint(1,9)}-01",
-            "experience_type": random.choice(["Theme_Park", "Indoor_Center", "Hybrid"])
-        })
-
-pd.DataFrame(facilities_dim).to_csv(f"/{dim_path}/dim_facilities.csv", index=False)
-print("✅ dim_facilities.csv created")
+# MAGIC %md
+# MAGIC ### Facilities, Customers and Dates
+# MAGIC 
+# MAGIC These dimensions grow with the generation settings: a facility per partner facility, a customer for every
+# MAGIC `customer_id` the facts can draw (499,999 × `scale_factor`, so every fact row joins to `dim_customers`)
+# MAGIC and a date for every day of `num_months`. Each is built with NumPy in chunks of `chunk_rows` rows, every
+# MAGIC chunk from its own `unit_rng(dimension, first_row)` stream, generated on `parallel_workers` processes and
+# MAGIC appended to the CSV file in order, so tens of millions of customers take flat memory per worker.
 
 # COMMAND ----------
 
-# Dimension: Customers (sample)
-customers = []
-for i in range(10000):
-    customers.append({
-        "customer_id": f"CUST_{i:06d}",
-        "customer_segment": random.choice(["Frequent_Visitor", "Annual_Pass", "Occasional", "First_Time", "VIP"]),
-        "age_group": random.choice(["18-24", "25-34", "35-44", "45-54", "55+"]),
-        "family_size": random.randint(1, 6),
-        "home_market": random.choice(MARKETS),
-        "signup_date": (START_DATE - timedelta(days=random.randint(30, 730))).strftime("%Y-%m-%d"),
-        "loyalty_tier": random.choice(["Bronze", "Silver", "Gold", "Platinum"])
+FACILITY_ROWS = [(partner, fac) for partner, facs in FACILITIES.items() for fac in facs]
+
+def build_dim_facilities(first, last, rng):
+    """dim_facilities rows of FACILITY_ROWS[first:last]"""
+    partners, facilities = (pd.Series(column) for column in zip(*FACILITY_ROWS[first:last]))
+    n = len(facilities)
+    parts = facilities.str.split("_")
+    return pd.DataFrame({
+        "facility_id": facilities,
+        "facility_name": facilities.str.replace("_", " "),
+        "partner_name": partners,
+        "market": facilities.map(FACILITY_MARKETS),
+        "country": parts.str[1].where(parts.str.len() > 1, "Unknown"),
+        "capacity": rng.integers(5000, 25001, n),
+        "opened_date": "20" + rng.integers(15, 24, n).astype(str) + "-0" + rng.integers(1, 10, n).astype(str) + "-01",
+        "experience_type": rng.choice(["Theme_Park", "Indoor_Center", "Hybrid"], n),
     })
 
-pd.DataFrame(customers).to_csv(f"/{dim_path}/dim_customers.csv", index=False)
-print("✅ dim_customers.csv created")
-
-# COMMAND ----------
+def build_dim_customers(first, last, rng):
+    """dim_customers rows of customer numbers first + 1 to last"""
+    n = last - first
+    signup_days = pd.to_timedelta(rng.integers(30, 731, n), unit="D")
+    return pd.DataFrame({
+        "customer_id": customer_ids(np.arange(first + 1, last + 1)),
+        "customer_segment": rng.choice(["Frequent_Visitor", "Annual_Pass", "Occasional", "First_Time", "VIP"], n),
+        "age_group": rng.choice(["18-24", "25-34", "35-44", "45-54", "55+"], n),
+        "family_size": rng.integers(1, 7, n),
+        "home_market": rng.choice(MARKETS, n),
+        "signup_date": (pd.Timestamp(START_DATE) - signup_days).strftime("%Y-%m-%d"),
+        "loyalty_tier": rng.choice(["Bronze", "Silver", "Gold", "Platinum"], n),
+    })
 
-# Dimension: Date (calendar)
-dates = []
-current = START_DATE
-while current <= END_DATE:
-    dates.append({
-        "date": current.strftime("%Y-%m-%d"),
-        "year": current.year,
-        "quarter": (current.month - 1) // 3 + 1,
-        "month": current.month,
-        "month_name": current.strftime("%B"),
-        "week_of_year": current.isocalendar()[1],
-        "day_of_week": current.strftime("%A"),
-        "is_weekend": current.weekday() >= 5,
-        "is_holiday": current.month == 12 and current.day in [24, 25, 31],
-        "season": "Summer" if current.month in [6,7,8] else "Fall" if current.month in [9,10,11] else "Winter"
+def build_dim_dates(first, last, rng):
+    """dim_dates rows of the days START_DATE + first to START_DATE + last - 1"""
+    days = pd.date_range(START_DATE + timedelta(days=first), periods=last - first, freq="D")
+    is_weekend, is_holiday = calendar_flags(days)
+    return pd.DataFrame({
+        "date": days.strftime("%Y-%m-%d"),
+        "year": days.year,
+        "quarter": days.quarter,
+        "month": days.month,
+        "month_name": days.month_name(),
+        "week_of_year": days.isocalendar().week.to_numpy(),
+        "day_of_week": days.day_name(),
+        "is_weekend": is_weekend,
+        "is_holiday": is_holiday,
+        "season": np.select([days.month.isin([6, 7, 8]), days.month.isin([9, 10, 11])], ["Summer", "Fall"], "Winter"),
     })
-    current += timedelta(days=1)
 
-pd.DataFrame(dates).to_csv(f"/{dim_path}/dim_dates.csv", index=False)
-print("✅ dim_dates.csv created")
+# Dimension -> (chunk builder, number of rows)
+DIMENSION_BUILDERS = {
+    "dim_facilities": (build_dim_facilities, len(FACILITY_ROWS)),
+    "dim_customers": (build_dim_customers, NUM_CUSTOMERS),
+    "dim_dates": (build_dim_dates, (END_DATE - START_DATE).days + 1),
+}
+
+def build_dimension_chunk(name, first, last):
+    """Rows first to last - 1 of a dimension, drawn from their own random stream"""
+    build, _ = DIMENSION_BUILDERS[name]
+    return build(first, last, unit_rng(name, first))
+
+def generate_dimension(name, chunk_rows, workers=1):
+    """Write a dimension's CSV file chunk by chunk, with the chunks generated on `workers` processes"""
+    _, num_rows = DIMENSION_BUILDERS[name]
+    chunks = [(name, first, min(first + chunk_rows, num_rows)) for first in range(0, num_rows, chunk_rows)]
+    writer = CsvChunkWriter(f"{dim_path}/{name}.csv")
+    if workers <= 1:
+        pool = contextlib.nullcontext()
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    with pool:
+        run_chunks = pool.map if workers > 1 else map
+        for df in run_chunks(build_dimension_chunk, *zip(*chunks)):
+            writer.write(df)
+    writer.close()
+    return num_rows
+
+# COMMAND ----------
+
+for name in DIMENSION_BUILDERS:
+    start = time.perf_counter()
+    rows = generate_dimension(name, CHUNK_ROWS, PARALLEL_WORKERS)
+    print(f"✅ {name}.csv created - {rows:,} rows in {time.perf_counter() - start:.2f}s")
 
 # COMMAND ----------
 
@@ -332,9 +927,12 @@ print("✅ dim_dates.csv created")
 
 # List all generated files
 print("📁 Generated Files Summary:")
-print("\n📂 Partner Data (6 months × 3 file types × 5 partners = 90 files):")
+print(f"\n📂 Partner Data ({NUM_MONTHS} months × {len(FACT_GENERATORS)} file types × {NUM_PARTNERS} partners = {len(work_units)} files):")
 for partner in PARTNERS:
-    files = dbutils.fs.ls(f"{VOLUME_PATH}/partners/{partner}")
+    if OUTPUT_FORMAT == "parquet_partitioned":
+        files = [m for fact_type in FACT_GENERATORS for m in dbutils.fs.ls(f"{VOLUME_PATH}/partitioned/{fact_type}/partner={partner}")]
+    else:
+        files = dbutils.fs.ls(f"{VOLUME_PATH}/partners/{partner}")
     print(f"  └── {partner}: {len(files)} files")
 
 print("\n📂 Dimension Tables:")
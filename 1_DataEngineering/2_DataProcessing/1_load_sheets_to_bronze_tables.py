@@ -2,12 +2,23 @@
 # MAGIC %md
 # MAGIC # 🥉 Bronze Layer: Raw Data Ingestion
 # MAGIC 
-# MAGIC This notebook ingests raw CSV files from the Volume into Bronze tables.
+# MAGIC This notebook ingests raw partner files from the Volume into Bronze tables.
 # MAGIC 
 # MAGIC **Medallion Architecture - Bronze Layer:**
-# MAGIC - Raw data ingestion from CSV files
+# MAGIC - Raw data ingestion from CSV or Parquet files (`source_format` widget)
+# MAGIC - Declared schemas from `feed_schemas.py` (no `inferSchema` pass); drifting columns go to `_rescued_data`
 # MAGIC - Adds metadata (source file, ingestion timestamp)
+# MAGIC - Records timing and Delta commit metrics of every load in `pipeline_run_metrics` (`pipeline_metrics.py`)
+# MAGIC - Loads are queued on a dependency DAG (`pipeline_dag.py`) and run concurrently, up to `parallel_statements` at a time
 # MAGIC - No transformations applied
+# MAGIC 
+# MAGIC **Load modes (`load_mode` widget):**
+# MAGIC - `full` — rebuild the fact tables from every partner file (`CREATE OR REPLACE TABLE`)
+# MAGIC - `incremental` — append only partner files that are new or were re-uploaded since the last run,
+# MAGIC   tracked by path and modification time in `bronze_ingested_files`. Re-uploaded files add new versions
+# MAGIC   of their rows; the silver `MERGE` keeps the latest one per `transaction_id`.
+# MAGIC 
+# MAGIC Dimension files are small and always fully reloaded.
 
 # COMMAND ----------
 
@@ -17,62 +28,164 @@
 
 # COMMAND ----------
 
+from feed_schemas import RESCUED_DATA_COLUMN, schema_ddl
+from pipeline_dag import PipelineDag
+from pipeline_metrics import PipelineMetrics
+
+# Partner file format, matching the output_format used in generate_synthetic_csv_data.py
+dbutils.widgets.dropdown("source_format", "csv", ["csv", "parquet", "parquet_partitioned"], "Partner file format")
+SOURCE_FORMAT = dbutils.widgets.get("source_format")
+dbutils.widgets.dropdown("load_mode", "full", ["full", "incremental"], "Load mode")
+LOAD_MODE = dbutils.widgets.get("load_mode")
+# Shared by the bronze, silver and gold runs of one pipeline run (e.g. {{job.run_id}}); blank starts a new run id
+dbutils.widgets.text("run_id", "", "Pipeline run id")
+METRICS = PipelineMetrics(spark, "bronze", dbutils.widgets.get("run_id"))
+dbutils.widgets.text("parallel_statements", "4", "Concurrent statements (1 = sequential)")
+DAG = PipelineDag(METRICS, int(dbutils.widgets.get("parallel_statements")))
+RAW_FILES_PATH = "/Volumes/pedroz_catalog/entertainment_co/raw_files"
+
+def feed_source(path, feed, file_format="csv", **options):
+    """read_files() call for a feed with its declared schema and a rescued-data column"""
+    options = {
+        "format": file_format,
+        **({"header": "true"} if file_format == "csv" else {}),
+        "schema": schema_ddl(feed),
+        "rescuedDataColumn": RESCUED_DATA_COLUMN,
+        **options,
+    }
+    return f"read_files('{path}', " + ", ".join(f"{key} => '{value}'" for key, value in options.items()) + ")"
+
+def fact_source(fact_type, path=None):
+    """read_files() call over the partner files of a fact type in SOURCE_FORMAT (all of them unless path is given)"""
+    if SOURCE_FORMAT == "parquet_partitioned":
+        # partner=/month= directories only organise the files; the rows already carry every column
+        return feed_source(path or f"{RAW_FILES_PATH}/partitioned/{fact_type}/", fact_type, "parquet", partitionColumns="")
+    if SOURCE_FORMAT == "parquet":
+        return feed_source(path or f"{RAW_FILES_PATH}/partners/*/{fact_type}_*.parquet", fact_type, "parquet")
+    return feed_source(path or f"{RAW_FILES_PATH}/partners/*/{fact_type}_*.csv", fact_type)
+
+def bronze_select(source):
+    """Raw rows of a read_files() source plus source file and ingestion time"""
+    return f"""
+        SELECT 
+            *,
+            _metadata.file_path as source_file,
+            current_timestamp() as ingestion_timestamp
+        FROM {source}
+    """
+
+# COMMAND ----------
+
+# File manifest: every partner file loaded into a bronze fact table, keyed by path and modification time
+spark.sql("""
+    CREATE TABLE IF NOT EXISTS bronze_ingested_files (
+        table_name STRING,
+        file_path STRING,
+        file_size BIGINT,
+        modification_time TIMESTAMP,
+        ingestion_timestamp TIMESTAMP
+    )
+""")
+
+def list_fact_files(fact_type):
+    """FileInfo of every partner file of a fact type currently in the Volume"""
+    if SOURCE_FORMAT == "parquet_partitioned":
+        files, pending = [], [f"{RAW_FILES_PATH}/partitioned/{fact_type}/"]
+        while pending:
+            for info in dbutils.fs.ls(pending.pop()):
+                if info.isDir():
+                    pending.append(info.path)
+                elif info.name.endswith(".parquet"):
+                    files.append(info)
+        return files
+    extension = ".csv" if SOURCE_FORMAT == "csv" else ".parquet"
+    return [
+        info
+        for partner in dbutils.fs.ls(f"{RAW_FILES_PATH}/partners/")
+        for info in dbutils.fs.ls(partner.path)
+        if info.name.startswith(f"{fact_type}_") and info.name.endswith(extension)
+    ]
+
+def file_path(info):
+    """Volume path of a FileInfo, without the dbfs: scheme"""
+    return info.path.removeprefix("dbfs:")
+
+def ingested_files(table_name):
+    """(file_path, modification time in ms) of the files already loaded into a bronze table"""
+    rows = spark.sql(f"""
+        SELECT file_path, unix_millis(modification_time) as modification_ms
+        FROM bronze_ingested_files WHERE table_name = '{table_name}'
+    """).collect()
+    return {(row.file_path, row.modification_ms) for row in rows}
+
+def record_ingested_files(table_name, files, after):
+    """Queue adding files to the manifest of a bronze table once the `after` loads have succeeded"""
+    if files:
+        values = ", ".join(
+            f"('{table_name}', '{file_path(info)}', {info.size}, timestamp_millis({info.modificationTime}), current_timestamp())"
+            for info in files
+        )
+        DAG.add("bronze_ingested_files", f"INSERT INTO bronze_ingested_files VALUES {values}", after=after)
+
+def rebuild_bronze_fact(table_name, fact_type):
+    """Queue the rebuild of a bronze fact table from every partner file and the reset of its manifest"""
+    files = list_fact_files(fact_type)  # listed first, so files landing mid-load are picked up next run
+    load = DAG.add(table_name, f"CREATE OR REPLACE TABLE {table_name} AS {bronze_select(fact_source(fact_type))}")
+    DAG.add("bronze_ingested_files", f"DELETE FROM bronze_ingested_files WHERE table_name = '{table_name}'", after=[load])
+    record_ingested_files(table_name, files, after=[load])
+
+def append_new_fact_files(table_name, fact_type):
+    """Queue appends of only the partner files whose path or modification time is not in the manifest yet"""
+    seen = ingested_files(table_name)
+    new_files = [info for info in list_fact_files(fact_type) if (file_path(info), info.modificationTime) not in seen]
+    print(f"📥 {table_name}: {len(new_files)} new or changed file(s)")
+    if not new_files:
+        return
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            {schema_ddl(fact_type)}, {RESCUED_DATA_COLUMN} STRING, source_file STRING, ingestion_timestamp TIMESTAMP
+        )
+    """)
+    # One read per directory, selecting just the new files with a {a,b,...} glob
+    by_directory = {}
+    for info in new_files:
+        by_directory.setdefault(file_path(info).rsplit("/", 1)[0], []).append(info.name)
+    loads = []
+    for directory, names in by_directory.items():
+        new_files_glob = f"{directory}/{{{','.join(names)}}}"
+        loads.append(DAG.add(table_name, f"INSERT INTO {table_name} {bronze_select(fact_source(fact_type, new_files_glob))}"))
+    record_ingested_files(table_name, new_files, after=loads)
+
+def load_bronze_fact(table_name, fact_type):
+    """Queue the load of a bronze fact table in LOAD_MODE: full rebuild or append of new partner files"""
+    if LOAD_MODE == "incremental":
+        append_new_fact_files(table_name, fact_type)
+    else:
+        rebuild_bronze_fact(table_name, fact_type)
+
+def load_bronze_dimension(table_name, feed):
+    """Queue the rebuild of a bronze dimension table from its CSV file"""
+    DAG.add(table_name, f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM {feed_source(f'{RAW_FILES_PATH}/dimensions/{feed}.csv', feed)}")
+
+# COMMAND ----------
+
 # MAGIC %md
 # MAGIC ## 📦 Ingest Transactional Data
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC -- Bronze: Ticket Sales (all partners, all months)
-# MAGIC CREATE OR REPLACE TABLE bronze_ticket_sales AS
-# MAGIC SELECT 
-# MAGIC     *,
-# MAGIC     _metadata.file_path as source_file,
-# MAGIC     current_timestamp() as ingestion_timestamp
-# MAGIC FROM read_files(
-# MAGIC     '/Volumes/pedroz_catalog/entertainment_co/raw_files/partners/*/ticket_sales_*.csv',
-# MAGIC     format => 'csv',
-# MAGIC     header => true,
-# MAGIC     inferSchema => true
-# MAGIC );
-# MAGIC 
-# MAGIC SELECT 'bronze_ticket_sales' as table_name, COUNT(*) as row_count FROM bronze_ticket_sales;
+# Bronze: Ticket Sales (all partners, all months)
+load_bronze_fact("bronze_ticket_sales", "ticket_sales")
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC -- Bronze: F&B Sales
-# MAGIC CREATE OR REPLACE TABLE bronze_fnb_sales AS
-# MAGIC SELECT 
-# MAGIC     *,
-# MAGIC     _metadata.file_path as source_file,
-# MAGIC     current_timestamp() as ingestion_timestamp
-# MAGIC FROM read_files(
-# MAGIC     '/Volumes/pedroz_catalog/entertainment_co/raw_files/partners/*/fnb_sales_*.csv',
-# MAGIC     format => 'csv',
-# MAGIC     header => true,
-# MAGIC     inferSchema => true
-# MAGIC );
-# MAGIC 
-# MAGIC SELECT 'bronze_fnb_sales' as table_name, COUNT(*) as row_count FROM bronze_fnb_sales;
+# Bronze: F&B Sales
+load_bronze_fact("bronze_fnb_sales", "fnb_sales")
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC -- Bronze: Retail Sales
-# MAGIC CREATE OR REPLACE TABLE bronze_retail_sales AS
-# MAGIC SELECT 
-# MAGIC     *,
-# MAGIC     _metadata.file_path as source_file,
-# MAGIC     current_timestamp() as ingestion_timestamp
-# MAGIC FROM read_files(
-# MAGIC     '/Volumes/pedroz_catalog/entertainment_co/raw_files/partners/*/retail_sales_*.csv',
-# MAGIC     format => 'csv',
-# MAGIC     header => true,
-# MAGIC     inferSchema => true
-# MAGIC );
-# MAGIC 
-# MAGIC SELECT 'bronze_retail_sales' as table_name, COUNT(*) as row_count FROM bronze_retail_sales;
+# Bronze: Retail Sales
+load_bronze_fact("bronze_retail_sales", "retail_sales")
 
 # COMMAND ----------
 
@@ -81,31 +194,23 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC -- Bronze: Dimension Tables
-# MAGIC CREATE OR REPLACE TABLE bronze_dim_facilities AS
-# MAGIC SELECT * FROM read_files(
-# MAGIC     '/Volumes/pedroz_catalog/entertainment_co/raw_files/dimensions/dim_facilities.csv',
-# MAGIC     format => 'csv', header => true, inferSchema => true
-# MAGIC );
-# MAGIC 
-# MAGIC CREATE OR REPLACE TABLE bronze_dim_campaigns AS
-# MAGIC SELECT * FROM read_files(
-# MAGIC     '/Volumes/pedroz_catalog/entertainment_co/raw_files/dimensions/dim_campaigns.csv',
-# MAGIC     format => 'csv', header => true, inferSchema => true
-# MAGIC );
-# MAGIC 
-# MAGIC CREATE OR REPLACE TABLE bronze_dim_customers AS
-# MAGIC SELECT * FROM read_files(
-# MAGIC     '/Volumes/pedroz_catalog/entertainment_co/raw_files/dimensions/dim_customers.csv',
-# MAGIC     format => 'csv', header => true, inferSchema => true
-# MAGIC );
+# Bronze: Dimension Tables
+load_bronze_dimension("bronze_dim_facilities", "dim_facilities")
+load_bronze_dimension("bronze_dim_campaigns", "dim_campaigns")
+load_bronze_dimension("bronze_dim_customers", "dim_customers")
+load_bronze_dimension("bronze_dim_dates", "dim_dates")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## ⚡ Run the Loads
 # MAGIC 
-# MAGIC CREATE OR REPLACE TABLE bronze_dim_dates AS
-# MAGIC SELECT * FROM read_files(
-# MAGIC     '/Volumes/pedroz_catalog/entertainment_co/raw_files/dimensions/dim_dates.csv',
-# MAGIC     format => 'csv', header => true, inferSchema => true
-# MAGIC );
+# MAGIC The fact and dimension loads are independent, so they run concurrently; each manifest update waits for
+# MAGIC its load. The report shows the critical path, the chain of loads that bounds the wall time.
+
+# COMMAND ----------
+
+DAG.run()
 
 # COMMAND ----------
 
@@ -114,6 +219,10 @@
 
 # COMMAND ----------
 
+display(METRICS.flush())
+
+# COMMAND ----------
+
 print("""
 🥉 Bronze Layer Complete!
 
@@ -5,9 +5,27 @@
 # MAGIC This notebook transforms Bronze tables into Silver tables.
 # MAGIC 
 # MAGIC **Medallion Architecture - Silver Layer:**
-# MAGIC - Data type casting and validation
+# MAGIC - Typed columns straight from the declared bronze schemas (`feed_schemas.py`)
 # MAGIC - Joins with dimension tables for enrichment
 # MAGIC - Added calculated columns (year, month, quarter)
+# MAGIC - One row per `transaction_id` (the latest bronze version wins; versions ingested together go by `change_batch`);
+# MAGIC   transactions voided by a partner change file (`change_type = 'delete'`) are removed and recorded in
+# MAGIC   `silver_voided_transactions`
+# MAGIC - Records timing and Delta commit metrics of every load in `pipeline_run_metrics` (`pipeline_metrics.py`)
+# MAGIC - Loads are queued on a dependency DAG (`pipeline_dag.py`) and run concurrently, up to `parallel_statements` at a time
+# MAGIC - Fact tables are created with the layout in `table_layouts.py` and optimized after the loads
+# MAGIC 
+# MAGIC **Load modes (`load_mode` widget):**
+# MAGIC - `full` — rebuild each silver fact table from all of bronze
+# MAGIC - `incremental` — take only bronze rows with an `ingestion_timestamp` newer than the table's watermark
+# MAGIC   (its latest `ingestion_timestamp`) and `MERGE` them on `transaction_id`, so re-uploaded partner files
+# MAGIC   update their transactions instead of duplicating them
+# MAGIC 
+# MAGIC **Fact table layout (`fact_layout` widget):**
+# MAGIC - `clustered` — liquid clustering on `transaction_date, facility_id`
+# MAGIC - `partitioned` — partitioned by `year, month` and Z-ordered on `transaction_date, facility_id`
+# MAGIC 
+# MAGIC The layout is set when a table is created, so switching it takes a `full` load.
 # MAGIC 
 # MAGIC **Prerequisites:** Run `1_load_sheets_to_bronze_tables.py` first
 
@@ -19,38 +37,101 @@
 
 # COMMAND ----------
 
+from pipeline_dag import PipelineDag
+from pipeline_metrics import PipelineMetrics
+from table_layouts import TABLE_LAYOUTS, layout_clause, maintenance_statements
+
+dbutils.widgets.dropdown("load_mode", "full", ["full", "incremental"], "Load mode")
+LOAD_MODE = dbutils.widgets.get("load_mode")
+# Shared by the bronze, silver and gold runs of one pipeline run (e.g. {{job.run_id}}); blank starts a new run id
+dbutils.widgets.text("run_id", "", "Pipeline run id")
+METRICS = PipelineMetrics(spark, "silver", dbutils.widgets.get("run_id"))
+dbutils.widgets.text("parallel_statements", "4", "Concurrent statements (1 = sequential)")
+DAG = PipelineDag(METRICS, int(dbutils.widgets.get("parallel_statements")))
+dbutils.widgets.dropdown("fact_layout", "clustered", ["clustered", "partitioned"], "Fact table layout")
+PARTITIONED = dbutils.widgets.get("fact_layout") == "partitioned"
+# OPTIMIZE + ANALYZE after the loads; "skip" leaves it to predictive optimization
+dbutils.widgets.dropdown("table_maintenance", "run", ["run", "skip"], "Table maintenance")
+TABLE_MAINTENANCE = dbutils.widgets.get("table_maintenance")
+
+# Keep the latest version of each transaction; re-uploaded files reach bronze again with a newer ingestion time,
+# and versions ingested together (a snapshot and its change files in one bronze load) go by change batch
+LATEST_PER_TRANSACTION = """
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY t.transaction_id ORDER BY t.ingestion_timestamp DESC, t.change_batch DESC) = 1
+"""
+
+SILVER_FACTS = {
+    "silver_ticket_sales": "bronze_ticket_sales",
+    "silver_fnb_sales": "bronze_fnb_sales",
+    "silver_retail_sales": "bronze_retail_sales",
+}
+
+def voided_ids(bronze_table, ingested_after=None):
+    """transaction_ids voided in a bronze fact table (optionally only by rows ingested after a watermark)"""
+    newer = f" AND ingestion_timestamp > TIMESTAMP'{ingested_after}'" if ingested_after else ""
+    return f"SELECT transaction_id FROM {bronze_table} WHERE change_type = 'delete' AND transaction_id IS NOT NULL{newer}"
+
+def silver_watermark(table_name):
+    """Latest bronze ingestion_timestamp merged into a silver table, or None if there is nothing to build on"""
+    if not spark.catalog.tableExists(table_name):
+        return None
+    return spark.sql(f"SELECT MAX(ingestion_timestamp) as watermark FROM {table_name}").first().watermark
+
+def load_silver_fact(table_name, select_sql):
+    """Queue the build of a silver fact table from its bronze SELECT (bronze aliased as t) in LOAD_MODE"""
+    bronze_table = SILVER_FACTS[table_name]
+    watermark = silver_watermark(table_name) if LOAD_MODE == "incremental" else None
+    if watermark is None:
+        DAG.add(table_name, f"""
+            CREATE OR REPLACE TABLE {table_name} {layout_clause(table_name, PARTITIONED)}
+            AS {select_sql} WHERE t.transaction_id NOT IN ({voided_ids(bronze_table)}) {LATEST_PER_TRANSACTION}
+        """)
+    else:
+        DAG.add(table_name, f"""
+            MERGE INTO {table_name} s
+            USING ({select_sql} WHERE t.ingestion_timestamp > TIMESTAMP'{watermark}'
+                   AND t.transaction_id NOT IN ({voided_ids(bronze_table)}) {LATEST_PER_TRANSACTION}) u
+            ON s.transaction_id = u.transaction_id
+            WHEN MATCHED THEN UPDATE SET *
+            WHEN NOT MATCHED THEN INSERT *
+        """)
+        # Voids of transactions merged by earlier runs
+        DAG.add(table_name, f"DELETE FROM {table_name} WHERE transaction_id IN ({voided_ids(bronze_table, watermark)})")
+        print(f"🔁 {table_name}: merging bronze rows ingested after {watermark}")
+
+# COMMAND ----------
+
 # MAGIC %md
 # MAGIC ## 🎫 Silver 1: Ticket Sales with Facility Info
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE silver_ticket_sales AS
-# MAGIC SELECT 
-# MAGIC     t.transaction_id,
-# MAGIC     CAST(t.transaction_date AS DATE) as transaction_date,
-# MAGIC     t.facility_id,
-# MAGIC     f.facility_name,
-# MAGIC     f.partner_name,
-# MAGIC     f.market,
-# MAGIC     f.experience_type,
-# MAGIC     t.ip_name,
-# MAGIC     t.ticket_type,
-# MAGIC     CAST(t.quantity AS INT) as quantity,
-# MAGIC     CAST(t.unit_price AS DECIMAL(10,2)) as unit_price,
-# MAGIC     CAST(t.discount_pct AS INT) as discount_pct,
-# MAGIC     CAST(t.total_amount AS DECIMAL(10,2)) as total_amount,
-# MAGIC     t.customer_id,
-# MAGIC     CAST(t.is_repeat_visitor AS BOOLEAN) as is_repeat_visitor,
-# MAGIC     CAST(t.visit_hour AS INT) as visit_hour,
-# MAGIC     t.channel,
-# MAGIC     YEAR(t.transaction_date) as year,
-# MAGIC     MONTH(t.transaction_date) as month,
-# MAGIC     QUARTER(t.transaction_date) as quarter
-# MAGIC FROM bronze_ticket_sales t
-# MAGIC LEFT JOIN bronze_dim_facilities f ON t.facility_id = f.facility_id;
-# MAGIC 
-# MAGIC SELECT 'silver_ticket_sales' as table_name, COUNT(*) as row_count FROM silver_ticket_sales;
+load_silver_fact("silver_ticket_sales", """
+SELECT 
+    t.transaction_id,
+    t.transaction_date,
+    t.facility_id,
+    f.facility_name,
+    f.partner_name,
+    f.market,
+    f.experience_type,
+    t.ip_name,
+    t.ticket_type,
+    t.quantity,
+    t.unit_price,
+    t.discount_pct,
+    t.total_amount,
+    t.customer_id,
+    t.is_repeat_visitor,
+    t.visit_hour,
+    t.channel,
+    YEAR(t.transaction_date) as year,
+    MONTH(t.transaction_date) as month,
+    QUARTER(t.transaction_date) as quarter,
+    t.ingestion_timestamp
+FROM bronze_ticket_sales t
+LEFT JOIN bronze_dim_facilities f ON t.facility_id = f.facility_id
+""")
 
 # COMMAND ----------
 
@@ -59,30 +140,29 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE silver_fnb_sales AS
-# MAGIC SELECT 
-# MAGIC     t.transaction_id,
-# MAGIC     CAST(t.transaction_date AS DATE) as transaction_date,
-# MAGIC     t.facility_id,
-# MAGIC     f.facility_name,
-# MAGIC     f.partner_name,
-# MAGIC     f.market,
-# MAGIC     t.item_name,
-# MAGIC     t.item_category,
-# MAGIC     CAST(t.unit_price AS DECIMAL(10,2)) as unit_price,
-# MAGIC     CAST(t.quantity AS INT) as quantity,
-# MAGIC     CAST(t.total_amount AS DECIMAL(10,2)) as total_amount,
-# MAGIC     t.customer_id,
-# MAGIC     t.outlet_id,
-# MAGIC     t.payment_method,
-# MAGIC     CAST(t.transaction_hour AS INT) as transaction_hour,
-# MAGIC     YEAR(t.transaction_date) as year,
-# MAGIC     MONTH(t.transaction_date) as month
-# MAGIC FROM bronze_fnb_sales t
-# MAGIC LEFT JOIN bronze_dim_facilities f ON t.facility_id = f.facility_id;
-# MAGIC 
-# MAGIC SELECT 'silver_fnb_sales' as table_name, COUNT(*) as row_count FROM silver_fnb_sales;
+load_silver_fact("silver_fnb_sales", """
+SELECT 
+    t.transaction_id,
+    t.transaction_date,
+    t.facility_id,
+    f.facility_name,
+    f.partner_name,
+    f.market,
+    t.item_name,
+    t.item_category,
+    t.unit_price,
+    t.quantity,
+    t.total_amount,
+    t.customer_id,
+    t.outlet_id,
+    t.payment_method,
+    t.transaction_hour,
+    YEAR(t.transaction_date) as year,
+    MONTH(t.transaction_date) as month,
+    t.ingestion_timestamp
+FROM bronze_fnb_sales t
+LEFT JOIN bronze_dim_facilities f ON t.facility_id = f.facility_id
+""")
 
 # COMMAND ----------
 
@@ -91,30 +171,56 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE silver_retail_sales AS
-# MAGIC SELECT 
-# MAGIC     t.transaction_id,
-# MAGIC     CAST(t.transaction_date AS DATE) as transaction_date,
-# MAGIC     t.facility_id,
-# MAGIC     f.facility_name,
-# MAGIC     f.partner_name,
-# MAGIC     f.market,
-# MAGIC     t.ip_name,
-# MAGIC     t.product_name,
-# MAGIC     t.product_category,
-# MAGIC     CAST(t.unit_price AS DECIMAL(10,2)) as unit_price,
-# MAGIC     CAST(t.quantity AS INT) as quantity,
-# MAGIC     CAST(t.total_amount AS DECIMAL(10,2)) as total_amount,
-# MAGIC     t.customer_id,
-# MAGIC     t.store_id,
-# MAGIC     CAST(t.is_online AS BOOLEAN) as is_online,
-# MAGIC     YEAR(t.transaction_date) as year,
-# MAGIC     MONTH(t.transaction_date) as month
-# MAGIC FROM bronze_retail_sales t
-# MAGIC LEFT JOIN bronze_dim_facilities f ON t.facility_id = f.facility_id;
+load_silver_fact("silver_retail_sales", """
+SELECT 
+    t.transaction_id,
+    t.transaction_date,
+    t.facility_id,
+    f.facility_name,
+    f.partner_name,
+    f.market,
+    t.ip_name,
+    t.product_name,
+    t.product_category,
+    t.unit_price,
+    t.quantity,
+    t.total_amount,
+    t.customer_id,
+    t.store_id,
+    t.is_online,
+    YEAR(t.transaction_date) as year,
+    MONTH(t.transaction_date) as month,
+    t.ingestion_timestamp
+FROM bronze_retail_sales t
+LEFT JOIN bronze_dim_facilities f ON t.facility_id = f.facility_id
+""")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🗑️ Voided Transactions
 # MAGIC 
-# MAGIC SELECT 'silver_retail_sales' as table_name, COUNT(*) as row_count FROM silver_retail_sales;
+# MAGIC Every void received, with the `(transaction_date, facility_id)` it removed revenue from, so the incremental gold
+# MAGIC load re-aggregates those slices although their silver rows are gone.
+
+# COMMAND ----------
+
+def voided_rows(ingested_after="TIMESTAMP'1970-01-01'"):
+    """Void rows of the bronze facts ingested after a SQL timestamp expression"""
+    return " UNION ALL ".join(
+        f"""
+        SELECT '{table_name}' as fact_table, transaction_id, transaction_date, facility_id, ingestion_timestamp
+        FROM {bronze_table} WHERE change_type = 'delete' AND ingestion_timestamp > {ingested_after}"""
+        for table_name, bronze_table in SILVER_FACTS.items()
+    )
+
+if LOAD_MODE == "incremental" and spark.catalog.tableExists("silver_voided_transactions"):
+    DAG.add("silver_voided_transactions", f"""
+        INSERT INTO silver_voided_transactions
+        {voided_rows("(SELECT COALESCE(MAX(ingestion_timestamp), TIMESTAMP'1970-01-01') FROM silver_voided_transactions)")}
+    """)
+else:
+    DAG.add("silver_voided_transactions", f"CREATE OR REPLACE TABLE silver_voided_transactions AS {voided_rows()}")
 
 # COMMAND ----------
 
@@ -123,18 +229,19 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE silver_dim_facilities AS
-# MAGIC SELECT 
-# MAGIC     facility_id,
-# MAGIC     facility_name,
-# MAGIC     partner_name,
-# MAGIC     market,
-# MAGIC     country,
-# MAGIC     CAST(capacity AS INT) as capacity,
-# MAGIC     CAST(opened_date AS DATE) as opened_date,
-# MAGIC     experience_type
-# MAGIC FROM bronze_dim_facilities;
+DAG.add("silver_dim_facilities", """
+CREATE OR REPLACE TABLE silver_dim_facilities AS
+SELECT 
+    facility_id,
+    facility_name,
+    partner_name,
+    market,
+    country,
+    capacity,
+    opened_date,
+    experience_type
+FROM bronze_dim_facilities
+""")
 
 # COMMAND ----------
 
@@ -143,18 +250,52 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE silver_dim_campaigns AS
-# MAGIC SELECT 
-# MAGIC     campaign_id,
-# MAGIC     campaign_name,
-# MAGIC     CAST(start_date AS DATE) as start_date,
-# MAGIC     CAST(end_date AS DATE) as end_date,
-# MAGIC     CAST(budget_usd AS INT) as budget_usd,
-# MAGIC     channel,
-# MAGIC     target_demographic,
-# MAGIC     CAST(is_active AS BOOLEAN) as is_active
-# MAGIC FROM bronze_dim_campaigns;
+DAG.add("silver_dim_campaigns", """
+CREATE OR REPLACE TABLE silver_dim_campaigns AS
+SELECT 
+    campaign_id,
+    campaign_name,
+    start_date,
+    end_date,
+    budget_usd,
+    channel,
+    target_demographic,
+    is_active
+FROM bronze_dim_campaigns
+""")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## ⚡ Run the Loads
+# MAGIC 
+# MAGIC Every silver table reads only bronze, so all six run concurrently.
+
+# COMMAND ----------
+
+loaded_tables = {node["table"] for node in DAG.run()}
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🧹 Table Maintenance
+# MAGIC 
+# MAGIC `OPTIMIZE` clusters the files written by this run on the layout keys (Z-orders them when partitioned) and
+# MAGIC `ANALYZE` refreshes the column statistics used for data skipping and join planning.
+
+# COMMAND ----------
+
+if TABLE_MAINTENANCE == "run":
+    maintenance = {
+        table_name: maintenance_statements(table_name, PARTITIONED)
+        for table_name in sorted(loaded_tables & TABLE_LAYOUTS.keys())
+    }
+    for table_name, (optimize, _) in maintenance.items():
+        DAG.add(table_name, optimize)
+    DAG.run()
+    for _, analyze in maintenance.values():
+        spark.sql(analyze)
+    print(f"🧹 Optimized and analyzed: {', '.join(maintenance) or 'nothing'}")
 
 # COMMAND ----------
 
@@ -163,6 +304,10 @@
 
 # COMMAND ----------
 
+display(METRICS.flush())
+
+# COMMAND ----------
+
 print("""
 🥈 Silver Layer Complete!
 
@@ -174,6 +319,9 @@ print("""
    • silver_fnb_sales
    • silver_retail_sales
 
+🗑️ Voids:
+   • silver_voided_transactions
+
 📋 Dimensions (Cleaned):
    • silver_dim_facilities
    • silver_dim_campaigns
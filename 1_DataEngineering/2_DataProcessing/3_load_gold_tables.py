@@ -7,7 +7,19 @@
 # MAGIC **Medallion Architecture - Gold Layer:**
 # MAGIC - Aggregated metrics for reporting
 # MAGIC - Business-ready tables for Genie and Dashboards
-# MAGIC - AI_FORECAST for revenue predictions
+# MAGIC - A multi-grain rollup cube (day/week/month/quarter × facility/partner/market × revenue stream)
+# MAGIC - Campaign performance: daily facility revenue attributed to the active marketing campaigns
+# MAGIC - AI_FORECAST (or the local batch Holt-Winters forecaster) for revenue predictions
+# MAGIC - Records timing and Delta commit metrics of every load in `pipeline_run_metrics` (`pipeline_metrics.py`)
+# MAGIC - Loads are queued on a dependency DAG (`pipeline_dag.py`) and run concurrently, up to `parallel_statements` at a time
+# MAGIC - Tables are liquid-clustered on the keys dashboards filter by (`table_layouts.py`) and optimized after the loads
+# MAGIC 
+# MAGIC **Load modes (`load_mode` widget):**
+# MAGIC - `full` — rebuild every gold table from silver
+# MAGIC - `incremental` — find the `(transaction_date, facility_id)` slices touched by silver rows ingested after
+# MAGIC   `gold_daily_revenue`'s watermark, re-aggregate and `MERGE` only those slices, then replace just the
+# MAGIC   affected months of the downstream monthly, IP, F&B, hourly and time-series tables and the cube periods
+# MAGIC   that overlap them; the small campaign table is rebuilt
 # MAGIC 
 # MAGIC **Prerequisites:** Run `2_load_silver_tables.py` first
 
@@ -19,59 +31,158 @@
 
 # COMMAND ----------
 
+from batch_forecaster import FORECASTS, batch_forecast, forecast_horizon
+from campaign_attribution import CAMPAIGN_PLANS
+from customer_sketches import CUSTOMER_SKETCHES
+from gold_queries import DAILY_REVENUE_PLANS
+from pipeline_dag import PipelineDag
+from pipeline_metrics import PipelineMetrics
+from revenue_cube import affected_periods_predicate, cube_source_range, revenue_cube_select
+from table_layouts import TABLE_LAYOUTS, layout_clause, maintenance_statements
+
+dbutils.widgets.dropdown("load_mode", "full", ["full", "incremental"], "Load mode")
+LOAD_MODE = dbutils.widgets.get("load_mode")
+# Physical plan for gold_daily_revenue (see gold_queries.py); both give identical results
+dbutils.widgets.dropdown("daily_revenue_plan", "union", list(DAILY_REVENUE_PLANS), "gold_daily_revenue plan")
+DAILY_REVENUE_PLAN = dbutils.widgets.get("daily_revenue_plan")
+# Shared by the bronze, silver and gold runs of one pipeline run (e.g. {{job.run_id}}); blank starts a new run id
+dbutils.widgets.text("run_id", "", "Pipeline run id")
+METRICS = PipelineMetrics(spark, "gold", dbutils.widgets.get("run_id"))
+dbutils.widgets.text("parallel_statements", "4", "Concurrent statements (1 = sequential)")
+DAG = PipelineDag(METRICS, int(dbutils.widgets.get("parallel_statements")))
+# OPTIMIZE + ANALYZE after the loads; "skip" leaves it to predictive optimization
+dbutils.widgets.dropdown("table_maintenance", "run", ["run", "skip"], "Table maintenance")
+TABLE_MAINTENANCE = dbutils.widgets.get("table_maintenance")
+# ai_forecast calls AI_FORECAST in the workspace; local fits every series on the driver with batch_forecaster.py
+dbutils.widgets.dropdown("forecast_engine", "ai_forecast", ["ai_forecast", "local"], "Forecast engine")
+FORECAST_ENGINE = dbutils.widgets.get("forecast_engine")
+# Forecast tables AI_FORECAST fits under ai_forecast: the partner grain only. The facility x revenue stream grain
+# has the most series, so it is always fitted locally rather than adding the largest remote call to every refresh
+REMOTE_FORECASTS = ["gold_revenue_forecast"] if FORECAST_ENGINE == "ai_forecast" else []
+
+SILVER_FACTS = ["silver_ticket_sales", "silver_fnb_sales", "silver_retail_sales"]
+
+def months_predicate(year_col="year", month_col="month"):
+    """SQL predicate matching the AFFECTED_MONTHS"""
+    return " OR ".join(f"({year_col} = {year} AND {month_col} = {month})" for year, month in AFFECTED_MONTHS)
+
+def refresh_gold_table(table_name, select_sql, year_col="year", month_col="month"):
+    """Queue the rebuild of a month-grained gold table, or in incremental mode the replacement of its affected months"""
+    if not INCREMENTAL:
+        DAG.add(table_name, f"CREATE OR REPLACE TABLE {table_name} {layout_clause(table_name)} AS {select_sql}")
+    elif AFFECTED_MONTHS:
+        predicate = months_predicate(year_col, month_col)
+        DAG.add(table_name, f"INSERT INTO {table_name} REPLACE WHERE {predicate} SELECT * FROM ({select_sql}) WHERE {predicate}")
+
+# COMMAND ----------
+
 # MAGIC %md
-# MAGIC ## 📊 Gold 1: Daily Revenue Summary by Facility
+# MAGIC ## 🔎 Affected Slices
+# MAGIC 
+# MAGIC `gold_daily_revenue.last_ingestion_timestamp` records the newest silver row behind each slice, and
+# MAGIC `gold_void_watermark` the newest void applied (a void can empty its slice, leaving no row to record it), so
+# MAGIC the later of the two is the watermark: silver rows ingested after it are the ones gold has not seen yet. Voids
+# MAGIC received after it (`silver_voided_transactions`) affect the slices their transactions were removed from.
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE gold_daily_revenue AS
-# MAGIC SELECT 
-# MAGIC     COALESCE(t.transaction_date, f.transaction_date, r.transaction_date) as transaction_date,
-# MAGIC     COALESCE(t.facility_id, f.facility_id, r.facility_id) as facility_id,
-# MAGIC     COALESCE(t.facility_name, f.facility_name, r.facility_name) as facility_name,
-# MAGIC     COALESCE(t.partner_name, f.partner_name, r.partner_name) as partner_name,
-# MAGIC     COALESCE(t.market, f.market, r.market) as market,
-# MAGIC     COALESCE(t.ticket_revenue, 0) as ticket_revenue,
-# MAGIC     COALESCE(t.ticket_transactions, 0) as ticket_transactions,
-# MAGIC     COALESCE(t.total_visitors, 0) as total_visitors,
-# MAGIC     COALESCE(t.repeat_visitors, 0) as repeat_visitors,
-# MAGIC     COALESCE(f.fnb_revenue, 0) as fnb_revenue,
-# MAGIC     COALESCE(f.fnb_transactions, 0) as fnb_transactions,
-# MAGIC     COALESCE(r.retail_revenue, 0) as retail_revenue,
-# MAGIC     COALESCE(r.retail_transactions, 0) as retail_transactions,
-# MAGIC     (COALESCE(t.ticket_revenue, 0) + COALESCE(f.fnb_revenue, 0) + COALESCE(r.retail_revenue, 0)) as total_revenue,
-# MAGIC     YEAR(COALESCE(t.transaction_date, f.transaction_date, r.transaction_date)) as year,
-# MAGIC     MONTH(COALESCE(t.transaction_date, f.transaction_date, r.transaction_date)) as month
-# MAGIC FROM (
-# MAGIC     SELECT 
-# MAGIC         transaction_date, facility_id, facility_name, partner_name, market,
-# MAGIC         SUM(total_amount) as ticket_revenue,
-# MAGIC         COUNT(*) as ticket_transactions,
-# MAGIC         SUM(quantity) as total_visitors,
-# MAGIC         SUM(CASE WHEN is_repeat_visitor THEN quantity ELSE 0 END) as repeat_visitors
-# MAGIC     FROM silver_ticket_sales
-# MAGIC     GROUP BY transaction_date, facility_id, facility_name, partner_name, market
-# MAGIC ) t
-# MAGIC FULL OUTER JOIN (
-# MAGIC     SELECT 
-# MAGIC         transaction_date, facility_id, facility_name, partner_name, market,
-# MAGIC         SUM(total_amount) as fnb_revenue,
-# MAGIC         COUNT(*) as fnb_transactions
-# MAGIC     FROM silver_fnb_sales
-# MAGIC     GROUP BY transaction_date, facility_id, facility_name, partner_name, market
-# MAGIC ) f ON t.transaction_date = f.transaction_date AND t.facility_id = f.facility_id
-# MAGIC FULL OUTER JOIN (
-# MAGIC     SELECT 
-# MAGIC         transaction_date, facility_id, facility_name, partner_name, market,
-# MAGIC         SUM(total_amount) as retail_revenue,
-# MAGIC         COUNT(*) as retail_transactions
-# MAGIC     FROM silver_retail_sales
-# MAGIC     GROUP BY transaction_date, facility_id, facility_name, partner_name, market
-# MAGIC ) r ON COALESCE(t.transaction_date, f.transaction_date) = r.transaction_date 
-# MAGIC        AND COALESCE(t.facility_id, f.facility_id) = r.facility_id;
+watermark = None
+# Tables built before the watermark or customer sketch columns existed fall back to one full rebuild
+if (LOAD_MODE == "incremental" and spark.catalog.tableExists("gold_daily_revenue")
+        and {"last_ingestion_timestamp", *CUSTOMER_SKETCHES.values()} <= set(spark.table("gold_daily_revenue").columns)):
+    watermark = spark.sql("SELECT MAX(last_ingestion_timestamp) as watermark FROM gold_daily_revenue").first().watermark
+    if watermark is not None and spark.catalog.tableExists("gold_void_watermark"):
+        void_watermark = spark.sql("SELECT MAX(last_void_ingestion_timestamp) as watermark FROM gold_void_watermark").first().watermark
+        watermark = max(watermark, void_watermark or watermark)
+INCREMENTAL = watermark is not None
+VOIDS = spark.catalog.tableExists("silver_voided_transactions")
+
+AFFECTED_MONTHS = []
+NEW_VOID_WATERMARK = None  # newest void this run applies, recorded in gold_void_watermark
+if INCREMENTAL:
+    changed_rows = " UNION ALL ".join(
+        f"SELECT transaction_date, facility_id FROM {table} WHERE ingestion_timestamp > TIMESTAMP'{watermark}'"
+        for table in SILVER_FACTS
+    )
+    if VOIDS:
+        changed_rows += f"""
+            UNION ALL SELECT transaction_date, facility_id FROM silver_voided_transactions
+            WHERE ingestion_timestamp > TIMESTAMP'{watermark}'"""
+        NEW_VOID_WATERMARK = spark.sql(f"""
+            SELECT MAX(ingestion_timestamp) as watermark FROM silver_voided_transactions
+            WHERE ingestion_timestamp > TIMESTAMP'{watermark}'
+        """).first().watermark
+    spark.sql(f"CREATE OR REPLACE TEMP VIEW gold_affected_slices AS SELECT DISTINCT transaction_date, facility_id FROM ({changed_rows})")
+    AFFECTED_MONTHS = [
+        (row.year, row.month)
+        for row in spark.sql("""
+            SELECT DISTINCT YEAR(transaction_date) as year, MONTH(transaction_date) as month
+            FROM gold_affected_slices ORDER BY year, month
+        """).collect()
+    ]
+    if AFFECTED_MONTHS:
+        print(f"🔎 Silver changes since {watermark} touch months: {', '.join(f'{y}-{m:02d}' for y, m in AFFECTED_MONTHS)}")
+    else:
+        print(f"✅ No silver changes since {watermark} - gold is up to date")
+else:
+    print("🔄 Full rebuild of all gold tables")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 📊 Gold 1: Daily Revenue Summary by Facility
+# MAGIC 
+# MAGIC Built in a single pass by default: the three silver streams are `UNION ALL`ed with a stream tag and
+# MAGIC aggregated once with per-stream `FILTER` sums. `daily_revenue_plan = join` switches back to the
+# MAGIC per-stream aggregates stitched with `FULL OUTER JOIN`s; `benchmark_gold_daily_revenue.py` compares both.
 # MAGIC 
-# MAGIC SELECT 'gold_daily_revenue' as table_name, COUNT(*) as row_count FROM gold_daily_revenue;
+# MAGIC Each row also keeps a HyperLogLog sketch of the stream's `customer_id`s (`ticket_customers_sketch`,
+# MAGIC `fnb_customers_sketch`, `retail_customers_sketch`). Unlike `COUNT(DISTINCT ...)`, sketches merge across days,
+# MAGIC facilities and streams with `hll_union_agg()`; `hll_sketch_estimate()` gives the distinct count (see `customer_sketches.py`).
+
+# COMMAND ----------
+
+daily_revenue_select = DAILY_REVENUE_PLANS[DAILY_REVENUE_PLAN]
+
+AFFECTED_SLICE_FILTER = "(transaction_date, facility_id) IN (SELECT transaction_date, facility_id FROM gold_affected_slices)"
+
+daily_revenue_loads = []
+if not INCREMENTAL:
+    daily_revenue_loads.append(DAG.add("gold_daily_revenue", f"""
+        CREATE OR REPLACE TABLE gold_daily_revenue {layout_clause("gold_daily_revenue")}
+        AS {daily_revenue_select()}
+    """))
+elif AFFECTED_MONTHS:
+    daily_revenue_loads.append(DAG.add("gold_daily_revenue", f"""
+        MERGE INTO gold_daily_revenue g
+        USING ({daily_revenue_select(AFFECTED_SLICE_FILTER)}) u
+        ON g.transaction_date = u.transaction_date AND g.facility_id = u.facility_id
+        WHEN MATCHED THEN UPDATE SET *
+        WHEN NOT MATCHED THEN INSERT *
+    """))
+    # An affected slice with no silver rows left lost all its transactions to voids
+    remaining = " AND ".join(
+        f"NOT EXISTS (SELECT 1 FROM {table} s WHERE s.transaction_date = g.transaction_date AND s.facility_id = g.facility_id)"
+        for table in SILVER_FACTS
+    )
+    daily_revenue_loads.append(DAG.add("gold_daily_revenue", f"""
+        DELETE FROM gold_daily_revenue g
+        WHERE (g.transaction_date, g.facility_id) IN (SELECT transaction_date, facility_id FROM gold_affected_slices)
+        AND {remaining}
+    """))
+
+# The void watermark advances once gold_daily_revenue has applied the voids
+if not INCREMENTAL:
+    last_void = "(SELECT MAX(ingestion_timestamp) FROM silver_voided_transactions)" if VOIDS else "NULL"
+    DAG.add("gold_void_watermark", f"""
+        CREATE OR REPLACE TABLE gold_void_watermark AS
+        SELECT CAST({last_void} AS TIMESTAMP) as last_void_ingestion_timestamp
+    """, after=daily_revenue_loads)
+elif NEW_VOID_WATERMARK is not None:
+    DAG.add("gold_void_watermark", f"""
+        CREATE OR REPLACE TABLE gold_void_watermark AS
+        SELECT TIMESTAMP'{NEW_VOID_WATERMARK}' as last_void_ingestion_timestamp
+    """, after=daily_revenue_loads)
 
 # COMMAND ----------
 
@@ -80,29 +191,27 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE gold_monthly_partner_performance AS
-# MAGIC SELECT 
-# MAGIC     year,
-# MAGIC     month,
-# MAGIC     partner_name,
-# MAGIC     market,
-# MAGIC     SUM(ticket_revenue) as ticket_revenue,
-# MAGIC     SUM(fnb_revenue) as fnb_revenue,
-# MAGIC     SUM(retail_revenue) as retail_revenue,
-# MAGIC     SUM(total_revenue) as total_revenue,
-# MAGIC     SUM(total_visitors) as total_visitors,
-# MAGIC     SUM(repeat_visitors) as repeat_visitors,
-# MAGIC     ROUND(SUM(repeat_visitors) * 100.0 / NULLIF(SUM(total_visitors), 0), 2) as repeat_visit_rate,
-# MAGIC     ROUND(SUM(total_revenue) / NULLIF(SUM(total_visitors), 0), 2) as per_capita_total,
-# MAGIC     ROUND(SUM(fnb_revenue) / NULLIF(SUM(total_visitors), 0), 2) as per_capita_fnb,
-# MAGIC     ROUND(SUM(retail_revenue) / NULLIF(SUM(total_visitors), 0), 2) as per_capita_retail,
-# MAGIC     COUNT(DISTINCT facility_id) as facility_count
-# MAGIC FROM gold_daily_revenue
-# MAGIC GROUP BY year, month, partner_name, market
-# MAGIC ORDER BY year, month, partner_name;
-# MAGIC 
-# MAGIC SELECT 'gold_monthly_partner_performance' as table_name, COUNT(*) as row_count FROM gold_monthly_partner_performance;
+refresh_gold_table("gold_monthly_partner_performance", """
+SELECT 
+    year,
+    month,
+    partner_name,
+    market,
+    SUM(ticket_revenue) as ticket_revenue,
+    SUM(fnb_revenue) as fnb_revenue,
+    SUM(retail_revenue) as retail_revenue,
+    SUM(total_revenue) as total_revenue,
+    SUM(total_visitors) as total_visitors,
+    SUM(repeat_visitors) as repeat_visitors,
+    ROUND(SUM(repeat_visitors) * 100.0 / NULLIF(SUM(total_visitors), 0), 2) as repeat_visit_rate,
+    ROUND(SUM(total_revenue) / NULLIF(SUM(total_visitors), 0), 2) as per_capita_total,
+    ROUND(SUM(fnb_revenue) / NULLIF(SUM(total_visitors), 0), 2) as per_capita_fnb,
+    ROUND(SUM(retail_revenue) / NULLIF(SUM(total_visitors), 0), 2) as per_capita_retail,
+    COUNT(DISTINCT facility_id) as facility_count
+FROM gold_daily_revenue
+GROUP BY year, month, partner_name, market
+ORDER BY year, month, partner_name
+""")
 
 # COMMAND ----------
 
@@ -111,23 +220,21 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE gold_ip_performance AS
-# MAGIC SELECT 
-# MAGIC     ip_name,
-# MAGIC     market,
-# MAGIC     year,
-# MAGIC     month,
-# MAGIC     SUM(total_amount) as retail_revenue,
-# MAGIC     COUNT(*) as transactions,
-# MAGIC     SUM(quantity) as units_sold,
-# MAGIC     ROUND(AVG(unit_price), 2) as avg_unit_price,
-# MAGIC     COUNT(DISTINCT facility_id) as facilities_with_sales
-# MAGIC FROM silver_retail_sales
-# MAGIC GROUP BY ip_name, market, year, month
-# MAGIC ORDER BY year, month, retail_revenue DESC;
-# MAGIC 
-# MAGIC SELECT 'gold_ip_performance' as table_name, COUNT(*) as row_count FROM gold_ip_performance;
+refresh_gold_table("gold_ip_performance", """
+SELECT 
+    ip_name,
+    market,
+    year,
+    month,
+    SUM(total_amount) as retail_revenue,
+    COUNT(*) as transactions,
+    SUM(quantity) as units_sold,
+    ROUND(AVG(unit_price), 2) as avg_unit_price,
+    COUNT(DISTINCT facility_id) as facilities_with_sales
+FROM silver_retail_sales
+GROUP BY ip_name, market, year, month
+ORDER BY year, month, retail_revenue DESC
+""")
 
 # COMMAND ----------
 
@@ -136,24 +243,22 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE gold_fnb_item_performance AS
-# MAGIC SELECT 
-# MAGIC     item_name,
-# MAGIC     item_category,
-# MAGIC     market,
-# MAGIC     year,
-# MAGIC     month,
-# MAGIC     SUM(total_amount) as revenue,
-# MAGIC     COUNT(*) as transactions,
-# MAGIC     SUM(quantity) as units_sold,
-# MAGIC     ROUND(AVG(unit_price), 2) as avg_price,
-# MAGIC     COUNT(DISTINCT facility_id) as facilities_with_sales
-# MAGIC FROM silver_fnb_sales
-# MAGIC GROUP BY item_name, item_category, market, year, month
-# MAGIC ORDER BY year, month, revenue DESC;
-# MAGIC 
-# MAGIC SELECT 'gold_fnb_item_performance' as table_name, COUNT(*) as row_count FROM gold_fnb_item_performance;
+refresh_gold_table("gold_fnb_item_performance", """
+SELECT 
+    item_name,
+    item_category,
+    market,
+    year,
+    month,
+    SUM(total_amount) as revenue,
+    COUNT(*) as transactions,
+    SUM(quantity) as units_sold,
+    ROUND(AVG(unit_price), 2) as avg_price,
+    COUNT(DISTINCT facility_id) as facilities_with_sales
+FROM silver_fnb_sales
+GROUP BY item_name, item_category, market, year, month
+ORDER BY year, month, revenue DESC
+""")
 
 # COMMAND ----------
 
@@ -162,58 +267,162 @@
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC CREATE OR REPLACE TABLE gold_hourly_patterns AS
-# MAGIC SELECT 
-# MAGIC     facility_id,
-# MAGIC     facility_name,
-# MAGIC     partner_name,
-# MAGIC     market,
-# MAGIC     visit_hour,
-# MAGIC     DAYOFWEEK(transaction_date) as day_of_week,
-# MAGIC     CASE WHEN DAYOFWEEK(transaction_date) IN (1, 7) THEN 'Weekend' ELSE 'Weekday' END as day_type,
-# MAGIC     year,
-# MAGIC     month,
-# MAGIC     COUNT(*) as transactions,
-# MAGIC     SUM(quantity) as visitors,
-# MAGIC     SUM(total_amount) as revenue
-# MAGIC FROM silver_ticket_sales
-# MAGIC GROUP BY facility_id, facility_name, partner_name, market, visit_hour, 
-# MAGIC          DAYOFWEEK(transaction_date), year, month
-# MAGIC ORDER BY facility_id, visit_hour;
+refresh_gold_table("gold_hourly_patterns", """
+SELECT 
+    facility_id,
+    facility_name,
+    partner_name,
+    market,
+    visit_hour,
+    DAYOFWEEK(transaction_date) as day_of_week,
+    CASE WHEN DAYOFWEEK(transaction_date) IN (1, 7) THEN 'Weekend' ELSE 'Weekday' END as day_type,
+    year,
+    month,
+    COUNT(*) as transactions,
+    SUM(quantity) as visitors,
+    SUM(total_amount) as revenue
+FROM silver_ticket_sales
+GROUP BY facility_id, facility_name, partner_name, market, visit_hour, 
+         DAYOFWEEK(transaction_date), year, month
+ORDER BY facility_id, visit_hour
+""")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🧊 Gold 6: Revenue Rollup Cube
 # MAGIC 
-# MAGIC SELECT 'gold_hourly_patterns' as table_name, COUNT(*) as row_count FROM gold_hourly_patterns;
+# MAGIC One `GROUPING SETS` pass over `gold_daily_revenue` pre-aggregates every combination of date grain
+# MAGIC (day/week/month/quarter), geography (facility/partner/market) and revenue stream (ticket/fnb/retail/all).
+# MAGIC Rows carry additive measures (revenue, transactions, visitors, repeat_visitors), so ratio KPIs such as
+# MAGIC per-capita revenue are derived from sums, plus the merged customer sketch and its `unique_customers` estimate;
+# MAGIC see `revenue_cube.py`. Incremental runs replace just the periods that overlap the affected months.
+
+# COMMAND ----------
+
+if not INCREMENTAL or not spark.catalog.tableExists("gold_revenue_cube"):
+    DAG.add("gold_revenue_cube", f"""
+        CREATE OR REPLACE TABLE gold_revenue_cube {layout_clause("gold_revenue_cube")}
+        AS {revenue_cube_select()}
+    """)
+elif AFFECTED_MONTHS:
+    first_day, last_day = cube_source_range(AFFECTED_MONTHS)
+    predicate = affected_periods_predicate(AFFECTED_MONTHS)
+    DAG.add("gold_revenue_cube", f"""
+        INSERT INTO gold_revenue_cube REPLACE WHERE {predicate}
+        SELECT * FROM ({revenue_cube_select(f"transaction_date BETWEEN DATE'{first_day}' AND DATE'{last_day}'")})
+        WHERE {predicate}
+    """)
 
 # COMMAND ----------
 
 # MAGIC %md
-# MAGIC ## 🔮 Revenue Forecasting with AI_FORECAST
+# MAGIC ## 📣 Gold 7: Campaign Performance
+# MAGIC 
+# MAGIC Daily facility revenue and visitors attributed to the campaigns active that day (split evenly when campaigns
+# MAGIC overlap), one row per campaign and facility. Instead of a `BETWEEN` join of every silver transaction with the
+# MAGIC campaign windows, each campaign is expanded into its days and equi-joined with `gold_daily_revenue` at its
+# MAGIC `(transaction_date, facility_id)` grain; see `campaign_attribution.py` and `benchmark_campaign_attribution.py`.
+# MAGIC The table is small and rebuilt on every run.
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC -- Step 1: Create base table for forecasting (by partner)
-# MAGIC CREATE OR REPLACE TABLE gold_daily_revenue_ts AS
-# MAGIC SELECT 
-# MAGIC     transaction_date,
-# MAGIC     partner_name,
-# MAGIC     SUM(total_revenue) as total_revenue
-# MAGIC FROM gold_daily_revenue
-# MAGIC GROUP BY transaction_date, partner_name
-# MAGIC ORDER BY partner_name, transaction_date;
+if not INCREMENTAL or AFFECTED_MONTHS:
+    DAG.add("gold_campaign_performance", f"""
+        CREATE OR REPLACE TABLE gold_campaign_performance {layout_clause("gold_campaign_performance")}
+        AS {CAMPAIGN_PLANS["daily_grain"]()}
+    """)
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC -- Step 2: Generate 30-day forecast by partner
-# MAGIC CREATE OR REPLACE TABLE gold_revenue_forecast AS
-# MAGIC SELECT * FROM AI_FORECAST(
-# MAGIC     TABLE(gold_daily_revenue_ts),
-# MAGIC     horizon => DATE_ADD(CURRENT_DATE(), 30),
-# MAGIC     time_col => 'transaction_date',
-# MAGIC     value_col => 'total_revenue',
-# MAGIC     group_col => 'partner_name'
-# MAGIC );
+# MAGIC %md
+# MAGIC ## 🔮 Revenue Forecasting
+# MAGIC 
+# MAGIC 30-day forecasts with prediction intervals, per partner (`gold_revenue_forecast`) and per facility × revenue
+# MAGIC stream (`gold_facility_revenue_forecast`). `forecast_engine = ai_forecast` runs `AI_FORECAST` with the loads
+# MAGIC for the partner forecast; `local` fits weekly-seasonal Holt-Winters models to all series at once on the driver
+# MAGIC after the loads (`batch_forecaster.py`) and writes the same columns. The facility forecast, with the most
+# MAGIC series, is always fitted locally, so a refresh makes a single `AI_FORECAST` call.
+
+# COMMAND ----------
+
+# Step 1: Create base tables for forecasting (by partner, and by facility and revenue stream)
+refresh_gold_table("gold_daily_revenue_ts", """
+SELECT 
+    transaction_date,
+    partner_name,
+    SUM(total_revenue) as total_revenue
+FROM gold_daily_revenue
+GROUP BY transaction_date, partner_name
+ORDER BY partner_name, transaction_date
+""", year_col="YEAR(transaction_date)", month_col="MONTH(transaction_date)")
+
+refresh_gold_table("gold_facility_revenue_ts", " UNION ALL ".join(
+    f"SELECT transaction_date, facility_id, '{stream}' as revenue_stream, {stream}_revenue as revenue FROM gold_daily_revenue"
+    for stream in ["ticket", "fnb", "retail"]
+), year_col="YEAR(transaction_date)", month_col="MONTH(transaction_date)")
+
+# COMMAND ----------
+
+# Step 2: Generate the REMOTE_FORECASTS with AI_FORECAST (the local engine runs after the loads)
+for forecast_table in REMOTE_FORECASTS:
+    series_table, value_col, group_cols = FORECASTS[forecast_table]
+    group_col = ", ".join(f"'{column}'" for column in group_cols)
+    group_col = group_col if len(group_cols) == 1 else f"array({group_col})"
+    DAG.add(forecast_table, f"""
+    CREATE OR REPLACE TABLE {forecast_table} AS
+    SELECT * FROM AI_FORECAST(
+        TABLE({series_table}),
+        horizon => DATE_ADD(CURRENT_DATE(), 30),
+        time_col => 'transaction_date',
+        value_col => '{value_col}',
+        group_col => {group_col}
+    )
+    """)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## ⚡ Run the Loads
+# MAGIC 
+# MAGIC `gold_ip_performance`, `gold_fnb_item_performance` and `gold_hourly_patterns` read silver only and run
+# MAGIC alongside `gold_daily_revenue`; the monthly, cube, campaign, time-series and forecast tables follow it in dependency order.
+# MAGIC Forecasts not run by `AI_FORECAST` are fitted locally once the time-series tables are loaded.
+
+# COMMAND ----------
+
+loaded_tables = {node["table"] for node in DAG.run()}
+
+for forecast_table, (series_table, value_col, group_cols) in FORECASTS.items():
+    if forecast_table in REMOTE_FORECASTS:
+        continue
+    history = spark.table(series_table).toPandas()
+    forecast = batch_forecast(history, "transaction_date", value_col, group_cols, forecast_horizon(30))
+    spark.createDataFrame(forecast).createOrReplaceTempView(f"{forecast_table}_local")
+    METRICS.sql(forecast_table, f"CREATE OR REPLACE TABLE {forecast_table} AS SELECT * FROM {forecast_table}_local")
+    loaded_tables.add(forecast_table)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🧹 Table Maintenance
+# MAGIC 
+# MAGIC `OPTIMIZE` clusters the files written by this run on the layout keys and `ANALYZE` refreshes the column
+# MAGIC statistics used for data skipping and join planning. Incremental runs only maintain the tables they wrote.
+
+# COMMAND ----------
+
+if TABLE_MAINTENANCE == "run":
+    maintenance = {
+        table_name: maintenance_statements(table_name)
+        for table_name in sorted(loaded_tables & TABLE_LAYOUTS.keys())
+    }
+    for table_name, (optimize, _) in maintenance.items():
+        DAG.add(table_name, optimize)
+    DAG.run()
+    for _, analyze in maintenance.values():
+        spark.sql(analyze)
+    print(f"🧹 Optimized and analyzed: {', '.join(maintenance) or 'nothing'}")
 
 # COMMAND ----------
 
@@ -222,6 +431,10 @@
 
 # COMMAND ----------
 
+display(METRICS.flush())
+
+# COMMAND ----------
+
 # MAGIC %sql
 # MAGIC -- Display all tables created
 # MAGIC SHOW TABLES IN pedroz_catalog.entertainment_co;
@@ -240,9 +453,12 @@ print("""
    • gold_ip_performance
    • gold_fnb_item_performance
    • gold_hourly_patterns
+   • gold_revenue_cube
+   • gold_campaign_performance
 
 🔮 Forecasting:
    • gold_revenue_forecast
+   • gold_facility_revenue_forecast
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -273,7 +489,10 @@ Full Medallion Architecture:
    • gold_ip_performance
    • gold_fnb_item_performance
    • gold_hourly_patterns
+   • gold_revenue_cube
+   • gold_campaign_performance
    • gold_revenue_forecast
+   • gold_facility_revenue_forecast
 
 ✅ Ready for Genie Space and Dashboard creation!
 """)
@@ -0,0 +1,117 @@
+# Databricks notebook source
+# MAGIC %md
+# MAGIC # 🎯 Forecast Accuracy: Rolling-Origin Backtests
+# MAGIC 
+# MAGIC Measures how accurate the revenue forecasts are, for the monthly "Forecast accuracy" KPI. For every series
+# MAGIC behind the gold forecasts (per partner, and per facility × revenue stream) the batch Holt-Winters forecaster
+# MAGIC (`batch_forecaster.py`, the `forecast_engine = local` model of `3_load_gold_tables.py`) is refitted at many
+# MAGIC cutoff dates on the history up to each cutoff, and its forecasts of the next `horizon_days` days are compared
+# MAGIC with the actuals.
+# MAGIC 
+# MAGIC `gold_forecast_backtest` gets one row per series and horizon day (1 = the day after the cutoff) with
+# MAGIC MAPE, WAPE and the coverage of the prediction interval over all cutoffs; see `forecast_backtest.py`.
+# MAGIC 
+# MAGIC Every (cutoff, block of series) is an independent work unit, fanned out across a process pool of
+# MAGIC `parallel_workers` processes on the driver, so the runtime goes down with the number of cores.
+# MAGIC 
+# MAGIC **Prerequisites:** Run `3_load_gold_tables.py` first
+
+# COMMAND ----------
+
+# MAGIC %sql
+# MAGIC USE CATALOG pedroz_catalog;
+# MAGIC USE SCHEMA entertainment_co;
+
+# COMMAND ----------
+
+import os
+import time
+
+import pandas as pd
+from batch_forecaster import FORECASTS
+from forecast_backtest import backtest_frame
+from pipeline_metrics import PipelineMetrics
+
+dbutils.widgets.text("horizon_days", "30", "Forecast horizon (days)")
+HORIZON_DAYS = int(dbutils.widgets.get("horizon_days"))
+dbutils.widgets.text("min_history_days", "56", "History before the first cutoff (days)")
+MIN_HISTORY_DAYS = int(dbutils.widgets.get("min_history_days"))
+dbutils.widgets.text("cutoff_step_days", "7", "Days between cutoffs")
+CUTOFF_STEP_DAYS = int(dbutils.widgets.get("cutoff_step_days"))
+dbutils.widgets.text("parallel_workers", str(os.cpu_count()), "Parallel workers (1 = sequential)")
+PARALLEL_WORKERS = int(dbutils.widgets.get("parallel_workers"))
+# Shared by the bronze, silver, gold and backtest runs of one pipeline run (e.g. {{job.run_id}})
+dbutils.widgets.text("run_id", "", "Pipeline run id")
+METRICS = PipelineMetrics(spark, "backtest", dbutils.widgets.get("run_id"))
+
+GROUP_COLUMNS = list(dict.fromkeys(column for _, _, group_cols in FORECASTS.values() for column in group_cols))
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🔁 Run the Backtests
+
+# COMMAND ----------
+
+backtests = []
+for forecast_table, (series_table, value_col, group_cols) in FORECASTS.items():
+    start = time.perf_counter()
+    history = spark.table(series_table).toPandas()
+    backtest = backtest_frame(
+        history, "transaction_date", value_col, group_cols, HORIZON_DAYS, MIN_HISTORY_DAYS, CUTOFF_STEP_DAYS,
+        workers=PARALLEL_WORKERS,
+    )
+    if backtest.empty:
+        print(f"⚠️ {series_table}: less than {MIN_HISTORY_DAYS + HORIZON_DAYS} days of history - nothing to backtest")
+        continue
+    backtest.insert(0, "forecast_table", forecast_table)
+    backtests.append(backtest)
+    series = len(backtest) // HORIZON_DAYS
+    print(f"🔁 {forecast_table}: {series:,} series backtested from {backtest['first_cutoff'].iloc[0]} to "
+          f"{backtest['last_cutoff'].iloc[0]} in {time.perf_counter() - start:.1f}s with {PARALLEL_WORKERS} worker(s)")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 💾 Gold: Forecast Backtest Metrics
+
+# COMMAND ----------
+
+if backtests:
+    results = pd.concat(backtests, ignore_index=True)
+    # Group columns of the other forecasts are NULL; order the columns the same way for every run
+    results = results.reindex(columns=[
+        "forecast_table", *GROUP_COLUMNS, "horizon_days", "cutoffs", "first_cutoff", "last_cutoff",
+        "mape", "wape", "coverage", "interval_width",
+    ])
+    results[GROUP_COLUMNS] = results[GROUP_COLUMNS].astype(object).where(results[GROUP_COLUMNS].notna(), None)
+    spark.createDataFrame(results).createOrReplaceTempView("gold_forecast_backtest_local")
+    METRICS.sql("gold_forecast_backtest", """
+        CREATE OR REPLACE TABLE gold_forecast_backtest AS
+        SELECT * FROM gold_forecast_backtest_local
+    """)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## ✅ Forecast Accuracy Summary
+# MAGIC 
+# MAGIC Averages of the per-series metrics by horizon bucket.
+
+# COMMAND ----------
+
+if backtests:
+    display(spark.sql(f"""
+    SELECT
+        forecast_table,
+        CASE WHEN horizon_days <= 7 THEN '1-7 days' WHEN horizon_days <= 14 THEN '8-14 days' ELSE '15+ days' END as horizon,
+        COUNT(DISTINCT CONCAT_WS('|', {", ".join(GROUP_COLUMNS)})) as series,
+        ROUND(AVG(mape), 2) as avg_mape,
+        ROUND(AVG(wape), 2) as avg_wape,
+        ROUND(AVG(coverage), 3) as avg_coverage
+    FROM gold_forecast_backtest
+    GROUP BY ALL
+    ORDER BY forecast_table, MIN(horizon_days)
+    """))
+
+display(METRICS.flush())
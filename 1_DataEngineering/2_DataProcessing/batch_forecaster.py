@@ -0,0 +1,135 @@
+"""
+Batch Holt-Winters forecaster: a local alternative to AI_FORECAST for many daily series at once.
+
+Every series is a row of one (series x day) matrix and is fitted with additive Holt-Winters (ETS(A,Ad,A):
+level, damped trend and weekly seasonality) in its error-correction form. The recursion runs once over the
+days with NumPy operations across all series and all PARAMETER_GRID combinations together; each series then
+keeps the combination with the lowest one-step-ahead squared error. Thousands of series fit in seconds.
+
+Days without a row inside a series' span count as 0 (no sales); days before its first row are skipped. The
+prediction interval of step h is the forecast +/- z * sigma * sqrt(1 + sum_{j<h} c_j^2) with
+c_j = alpha + beta * (phi + ... + phi^j) + gamma * [j is a multiple of the season], sigma being the
+standard deviation of the series' one-step errors.
+
+batch_forecast() takes and returns the AI_FORECAST table shape: the time column, the group columns and
+<value>_forecast, <value>_upper and <value>_lower for every day after the history up to the horizon.
+FORECASTS lists the gold forecast tables and the series they are fitted to; forecast_backtest.py measures
+the forecaster's accuracy on them.
+"""
+
+import datetime
+import statistics
+
+import numpy as np
+import pandas as pd
+
+# Gold forecast table -> (series table, value column, group columns); the time column is transaction_date
+FORECASTS = {
+    "gold_revenue_forecast": ("gold_daily_revenue_ts", "total_revenue", ["partner_name"]),
+    "gold_facility_revenue_forecast": ("gold_facility_revenue_ts", "revenue", ["facility_id", "revenue_stream"]),
+}
+
+SEASON = 7  # weekly seasonality of daily series
+DAMPING = 0.98  # trend damping (phi), keeps long horizons from extrapolating a trend indefinitely
+
+# (alpha, beta, gamma) combinations tried for every series, within alpha > beta >= 0, 0 < gamma < 1 - alpha
+PARAMETER_GRID = np.array([
+    (alpha, beta_share * alpha, gamma_share * (1 - alpha))
+    for alpha in (0.05, 0.2, 0.5)
+    for beta_share in (0.0, 0.1)
+    for gamma_share in (0.05, 0.2, 0.4)
+])
+
+
+def series_matrix(history, time_col, value_col, group_cols):
+    """(keys, days, values): the group keys, the daily dates and the (series x day) matrix of a long table"""
+    history = history.assign(**{time_col: pd.to_datetime(history[time_col])})
+    matrix = history.pivot_table(index=group_cols, columns=time_col, values=value_col, aggfunc="sum")
+    days = pd.date_range(matrix.columns.min(), matrix.columns.max(), freq="D")
+    values = matrix.reindex(columns=days).to_numpy(dtype=float)
+    started = np.maximum.accumulate(~np.isnan(values), axis=1)
+    return matrix.index, days, np.where(started & np.isnan(values), 0.0, values)
+
+
+def initial_states(values, season=SEASON):
+    """Level, trend and seasonal states (by day index modulo season) from each series' first two seasons"""
+    series, days = values.shape
+    first = np.argmax(~np.isnan(values), axis=1)
+    offsets = first[:, None] + np.arange(2 * season)
+    window = np.take_along_axis(values, np.minimum(offsets, days - 1), axis=1)
+    window[offsets >= days] = np.nan
+    first_season, second_season = window[:, :season], window[:, season:]
+    with np.errstate(all="ignore"):
+        level = np.nan_to_num(np.nanmean(first_season, axis=1))
+        trend = np.nan_to_num((np.nanmean(second_season, axis=1) - level) / season)
+    seasonal = np.zeros((series, season))
+    np.put_along_axis(seasonal, offsets[:, :season] % season, np.nan_to_num(first_season - level[:, None]), axis=1)
+    return level, trend, seasonal
+
+
+def fit_holt_winters(values, season=SEASON, damping=DAMPING, grid=PARAMETER_GRID):
+    """
+    Final states and parameters of every series after the best grid combination has run over its history.
+
+    Returns level, trend, seasonal (series x season), parameters (series x 3) and sigma, the standard
+    deviation of the chosen combination's one-step errors.
+    """
+    level, trend, seasonal = initial_states(values, season)
+    combos = len(grid)
+    alpha, beta, gamma = (grid[:, [k]] for k in range(3))  # (combos x 1), broadcast over the series
+    level = np.repeat(level[None], combos, axis=0)
+    trend = np.repeat(trend[None], combos, axis=0)
+    seasonal = np.repeat(seasonal[None], combos, axis=0)
+    sse = np.zeros(level.shape)
+    for day in range(values.shape[1]):
+        observed = ~np.isnan(values[:, day])
+        phase = day % season
+        error = np.where(observed, values[:, day] - (level + damping * trend + seasonal[:, :, phase]), 0.0)
+        sse += error**2
+        level = np.where(observed, level + damping * trend + alpha * error, level)
+        trend = np.where(observed, damping * trend + beta * error, trend)
+        seasonal[:, :, phase] += gamma * error
+    best = np.argmin(sse, axis=0)
+    series = np.arange(values.shape[0])
+    # seasonal states are rolled so that column 0 is the phase of the first day after the history
+    seasonal = np.roll(seasonal[best, series], -(values.shape[1] % season), axis=1)
+    observations = np.maximum((~np.isnan(values)).sum(axis=1), 1)
+    sigma = np.sqrt(sse[best, series] / observations)
+    return level[best, series], trend[best, series], seasonal, grid[best], sigma
+
+
+def holt_winters_forecast(values, steps, season=SEASON, damping=DAMPING, interval_width=0.95):
+    """(forecast, lower, upper) matrices (series x steps) for the days after a (series x day) history matrix"""
+    level, trend, seasonal, parameters, sigma = fit_holt_winters(values, season, damping)
+    horizon = np.arange(1, steps + 1)
+    damped_sum = np.cumsum(damping ** horizon)  # phi + ... + phi^h
+    forecast = level[:, None] + damped_sum * trend[:, None] + seasonal[:, (horizon - 1) % season]
+    alpha, beta, gamma = (parameters[:, [k]] for k in range(3))
+    weights = alpha + beta * damped_sum[:-1] + gamma * (horizon[:-1] % season == 0)  # c_1 ... c_{steps-1}
+    spread = sigma[:, None] * np.sqrt(1 + np.concatenate([np.zeros((len(sigma), 1)), np.cumsum(weights**2, axis=1)], axis=1))
+    z = statistics.NormalDist().inv_cdf(0.5 + interval_width / 2)
+    return forecast, forecast - z * spread, forecast + z * spread
+
+
+def batch_forecast(history, time_col, value_col, group_cols, horizon, interval_width=0.95):
+    """AI_FORECAST-shaped forecast of every group of a long table, for each day after its history up to horizon"""
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols or [])
+    if not group_cols:
+        history = history.assign(_series=0)
+    keys, days, values = series_matrix(history, time_col, value_col, group_cols or ["_series"])
+    dates = pd.date_range(days[-1] + pd.Timedelta(days=1), pd.Timestamp(horizon), freq="D")
+    if not len(dates):
+        return pd.DataFrame()
+    forecast, lower, upper = holt_winters_forecast(values, len(dates), interval_width=interval_width)
+    result = pd.DataFrame({time_col: np.tile(dates.date, len(keys))})
+    for column in group_cols:
+        result[column] = np.repeat(keys.get_level_values(column), len(dates))
+    result[f"{value_col}_forecast"] = forecast.ravel()
+    result[f"{value_col}_upper"] = upper.ravel()
+    result[f"{value_col}_lower"] = lower.ravel()
+    return result
+
+
+def forecast_horizon(days=30, today=None):
+    """Last forecast day, DATE_ADD(CURRENT_DATE(), days) like the AI_FORECAST horizon"""
+    return (today or datetime.date.today()) + datetime.timedelta(days=days)
@@ -0,0 +1,118 @@
+# Databricks notebook source
+# MAGIC %md
+# MAGIC # ⏱️ Benchmark: Campaign Attribution Plans
+# MAGIC 
+# MAGIC Compares the plans for `gold_campaign_performance` defined in `campaign_attribution.py`:
+# MAGIC - `daily_grain` — each campaign expanded into its days and equi-joined with `gold_daily_revenue` (the gold load's plan)
+# MAGIC - `range_hint` — `transaction_date BETWEEN start_date AND end_date` against the silver facts, with a `RANGE_JOIN` hint
+# MAGIC - `naive` — the same `BETWEEN` join without the hint
+# MAGIC 
+# MAGIC For each data volume multiplier it reports the runtime (median of `runs`) and checks every plan against
+# MAGIC `daily_grain`: the same `(campaign_id, facility_id)` rows, with revenue and visitors matching to the cent
+# MAGIC (when campaigns overlap, a split day's share can round differently). Larger volumes replicate every silver row
+# MAGIC `N` times with the copy number appended to `transaction_id`; the `gold_daily_revenue` they need is built into a
+# MAGIC scratch table beforehand, as the gold load builds it before the campaign table, and dropped at the end.
+# MAGIC 
+# MAGIC **Prerequisites:** Run `2_load_silver_tables.py` and `3_load_gold_tables.py` first.
+
+# COMMAND ----------
+
+# MAGIC %sql
+# MAGIC USE CATALOG pedroz_catalog;
+# MAGIC USE SCHEMA entertainment_co;
+
+# COMMAND ----------
+
+import statistics
+import time
+
+import pandas as pd
+from campaign_attribution import CAMPAIGN_PLANS
+from gold_queries import DAILY_REVENUE_PLANS, SILVER_SOURCES
+
+dbutils.widgets.text("volume_multipliers", "1,10", "Data volume multipliers")
+VOLUME_MULTIPLIERS = [int(m) for m in dbutils.widgets.get("volume_multipliers").split(",")]
+dbutils.widgets.text("runs", "3", "Timed runs per plan")
+RUNS = int(dbutils.widgets.get("runs"))
+
+MEASURES = ["ticket_revenue", "fnb_revenue", "retail_revenue", "total_revenue", "visitors"]
+
+def scaled_sources(multiplier):
+    """Silver sources with every row repeated `multiplier` times as new transactions (temp views above 1x)"""
+    if multiplier == 1:
+        return SILVER_SOURCES
+    sources = {}
+    for stream, table in SILVER_SOURCES.items():
+        view = f"bench_{table}_transactions_x{multiplier}"
+        spark.sql(f"""
+            CREATE OR REPLACE TEMP VIEW {view} AS
+            SELECT s.* EXCEPT (transaction_id), CONCAT(s.transaction_id, '#', CAST(copies.copy AS STRING)) as transaction_id
+            FROM {table} s CROSS JOIN range({multiplier}) copies(copy)
+        """)
+        sources[stream] = view
+    return sources
+
+def plan_differences(sql, reference_sql):
+    """Rows only one plan has, and the largest measure difference of the rows both have"""
+    keys = " AND ".join(f"p.{column} = r.{column}" for column in ["campaign_id", "facility_id"])
+    largest = ", ".join(f"ABS(p.{measure} - r.{measure})" for measure in MEASURES)
+    return spark.sql(f"""
+        SELECT
+            COUNT_IF(p.campaign_id IS NULL OR r.campaign_id IS NULL) as unmatched_rows,
+            COALESCE(MAX(GREATEST({largest})), 0) as max_difference
+        FROM ({sql}) p FULL OUTER JOIN ({reference_sql}) r ON {keys}
+    """).first()
+
+def timed_run(sql):
+    """Execute the full query without writing its output and return the elapsed seconds"""
+    start = time.perf_counter()
+    spark.sql(sql).write.format("noop").mode("overwrite").save()
+    return time.perf_counter() - start
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🏁 Run the Benchmark
+
+# COMMAND ----------
+
+results = []
+for multiplier in VOLUME_MULTIPLIERS:
+    sources = scaled_sources(multiplier)
+    daily_revenue = "gold_daily_revenue"
+    if multiplier > 1:
+        daily_revenue = f"bench_gold_campaign_daily_revenue_x{multiplier}"
+        spark.sql(f"CREATE OR REPLACE TABLE {daily_revenue} AS {DAILY_REVENUE_PLANS['union'](sources=sources)}")
+    queries = {
+        plan: build(daily_revenue=daily_revenue) if plan == "daily_grain" else build(sources=sources)
+        for plan, build in CAMPAIGN_PLANS.items()
+    }
+
+    for plan, sql in queries.items():
+        differences = plan_differences(sql, queries["daily_grain"])
+        identical = differences.unmatched_rows == 0 and differences.max_difference <= 0.01
+        timings = [timed_run(sql) for _ in range(RUNS)]
+        results.append({
+            "volume": f"{multiplier}x",
+            "plan": plan,
+            "median_s": round(statistics.median(timings), 2),
+            "min_s": round(min(timings), 2),
+            "unmatched_rows": differences.unmatched_rows,
+            "max_difference": float(differences.max_difference),
+            "identical": identical,
+        })
+        print(f"{'✅' if identical else '❌'} {multiplier}x {plan}: {results[-1]['median_s']}s median over {RUNS} runs")
+
+    if multiplier > 1:
+        spark.sql(f"DROP TABLE IF EXISTS {daily_revenue}")
+
+# COMMAND ----------
+
+results_df = pd.DataFrame(results)
+display(results_df)
+
+for volume, group in results_df.groupby("volume", sort=False):
+    by_plan = group.set_index("plan")
+    print(f"🚀 {volume}: daily_grain runs in {by_plan.loc['daily_grain', 'median_s'] / by_plan.loc['naive', 'median_s']:.0%} "
+          f"and range_hint in {by_plan.loc['range_hint', 'median_s'] / by_plan.loc['naive', 'median_s']:.0%} "
+          f"of the naive BETWEEN join's time")
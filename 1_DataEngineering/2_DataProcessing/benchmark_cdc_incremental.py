@@ -0,0 +1,171 @@
+"""
+Benchmark and validate the incremental bronze/silver/gold loads under change data feed churn, run locally.
+
+The generator's snapshot is loaded in full, then for every CDC batch (generation_mode = cdc: late inserts,
+updates, duplicates of sent rows and voids, at `--change-rate` of the snapshot's rows per partner-month)
+the batch files are generated and bronze, silver and gold are loaded with load_mode = incremental. Each
+incremental stage records its wall time, and bronze and silver the fact rows of their layer.
+
+After the last batch the incremental silver and gold tables are copied aside and rebuilt in full twice:
+- "silver_gold": silver and gold from the same bronze tables
+- "bronze_silver_gold": bronze too, from all snapshot and change files in one load, so every version of a
+  transaction gets the same ingestion timestamp and silver has to order them by change_batch
+Every table must hold the same rows as its incremental copy (EXCEPT ALL in both directions), ignoring the
+ingestion timestamp columns and the binary customer sketches, which depend on load order; a table that differs
+makes the script exit with status 1.
+
+Example:
+    python benchmark_cdc_incremental.py --scale-factor 0.05 --batches 3 --change-rate 0.02
+    python benchmark_cdc_incremental.py --root /tmp/cdc_bench --param forecast_engine=local --output cdc_results.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from local_engine import LocalSparkSession
+from run_local_pipeline import run_notebook
+
+INCREMENTAL_STAGES = ["bronze", "silver", "gold"]
+FACT_LAYERS = ["bronze", "silver"]  # layers with <layer>_*_sales tables
+INCREMENTAL_COPY_PREFIX = "cdc_incremental_"
+# Full rebuild -> stages rebuilt in full after the incremental batches
+FULL_REBUILDS = {
+    "silver_gold": ["silver", "gold"],
+    "bronze_silver_gold": ["bronze", "silver", "gold"],
+}
+
+
+def layer_tables(session, *layers):
+    """Names of the tables of the current schema in the given layers"""
+    return [
+        row.table_name
+        for row in session.sql("""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_catalog = current_database() AND table_schema = current_schema()
+            ORDER BY table_name
+        """).collect()
+        if row.table_name.split("_", 1)[0] in layers
+    ]
+
+
+def fact_rows(session, layer):
+    """Rows in the <layer>_*_sales tables"""
+    return sum(
+        session.sql(f"SELECT COUNT(*) as row_count FROM {table}").first().row_count
+        for table in layer_tables(session, layer) if table.endswith("_sales")
+    )
+
+
+def compared_columns(session, table):
+    """Columns that must match between an incremental and a full load of a table"""
+    return [
+        row.column_name
+        for row in session.sql(f"""
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_catalog = current_database() AND table_schema = current_schema() AND table_name = '{table}'
+            ORDER BY ordinal_position
+        """).collect()
+        if not row.column_name.endswith("ingestion_timestamp") and row.data_type not in ("BLOB", "BINARY")
+    ]
+
+
+def table_differences(session, table, reference):
+    """(rows only in table, rows only in reference) over the compared columns"""
+    columns = ", ".join(compared_columns(session, reference))
+    return tuple(
+        session.sql(f"SELECT COUNT(*) as row_count FROM (SELECT {columns} FROM {a} EXCEPT ALL SELECT {columns} FROM {b})").first().row_count
+        for a, b in [(table, reference), (reference, table)]
+    )
+
+
+def run_stage(session, stage, params, root, verbose=False):
+    """Run one notebook on the shared session and return its wall time in seconds"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else open(os.devnull, "w")):
+        run_notebook(stage, session, params, root)
+    return time.perf_counter() - start
+
+
+def run_cdc_benchmark(root, batches, change_rate, params, verbose=False):
+    """Timings of the full load and every incremental batch, and the differences of every silver and gold table
+    with each full rebuild"""
+    session = LocalSparkSession(root)
+    timings = []
+    for stage in ["generate", *INCREMENTAL_STAGES]:
+        seconds = run_stage(session, stage, params, root, verbose)
+        timings.append({"batch": 0, "stage": stage, "mode": "full", "wall_s": round(seconds, 3)})
+        print(f"📦 snapshot {stage:<8} {seconds:>7.2f}s")
+
+    for batch in range(1, batches + 1):
+        cdc = {**params, "generation_mode": "cdc", "cdc_batch": str(batch), "cdc_change_rate": str(change_rate)}
+        run_stage(session, "generate", cdc, root, verbose)
+        for stage in INCREMENTAL_STAGES:
+            seconds = run_stage(session, stage, {**params, "load_mode": "incremental"}, root, verbose)
+            timing = {"batch": batch, "stage": stage, "mode": "incremental", "wall_s": round(seconds, 3)}
+            if stage in FACT_LAYERS:
+                timing["fact_rows"] = fact_rows(session, stage)
+            timings.append(timing)
+            rows = f"  {timing['fact_rows']:,} fact rows" if stage in FACT_LAYERS else ""
+            print(f"🔁 batch {batch} {stage:<8} {seconds:>7.2f}s{rows}")
+
+    # Tables with only load-order dependent columns (e.g. gold_void_watermark) have nothing to compare
+    tables = [table for table in layer_tables(session, "silver", "gold") if compared_columns(session, table)]
+    for table in tables:
+        session.sql(f"CREATE OR REPLACE TABLE {INCREMENTAL_COPY_PREFIX}{table} AS SELECT * FROM {table}")
+    differences = {}
+    for rebuild, stages in FULL_REBUILDS.items():
+        for stage in stages:
+            seconds = run_stage(session, stage, {**params, "load_mode": "full"}, root, verbose)
+            timings.append({"batch": batches, "stage": stage, "mode": f"full_rebuild_{rebuild}", "wall_s": round(seconds, 3)})
+            print(f"🔄 rebuild {rebuild} {stage:<8} {seconds:>7.2f}s")
+        differences[rebuild] = {
+            table: table_differences(session, f"{INCREMENTAL_COPY_PREFIX}{table}", table) for table in tables
+        }
+    for table in tables:
+        session.sql(f"DROP TABLE {INCREMENTAL_COPY_PREFIX}{table}")
+    return timings, differences
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark and validate incremental loads of CDC batches locally")
+    parser.add_argument("--root", help="Pipeline root directory, emptied first (default: a temporary directory)")
+    parser.add_argument("--scale-factor", default="0.05", help="Generator scale factor (x 170K rows per file)")
+    parser.add_argument("--batches", type=int, default=3, help="CDC batches generated and loaded incrementally")
+    parser.add_argument("--change-rate", type=float, default=0.02, help="Changed rows per batch, as a share of the snapshot")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="Notebook widget value applied to every run, e.g. forecast_engine=local (repeatable)")
+    parser.add_argument("--output", help="Write the timings and differences to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the notebooks' output")
+    args = parser.parse_args(argv)
+    args.params = {"scale_factor": args.scale_factor, **dict(param.split("=", 1) for param in args.param)}
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    root = os.path.abspath(args.root) if args.root else tempfile.mkdtemp(prefix="cdc_bench_")
+    shutil.rmtree(root, ignore_errors=True)
+    try:
+        timings, differences = run_cdc_benchmark(root, args.batches, args.change_rate, args.params, args.verbose)
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+    for rebuild, tables in differences.items():
+        print(f"\n🧪 Incremental vs full rebuild of {', '.join(FULL_REBUILDS[rebuild])}:")
+        for table, (only_incremental, only_full) in tables.items():
+            identical = only_incremental == only_full == 0
+            print(f"   {'✅' if identical else '❌'} {table:<40} {only_incremental:,} rows only incremental, {only_full:,} only full")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"params": args.params, "batches": args.batches, "change_rate": args.change_rate,
+                       "timings": timings, "differences": differences}, output, indent=2)
+        print(f"📄 Results written to {args.output}")
+    if any(sum(counts) for tables in differences.values() for counts in tables.values()):
+        sys.exit(1)
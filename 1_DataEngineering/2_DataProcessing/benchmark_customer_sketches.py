@@ -0,0 +1,122 @@
+# Databricks notebook source
+# MAGIC %md
+# MAGIC # ⏱️ Benchmark: Customer Sketch Accuracy
+# MAGIC 
+# MAGIC Compares the unique-customer estimates merged from the `gold_daily_revenue` HyperLogLog sketches
+# MAGIC (`customer_sketches.py`) with exact `COUNT(DISTINCT customer_id)` results over silver, at the groupings
+# MAGIC dashboards and Genie ask for: day and week by facility, month by partner and market, quarter by market.
+# MAGIC 
+# MAGIC For each data volume multiplier it reports, per grouping, the number of groups, the mean exact count, the
+# MAGIC median / p95 / max relative error of the estimates and the time of the exact and the sketch query. Larger
+# MAGIC volumes replicate every silver row `N` times with the copy number appended to `customer_id`, so each copy
+# MAGIC brings new customers and distinct counts grow with the volume; their sketches are built into a scratch
+# MAGIC table, which is dropped at the end. 1x reads `gold_daily_revenue` itself.
+# MAGIC 
+# MAGIC **Prerequisites:** Run `2_load_silver_tables.py` and `3_load_gold_tables.py` first.
+
+# COMMAND ----------
+
+# MAGIC %sql
+# MAGIC USE CATALOG pedroz_catalog;
+# MAGIC USE SCHEMA entertainment_co;
+
+# COMMAND ----------
+
+import time
+
+import pandas as pd
+from customer_sketches import unique_customers_select
+from gold_queries import DAILY_REVENUE_PLANS, SILVER_SOURCES
+from revenue_cube import DATE_GRAINS
+
+dbutils.widgets.text("volume_multipliers", "1,10", "Data volume multipliers")
+VOLUME_MULTIPLIERS = [int(m) for m in dbutils.widgets.get("volume_multipliers").split(",")]
+
+# Grouping name -> (period expression, geography column)
+GROUPINGS = {
+    "day x facility": (DATE_GRAINS["day"], "facility_id"),
+    "week x facility": (DATE_GRAINS["week"], "facility_id"),
+    "month x partner": (DATE_GRAINS["month"], "partner_name"),
+    "month x market": (DATE_GRAINS["month"], "market"),
+    "quarter x market": (DATE_GRAINS["quarter"], "market"),
+}
+
+def scaled_sources(multiplier):
+    """Silver sources with every row repeated `multiplier` times as new customers (temp views above 1x)"""
+    if multiplier == 1:
+        return SILVER_SOURCES
+    sources = {}
+    for stream, table in SILVER_SOURCES.items():
+        view = f"bench_{table}_customers_x{multiplier}"
+        spark.sql(f"""
+            CREATE OR REPLACE TEMP VIEW {view} AS
+            SELECT s.* EXCEPT (customer_id), CONCAT(s.customer_id, '#', CAST(copies.copy AS STRING)) as customer_id
+            FROM {table} s CROSS JOIN range({multiplier}) copies(copy)
+        """)
+        sources[stream] = view
+    return sources
+
+def exact_select(sources, period, geography):
+    """Exact distinct customers of all streams per (period_start, geography)"""
+    customers = " UNION ALL ".join(
+        f"SELECT transaction_date, {geography}, customer_id FROM {table}" for table in sources.values()
+    )
+    return f"""
+    SELECT {period} as period_start, {geography} as geography, COUNT(DISTINCT customer_id) as exact_customers
+    FROM ({customers}) customers
+    GROUP BY ALL
+    """
+
+def timed_pandas(sql):
+    """Query result as pandas and the elapsed seconds"""
+    start = time.perf_counter()
+    result = spark.sql(sql).toPandas()
+    return result, time.perf_counter() - start
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🏁 Run the Benchmark
+
+# COMMAND ----------
+
+results = []
+for multiplier in VOLUME_MULTIPLIERS:
+    sources = scaled_sources(multiplier)
+    gold = "gold_daily_revenue"
+    if multiplier > 1:
+        gold = f"bench_gold_customer_sketches_x{multiplier}"
+        spark.sql(f"CREATE OR REPLACE TABLE {gold} AS {DAILY_REVENUE_PLANS['union'](sources=sources)}")
+
+    for grouping, (period, geography) in GROUPINGS.items():
+        exact, exact_s = timed_pandas(exact_select(sources, period, geography))
+        estimated, sketch_s = timed_pandas(
+            unique_customers_select([f"{period} as period_start", f"{geography} as geography"], source=gold)
+        )
+        compared = exact.merge(estimated, on=["period_start", "geography"], how="left")
+        error = ((compared["unique_customers"] - compared["exact_customers"]) / compared["exact_customers"]).abs()
+        results.append({
+            "volume": f"{multiplier}x",
+            "grouping": grouping,
+            "groups": len(compared),
+            "mean_exact": round(compared["exact_customers"].mean()),
+            "median_error_pct": round(100 * error.median(), 2),
+            "p95_error_pct": round(100 * error.quantile(0.95), 2),
+            "max_error_pct": round(100 * error.max(), 2),
+            "exact_s": round(exact_s, 2),
+            "sketch_s": round(sketch_s, 2),
+        })
+        print(f"🎯 {multiplier}x {grouping}: median error {results[-1]['median_error_pct']}%, "
+              f"p95 {results[-1]['p95_error_pct']}% over {len(compared):,} groups")
+
+    if multiplier > 1:
+        spark.sql(f"DROP TABLE IF EXISTS {gold}")
+
+# COMMAND ----------
+
+results_df = pd.DataFrame(results)
+display(results_df)
+
+for volume, group in results_df.groupby("volume", sort=False):
+    print(f"📏 {volume}: p95 relative error {group['p95_error_pct'].min()}-{group['p95_error_pct'].max()}% across groupings, "
+          f"sketch queries in {group['sketch_s'].sum() / group['exact_s'].sum():.0%} of the exact queries' time")
@@ -0,0 +1,129 @@
+# Databricks notebook source
+# MAGIC %md
+# MAGIC # ⏱️ Benchmark: gold_daily_revenue Plans
+# MAGIC 
+# MAGIC Compares the two physical plans for `gold_daily_revenue` defined in `gold_queries.py`:
+# MAGIC - `join` — three per-stream aggregates stitched together with `FULL OUTER JOIN`s on `COALESCE(...)` keys
+# MAGIC - `union` — `UNION ALL` of the tagged streams and one grouped aggregation with per-stream `FILTER` sums
+# MAGIC 
+# MAGIC For each data volume multiplier it reports the runtime (median of `runs`), the number of shuffle
+# MAGIC `Exchange`s in the physical plan and the shuffle bytes written, and checks that both plans return
+# MAGIC identical rows. Customer sketches are compared by their estimates, as their binary layout can depend on row
+# MAGIC order; a slice without rows of a stream must have a NULL sketch in both plans. Larger volumes
+# MAGIC replicate every silver row `N` times, which keeps the `(transaction_date, facility_id)` grain of the output
+# MAGIC and scales the rows behind each slice, like the generator's `scale_factor`.
+# MAGIC 
+# MAGIC **Prerequisites:** Run `2_load_silver_tables.py` first. Shuffle bytes come from the Spark UI REST API
+# MAGIC and show as empty where it is not reachable (e.g. serverless compute).
+
+# COMMAND ----------
+
+# MAGIC %sql
+# MAGIC USE CATALOG pedroz_catalog;
+# MAGIC USE SCHEMA entertainment_co;
+
+# COMMAND ----------
+
+import json
+import re
+import statistics
+import time
+from urllib.request import urlopen
+
+import pandas as pd
+from customer_sketches import CUSTOMER_SKETCHES
+from gold_queries import DAILY_REVENUE_PLANS, SILVER_SOURCES
+
+dbutils.widgets.text("volume_multipliers", "1,10", "Data volume multipliers")
+VOLUME_MULTIPLIERS = [int(m) for m in dbutils.widgets.get("volume_multipliers").split(",")]
+dbutils.widgets.text("runs", "3", "Timed runs per plan")
+RUNS = int(dbutils.widgets.get("runs"))
+
+def scaled_sources(multiplier):
+    """Silver sources with every row repeated `multiplier` times (temp views above 1x)"""
+    if multiplier == 1:
+        return SILVER_SOURCES
+    sources = {}
+    for stream, table in SILVER_SOURCES.items():
+        view = f"bench_{table}_x{multiplier}"
+        spark.sql(f"CREATE OR REPLACE TEMP VIEW {view} AS SELECT s.* FROM {table} s CROSS JOIN range({multiplier})")
+        sources[stream] = view
+    return sources
+
+def comparable(sql):
+    """Rows of a plan with each customer sketch replaced by its estimate (NULL for no sketch)"""
+    estimates = ", ".join(f"hll_sketch_estimate({column}) as {column}" for column in CUSTOMER_SKETCHES.values())
+    return f"SELECT * EXCEPT ({', '.join(CUSTOMER_SKETCHES.values())}), {estimates} FROM ({sql})"
+
+def shuffle_exchanges(sql):
+    """Number of shuffle Exchange operators in the physical plan"""
+    plan = spark.sql(f"EXPLAIN FORMATTED {sql}").first()[0]
+    return len(re.findall(r"^\(\d+\) Exchange", plan, flags=re.MULTILINE))
+
+def shuffle_write_bytes(job_group):
+    """Shuffle bytes written by a job group's stages, or None if the Spark UI REST API is unavailable"""
+    try:
+        sc = spark.sparkContext
+        api = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}"
+        jobs = json.load(urlopen(f"{api}/jobs"))
+        stage_ids = {stage_id for job in jobs if job.get("jobGroup") == job_group for stage_id in job["stageIds"]}
+        stages = json.load(urlopen(f"{api}/stages"))
+        return sum(stage["shuffleWriteBytes"] for stage in stages if stage["stageId"] in stage_ids)
+    except Exception:
+        return None
+
+def timed_run(sql, job_group):
+    """Execute the full query without writing its output and return the elapsed seconds"""
+    try:
+        spark.sparkContext.setJobGroup(job_group, job_group)
+    except Exception:
+        pass
+    start = time.perf_counter()
+    spark.sql(sql).write.format("noop").mode("overwrite").save()
+    return time.perf_counter() - start
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🏁 Run the Benchmark
+
+# COMMAND ----------
+
+results = []
+for multiplier in VOLUME_MULTIPLIERS:
+    sources = scaled_sources(multiplier)
+    queries = {plan: build(sources=sources) for plan, build in DAILY_REVENUE_PLANS.items()}
+
+    # Identical results: same schema and no rows in either EXCEPT ALL direction
+    union_sql, join_sql = comparable(queries["union"]), comparable(queries["join"])
+    same_schema = spark.sql(union_sql).schema == spark.sql(join_sql).schema
+    diff_rows = spark.sql(f"""
+        SELECT (SELECT COUNT(*) FROM (({union_sql}) EXCEPT ALL ({join_sql})))
+             + (SELECT COUNT(*) FROM (({join_sql}) EXCEPT ALL ({union_sql}))) as diff_rows
+    """).first().diff_rows
+    print(f"{'✅' if same_schema and diff_rows == 0 else '❌'} {multiplier}x: schemas match={same_schema}, differing rows={diff_rows}")
+
+    for plan, sql in queries.items():
+        timings = [timed_run(sql, f"bench_daily_revenue_{plan}_x{multiplier}_{run}") for run in range(RUNS)]
+        shuffle_bytes = shuffle_write_bytes(f"bench_daily_revenue_{plan}_x{multiplier}_{RUNS - 1}")
+        results.append({
+            "volume": f"{multiplier}x",
+            "plan": plan,
+            "median_s": round(statistics.median(timings), 2),
+            "min_s": round(min(timings), 2),
+            "shuffle_exchanges": shuffle_exchanges(sql),
+            "shuffle_mb": None if shuffle_bytes is None else round(shuffle_bytes / 1024**2, 2),
+            "identical": same_schema and diff_rows == 0,
+        })
+        print(f"⏱️ {multiplier}x {plan}: {results[-1]['median_s']}s median over {RUNS} runs")
+
+# COMMAND ----------
+
+results_df = pd.DataFrame(results)
+display(results_df)
+
+for volume, group in results_df.groupby("volume", sort=False):
+    by_plan = group.set_index("plan")
+    print(f"🚀 {volume}: union plan runs in {by_plan.loc['union', 'median_s'] / by_plan.loc['join', 'median_s']:.0%} "
+          f"of the join plan's time with {by_plan.loc['union', 'shuffle_exchanges']} vs "
+          f"{by_plan.loc['join', 'shuffle_exchanges']} shuffle exchanges")
@@ -0,0 +1,209 @@
+"""
+End-to-end benchmark of the generator and the medallion stages at several scale factors, run locally.
+
+For every scale factor (multiples of the generator's 170K rows per file) the pipeline is run from scratch
+in a fresh directory, one stage per child process so peak RSS is per stage:
+- generate: generate_synthetic_csv_data.py (generate_ticket_sales / _fnb_sales / _retail_sales + writes)
+- bronze, silver, gold: the three ETL notebooks on the local DuckDB engine (run_local_pipeline.py)
+
+Each stage records wall time, peak RSS, fact rows read and written, rows/sec (rows read, or rows generated
+for the generator) and output bytes (growth of the files and catalog databases under the root). Results
+are written as JSON and compared with a stored baseline: a stage that is slower, or peaks higher, than the
+baseline by more than the tolerance is a regression and the script exits with status 1.
+
+Example:
+    python benchmark_pipeline.py --scales 0.1,1 --output benchmark_results.json
+    python benchmark_pipeline.py --scales 0.1,1 --update-baseline   # record this machine's baseline
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from run_local_pipeline import NOTEBOOKS, run_notebook
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Layer whose fact tables each stage reads; rows read by the generator are the rows it generates
+STAGE_INPUT_LAYER = {"generate": None, "bronze": None, "silver": "bronze", "gold": "silver"}
+
+
+def root_bytes(root):
+    """Total size of the files under root"""
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(root) for name in names
+    )
+
+
+def fact_rows(session, layer):
+    """Rows in the <layer>_*_sales tables of the current schema"""
+    tables = session.sql(f"""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_catalog = current_database() AND table_schema = current_schema()
+          AND table_name LIKE '{layer}\\_%\\_sales' ESCAPE '\\'
+    """).collect()
+    return sum(session.sql(f"SELECT COUNT(*) as row_count FROM {table.table_name}").first().row_count for table in tables)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its finished children, in MB"""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+def measure_stage(root, stage, params, verbose, results):
+    """Run one stage in this (child) process and put its measurements on the results queue"""
+    from local_engine import LocalSparkSession
+
+    bytes_before = root_bytes(root)
+    session = LocalSparkSession(root)
+    namespace = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else open(os.devnull, "w")):
+        run_notebook(stage, session, params, root, namespace)
+    wall_s = time.perf_counter() - start
+
+    if stage == "generate":
+        output_rows = int(namespace["timings_df"]["rows"].sum())
+        input_rows = output_rows
+    else:
+        output_rows = fact_rows(session, stage)
+        input_rows = fact_rows(session, STAGE_INPUT_LAYER[stage]) if STAGE_INPUT_LAYER[stage] else output_rows
+    session.connection.close()  # checkpoints the catalog databases, so their size is final
+    results.put({
+        "stage": stage,
+        "wall_s": round(wall_s, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "input_rows": input_rows,
+        "output_rows": output_rows,
+        "rows_per_s": round(input_rows / wall_s) if wall_s else None,
+        "output_bytes": root_bytes(root) - bytes_before,
+    })
+
+
+def run_stage(root, stage, params, verbose=False):
+    """Measurements of one stage, run in a fresh process"""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measure_stage, args=(root, stage, params, verbose, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Stage {stage} failed with exit code {process.exitcode}")
+    return results.get()
+
+
+def run_benchmark(scales, stages=tuple(NOTEBOOKS), params=None, runs=1, work_dir=None, verbose=False):
+    """Median measurements of every (scale factor, stage) over `runs` from-scratch pipeline runs"""
+    measurements = {}
+    for scale in scales:
+        for run in range(runs):
+            root = tempfile.mkdtemp(prefix=f"pipeline_bench_x{scale}_", dir=work_dir)
+            try:
+                for stage in stages:
+                    result = run_stage(root, stage, {**(params or {}), "scale_factor": scale}, verbose)
+                    measurements.setdefault((scale, stage), []).append(result)
+                    print(f"⏱️ {scale}x {stage:<8} run {run + 1}/{runs}: {result['wall_s']:.2f}s, "
+                          f"{result['peak_rss_mb']:,.0f} MB peak, {result['rows_per_s'] or 0:,} rows/s")
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+    return [
+        {"scale_factor": scale, "stage": stage, **{
+            metric: statistics.median(result[metric] for result in results)
+            for metric in results[0] if metric != "stage"
+        }}
+        for (scale, stage), results in measurements.items()
+    ]
+
+
+def compare_to_baseline(results, baseline, max_slowdown, max_rss_growth, min_seconds):
+    """Regressions of results against the baseline's matching (scale factor, stage) entries"""
+    expected = {(entry["scale_factor"], entry["stage"]): entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        reference = expected.get((result["scale_factor"], result["stage"]))
+        if reference is None:
+            continue
+        if (result["wall_s"] > reference["wall_s"] * (1 + max_slowdown)
+                and result["wall_s"] - reference["wall_s"] > min_seconds):
+            regressions.append((result, "wall_s", reference["wall_s"]))
+        if result["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + max_rss_growth):
+            regressions.append((result, "peak_rss_mb", reference["peak_rss_mb"]))
+    return regressions
+
+
+def machine_info():
+    import duckdb
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the generator and medallion stages locally")
+    parser.add_argument("--scales", default="0.1,1,10", help="Comma-separated scale factors (x 170K rows per file)")
+    parser.add_argument("--stages", default=",".join(NOTEBOOKS), help=f"Comma-separated stages out of {','.join(NOTEBOOKS)}")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="Notebook widget value applied to every run, e.g. output_format=parquet (repeatable)")
+    parser.add_argument("--runs", type=int, default=1, help="From-scratch runs per scale factor (medians are reported)")
+    parser.add_argument("--work-dir", help="Directory for the temporary pipeline roots (default: system temp)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="Allowed wall time increase (0.2 = 20%%)")
+    parser.add_argument("--max-rss-growth", type=float, default=0.2, help="Allowed peak RSS increase (0.2 = 20%%)")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="Ignore wall time increases below this many seconds")
+    parser.add_argument("--verbose", action="store_true", help="Show the notebooks' output")
+    args = parser.parse_args(argv)
+    args.scales = [float(scale) for scale in args.scales.split(",")]
+    args.stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    args.params = dict(param.split("=", 1) for param in args.param)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run_benchmark(args.scales, args.stages, args.params, args.runs, args.work_dir, args.verbose)
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "params": args.params,
+        "runs": args.runs,
+        "results": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"ℹ️ No baseline at {args.baseline} - run with --update-baseline to record one")
+    else:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["machine"] != report["machine"]:
+            print(f"⚠️ Baseline was recorded on a different machine: {baseline['machine']}")
+        regressions = compare_to_baseline(results, baseline, args.max_slowdown, args.max_rss_growth, args.min_seconds)
+        for result, metric, reference in regressions:
+            print(f"❌ {result['scale_factor']}x {result['stage']}: {metric} {result[metric]} vs baseline {reference}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
@@ -0,0 +1,145 @@
+# Databricks notebook source
+# MAGIC %md
+# MAGIC # ⏱️ Benchmark: File Pruning by Table Layout
+# MAGIC 
+# MAGIC Compares the layouts of `table_layouts.py` on the filters the dashboard and Genie apply most often
+# MAGIC (recent days, one month, one facility, one partner, one market). Each benchmarked table is copied once per layout:
+# MAGIC - `none` — no layout, rows in random order as the shuffles of the silver `QUALIFY` and gold `GROUP BY` leave them
+# MAGIC - `clustered` — liquid clustering on the table's `cluster_by` keys
+# MAGIC - `partitioned` — partitioned by `year, month` and Z-ordered on the clustering keys (silver facts only)
+# MAGIC 
+# MAGIC Every copy is `OPTIMIZE`d to the same target file size, so the layouts differ only in which rows share a
+# MAGIC file. For each filter the benchmark reports how many files Delta data skipping has to read, computed from the
+# MAGIC per-file min/max of the filter columns (the statistics Delta keeps in its log), and the median query time.
+# MAGIC 
+# MAGIC **Prerequisites:** Run `2_load_silver_tables.py` and `3_load_gold_tables.py` first.
+
+# COMMAND ----------
+
+# MAGIC %sql
+# MAGIC USE CATALOG pedroz_catalog;
+# MAGIC USE SCHEMA entertainment_co;
+
+# COMMAND ----------
+
+import datetime
+import statistics
+import time
+
+import pandas as pd
+from table_layouts import TABLE_LAYOUTS, layout_clause, maintenance_statements
+
+BENCHMARK_TABLES = ["silver_ticket_sales", "silver_fnb_sales", "silver_retail_sales", "gold_daily_revenue"]
+dbutils.widgets.text("tables", ",".join(BENCHMARK_TABLES), "Tables to benchmark")
+TABLES = [table.strip() for table in dbutils.widgets.get("tables").split(",") if table.strip()]
+# Small files make the demo-sized tables span as many files as production-sized ones
+dbutils.widgets.text("target_file_size", "16mb", "Target file size of the copies")
+TARGET_FILE_SIZE = dbutils.widgets.get("target_file_size")
+dbutils.widgets.text("runs", "3", "Timed runs per filter")
+RUNS = int(dbutils.widgets.get("runs"))
+
+def literal(value):
+    """SQL literal of a filter bound"""
+    if isinstance(value, datetime.date):
+        return f"DATE'{value.isoformat()}'"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+def dashboard_filters(table):
+    """Typical dashboard filters on a table as {name: {column: (low, high)}}, around its latest date"""
+    probe = spark.sql(f"""
+        SELECT MAX(transaction_date) as last_date, MIN(facility_id) as facility_id,
+               MIN(partner_name) as partner_name, MIN(market) as market
+        FROM {table}
+    """).first()
+    last_week = (probe.last_date - datetime.timedelta(days=6), probe.last_date)
+    last_month = {"year": (probe.last_date.year,) * 2, "month": (probe.last_date.month,) * 2}
+    return {
+        "last 7 days": {"transaction_date": last_week},
+        "last month": last_month,
+        "one facility": {"facility_id": (probe.facility_id,) * 2},
+        "one facility, last month": {"facility_id": (probe.facility_id,) * 2, **last_month},
+        "one partner": {"partner_name": (probe.partner_name,) * 2},
+        "one market, last 7 days": {"market": (probe.market,) * 2, "transaction_date": last_week},
+    }
+
+def where_clause(bounds):
+    """SQL predicate of a filter"""
+    return " AND ".join(f"{column} BETWEEN {literal(low)} AND {literal(high)}" for column, (low, high) in bounds.items())
+
+def build_copy(table, layout):
+    """Copy of a table with one of the benchmarked layouts, optimized to TARGET_FILE_SIZE; returns its name"""
+    copy = f"bench_layout_{table}_{layout}"
+    properties = f"TBLPROPERTIES ('delta.targetFileSize' = '{TARGET_FILE_SIZE}')"
+    if layout == "none":
+        spark.sql(f"CREATE OR REPLACE TABLE {copy} {properties} AS SELECT * FROM {table} ORDER BY rand(42)")
+        spark.sql(f"OPTIMIZE {copy}")
+    else:
+        partitioned = layout == "partitioned"
+        clause = layout_clause(copy, partitioned, TABLE_LAYOUTS[table])
+        spark.sql(f"CREATE OR REPLACE TABLE {copy} {clause} {properties} AS SELECT * FROM {table}")
+        for statement in maintenance_statements(copy, partitioned, TABLE_LAYOUTS[table]):
+            spark.sql(statement)
+    return copy
+
+def file_stats(copy, columns):
+    """Per-file min/max of the filter columns, one row per data file of the copy"""
+    ranges = ", ".join(f"MIN({column}) as {column}_min, MAX({column}) as {column}_max" for column in columns)
+    return spark.sql(f"SELECT _metadata.file_path as file_path, {ranges} FROM {copy} GROUP BY _metadata.file_path").toPandas()
+
+def files_read(stats, bounds):
+    """Files whose min/max ranges overlap every filter range, i.e. the files data skipping cannot prune"""
+    overlaps = pd.Series(True, index=stats.index)
+    for column, (low, high) in bounds.items():
+        overlaps &= (stats[f"{column}_max"] >= low) & (stats[f"{column}_min"] <= high)
+    return int(overlaps.sum())
+
+def timed_run(sql):
+    """Execute the full query without writing its output and return the elapsed seconds"""
+    start = time.perf_counter()
+    spark.sql(sql).write.format("noop").mode("overwrite").save()
+    return time.perf_counter() - start
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🏁 Run the Benchmark
+
+# COMMAND ----------
+
+results = []
+for table in TABLES:
+    filters = dashboard_filters(table)
+    columns = sorted({column for bounds in filters.values() for column in bounds})
+    layouts = ["none", "clustered"] + (["partitioned"] if "partition_by" in TABLE_LAYOUTS[table] else [])
+    for layout in layouts:
+        copy = build_copy(table, layout)
+        stats = file_stats(copy, columns)
+        for name, bounds in filters.items():
+            sql = f"SELECT * FROM {copy} WHERE {where_clause(bounds)}"
+            timings = [timed_run(sql) for _ in range(RUNS)]
+            scanned = files_read(stats, bounds)
+            results.append({
+                "table": table,
+                "layout": layout,
+                "filter": name,
+                "files": len(stats),
+                "files_read": scanned,
+                "pruned_pct": round(100 * (1 - scanned / len(stats)), 1) if len(stats) else None,
+                "median_s": round(statistics.median(timings), 2),
+            })
+        print(f"⏱️ {table} {layout}: {len(stats)} files")
+        spark.sql(f"DROP TABLE {copy}")
+
+# COMMAND ----------
+
+results_df = pd.DataFrame(results)
+display(results_df)
+
+for table, group in results_df.groupby("table", sort=False):
+    summary = group.groupby("layout", sort=False).agg(pruned_pct=("pruned_pct", "mean"), median_s=("median_s", "sum"))
+    print(f"🚀 {table}: " + ", ".join(
+        f"{layout} prunes {row.pruned_pct:.0f}% of files on average ({row.median_s:.2f}s over all filters)"
+        for layout, row in summary.iterrows()
+    ))
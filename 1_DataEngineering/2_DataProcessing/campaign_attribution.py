@@ -0,0 +1,90 @@
+"""
+Query builders for gold_campaign_performance: daily facility revenue attributed to the active campaigns.
+
+A campaign is active from its start_date to its end_date (both included) and covers every facility. Each day's
+revenue and visitors of a facility are attributed to the campaigns active that day, split evenly when
+campaigns overlap, so the attributed revenue of all campaigns adds up to the revenue of campaign days.
+gold_campaign_performance has one row per (campaign_id, facility_id).
+
+Matching days to campaigns is a range condition, which a plain join evaluates as a nested loop over every
+(row, campaign) pair. The plans, all with identical results:
+- "daily_grain": expand each campaign into its days (explode(sequence(start_date, end_date))), then equi-join
+  them with gold_daily_revenue on transaction_date: one pre-aggregated row per (day, facility), a hash join
+- "range_hint": the BETWEEN join against the silver facts with a RANGE_JOIN hint binning dates by day, so
+  Databricks runs it as a range join
+- "naive": the same BETWEEN join without the hint
+
+3_load_gold_tables.py builds the table with CAMPAIGN_PLANS["daily_grain"], and
+benchmark_campaign_attribution.py compares the plans.
+"""
+
+import functools
+
+from gold_queries import SILVER_SOURCES
+
+CAMPAIGN_COLUMNS = ["campaign_id", "campaign_name", "channel", "target_demographic", "start_date", "end_date", "budget_usd"]
+FACILITY_COLUMNS = ["facility_id", "facility_name", "partner_name", "market"]
+
+
+def campaign_performance_select(rows, weight):
+    """Attributed sums per campaign and facility over `rows`, which carry the revenue columns and the campaign's share"""
+    return f"""
+    SELECT
+        {", ".join(CAMPAIGN_COLUMNS)},
+        {", ".join(FACILITY_COLUMNS)},
+        COUNT(DISTINCT transaction_date) as campaign_days,
+        ROUND(SUM(ticket_revenue * {weight}), 2) as ticket_revenue,
+        ROUND(SUM(fnb_revenue * {weight}), 2) as fnb_revenue,
+        ROUND(SUM(retail_revenue * {weight}), 2) as retail_revenue,
+        ROUND(SUM((ticket_revenue + fnb_revenue + retail_revenue) * {weight}), 2) as total_revenue,
+        ROUND(SUM(visitors * {weight}), 2) as visitors
+    FROM ({rows}) attributed
+    GROUP BY ALL
+    """
+
+
+def campaign_daily_grain_sql(daily_revenue="gold_daily_revenue", campaigns="silver_dim_campaigns"):
+    """gold_campaign_performance from the campaigns' days equi-joined with daily_revenue"""
+    return campaign_performance_select(f"""
+        SELECT c.*, {", ".join(f"g.{column}" for column in FACILITY_COLUMNS)},
+               g.ticket_revenue, g.fnb_revenue, g.retail_revenue, g.total_visitors as visitors,
+               1.0 / c.active_campaigns as campaign_share
+        FROM (
+            SELECT *, COUNT(*) OVER (PARTITION BY transaction_date) as active_campaigns
+            FROM (
+                SELECT {", ".join(CAMPAIGN_COLUMNS)}, explode(sequence(start_date, end_date)) as transaction_date
+                FROM {campaigns}
+            )
+        ) c
+        JOIN {daily_revenue} g ON g.transaction_date = c.transaction_date
+    """, "campaign_share")
+
+
+def campaign_range_join_sql(sources=SILVER_SOURCES, campaigns="silver_dim_campaigns", range_join_hint=False):
+    """gold_campaign_performance from a BETWEEN join of the silver facts with the campaigns"""
+    facts = " UNION ALL ".join(
+        f"""
+        SELECT '{stream}' as stream, transaction_id, transaction_date, {", ".join(FACILITY_COLUMNS)},
+               {"total_amount" if stream == "ticket" else "0"} as ticket_revenue,
+               {"total_amount" if stream == "fnb" else "0"} as fnb_revenue,
+               {"total_amount" if stream == "retail" else "0"} as retail_revenue,
+               {"quantity" if stream == "ticket" else "0"} as visitors
+        FROM {table}"""
+        for stream, table in sources.items()
+    )
+    hint = "/*+ RANGE_JOIN(c, 1) */" if range_join_hint else ""
+    # A transaction matches every campaign active on its day, so its match count is the number of active campaigns
+    return campaign_performance_select(f"""
+        SELECT {hint} {", ".join(f"c.{column}" for column in CAMPAIGN_COLUMNS)}, s.*,
+               1.0 / COUNT(*) OVER (PARTITION BY s.stream, s.transaction_id) as campaign_share
+        FROM ({facts}) s
+        JOIN {campaigns} c ON s.transaction_date BETWEEN c.start_date AND c.end_date
+    """, "campaign_share")
+
+
+# Plan -> builder of gold_campaign_performance: daily_grain reads daily_revenue, the range joins read sources
+CAMPAIGN_PLANS = {
+    "daily_grain": campaign_daily_grain_sql,
+    "range_hint": functools.partial(campaign_range_join_sql, range_join_hint=True),
+    "naive": campaign_range_join_sql,
+}
@@ -0,0 +1,32 @@
+"""
+Distinct-customer HyperLogLog sketches in gold_daily_revenue.
+
+COUNT(DISTINCT customer_id) results cannot be added up across days, facilities or revenue streams, so
+gold_daily_revenue keeps one HyperLogLog sketch of silver's customer_id per (transaction_date, facility_id)
+and revenue stream instead (hll_sketch_agg, default lgConfigK = 12: about 1.6% standard error). Sketches merge
+with hll_union_agg() and hll_sketch_estimate() turns a merged sketch into a distinct count, so unique customers
+for any week, month, partner, market or stream mix are estimated from gold rows without going back to silver.
+
+gold_revenue_cube carries the merged sketch of every cube row, and unique_customers_select() merges the daily
+sketches for groupings the cube does not have. benchmark_customer_sketches.py compares the estimates with exact
+COUNT(DISTINCT) results.
+"""
+
+# gold_daily_revenue sketch column of each revenue stream
+CUSTOMER_SKETCHES = {
+    "ticket": "ticket_customers_sketch",
+    "fnb": "fnb_customers_sketch",
+    "retail": "retail_customers_sketch",
+}
+
+
+def unique_customers_select(group_by, streams=tuple(CUSTOMER_SKETCHES), where="TRUE", source="gold_daily_revenue"):
+    """Estimated distinct customers of the streams per group_by expressions, merged from the sketches in source"""
+    sketches = " UNION ALL ".join(
+        f"SELECT *, {CUSTOMER_SKETCHES[stream]} as customers_sketch FROM {source} WHERE {where}" for stream in streams
+    )
+    return f"""
+    SELECT {", ".join(group_by)}, hll_sketch_estimate(hll_union_agg(customers_sketch)) as unique_customers
+    FROM ({sketches}) sketches
+    GROUP BY ALL
+    """
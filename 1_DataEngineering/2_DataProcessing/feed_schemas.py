@@ -0,0 +1,122 @@
+"""
+Declared schemas of the raw partner and dimension feeds.
+
+This is the single place the feed types are defined: the bronze notebook passes them to
+read_files() instead of inferSchema, and generate_synthetic_csv_data.py writes Parquet with
+the same types. Columns that do not match the declared schema land in RESCUED_DATA_COLUMN
+instead of failing the load.
+
+Partner fact rows end with change_type: 'insert' in the monthly snapshot files; the generator's change
+files also send 'update' (a corrected transaction) and 'delete' (a voided one), applied by silver. change_batch
+is 0 in the snapshot and the batch number in change files: silver breaks ties between versions of a
+transaction ingested at the same time with it.
+
+The <fact>_stream feeds are the real-time event files of the generator's stream mode: the fact columns plus
+the event_timestamp each event happened at, read by stream_hourly_patterns.py.
+"""
+
+RESCUED_DATA_COLUMN = "_rescued_data"
+
+FEED_SCHEMAS = {
+    # Partner transactional feeds
+    "ticket_sales": [
+        ("transaction_id", "STRING"),
+        ("transaction_date", "DATE"),
+        ("facility_id", "STRING"),
+        ("ip_name", "STRING"),
+        ("ticket_type", "STRING"),
+        ("quantity", "INT"),
+        ("unit_price", "DECIMAL(10,2)"),
+        ("discount_pct", "INT"),
+        ("customer_id", "STRING"),
+        ("is_repeat_visitor", "BOOLEAN"),
+        ("visit_hour", "INT"),
+        ("channel", "STRING"),
+        ("total_amount", "DECIMAL(10,2)"),
+        ("change_type", "STRING"),
+        ("change_batch", "INT"),
+    ],
+    "fnb_sales": [
+        ("transaction_id", "STRING"),
+        ("transaction_date", "DATE"),
+        ("facility_id", "STRING"),
+        ("item_name", "STRING"),
+        ("item_category", "STRING"),
+        ("unit_price", "DECIMAL(10,2)"),
+        ("quantity", "INT"),
+        ("customer_id", "STRING"),
+        ("outlet_id", "STRING"),
+        ("payment_method", "STRING"),
+        ("transaction_hour", "INT"),
+        ("total_amount", "DECIMAL(10,2)"),
+        ("change_type", "STRING"),
+        ("change_batch", "INT"),
+    ],
+    "retail_sales": [
+        ("transaction_id", "STRING"),
+        ("transaction_date", "DATE"),
+        ("facility_id", "STRING"),
+        ("ip_name", "STRING"),
+        ("product_name", "STRING"),
+        ("product_category", "STRING"),
+        ("unit_price", "DECIMAL(10,2)"),
+        ("quantity", "INT"),
+        ("customer_id", "STRING"),
+        ("store_id", "STRING"),
+        ("is_online", "BOOLEAN"),
+        ("total_amount", "DECIMAL(10,2)"),
+        ("change_type", "STRING"),
+        ("change_batch", "INT"),
+    ],
+    # Dimension feeds
+    "dim_facilities": [
+        ("facility_id", "STRING"),
+        ("facility_name", "STRING"),
+        ("partner_name", "STRING"),
+        ("market", "STRING"),
+        ("country", "STRING"),
+        ("capacity", "INT"),
+        ("opened_date", "DATE"),
+        ("experience_type", "STRING"),
+    ],
+    "dim_campaigns": [
+        ("campaign_id", "STRING"),
+        ("campaign_name", "STRING"),
+        ("start_date", "DATE"),
+        ("end_date", "DATE"),
+        ("budget_usd", "INT"),
+        ("channel", "STRING"),
+        ("target_demographic", "STRING"),
+        ("is_active", "BOOLEAN"),
+    ],
+    "dim_customers": [
+        ("customer_id", "STRING"),
+        ("customer_segment", "STRING"),
+        ("age_group", "STRING"),
+        ("family_size", "INT"),
+        ("home_market", "STRING"),
+        ("signup_date", "DATE"),
+        ("loyalty_tier", "STRING"),
+    ],
+    "dim_dates": [
+        ("date", "DATE"),
+        ("year", "INT"),
+        ("quarter", "INT"),
+        ("month", "INT"),
+        ("month_name", "STRING"),
+        ("week_of_year", "INT"),
+        ("day_of_week", "STRING"),
+        ("is_weekend", "BOOLEAN"),
+        ("is_holiday", "BOOLEAN"),
+        ("season", "STRING"),
+    ],
+}
+
+FACT_FEEDS = ["ticket_sales", "fnb_sales", "retail_sales"]
+
+FEED_SCHEMAS.update({f"{feed}_stream": [*FEED_SCHEMAS[feed], ("event_timestamp", "TIMESTAMP")] for feed in FACT_FEEDS})
+
+
+def schema_ddl(feed):
+    """Spark DDL string for a feed, e.g. '`transaction_id` STRING, `transaction_date` DATE, ...'"""
+    return ", ".join(f"`{name}` {data_type}" for name, data_type in FEED_SCHEMAS[feed])
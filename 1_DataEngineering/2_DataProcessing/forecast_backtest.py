@@ -0,0 +1,104 @@
+"""
+Rolling-origin backtests of the batch Holt-Winters forecaster.
+
+A backtest refits the forecaster on each series' history up to a cutoff day, forecasts the following
+`horizon` days and compares them with what happened. Cutoffs start after `min_history` days and are
+`cutoff_step` days apart, up to the last day that still leaves a full horizon of actuals.
+
+Every (cutoff, block of series) pair is an independent work unit: with workers > 1 the units are fanned
+out across a process pool, which receives the (series x day) matrix once per worker. Each unit returns
+additive error sums per (series, horizon day), so units combine by addition and the metrics are computed
+once at the end:
+- MAPE: mean of |error| / |actual| over the days with a non-zero actual, in %
+- WAPE: sum of |error| / sum of |actual|, in %
+- coverage: share of actuals inside the forecast's prediction interval
+"""
+
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from batch_forecaster import holt_winters_forecast, series_matrix
+
+# Additive error sums kept per (series, horizon day)
+ERROR_SUMS = ["abs_error", "abs_actual", "abs_pct_error", "pct_error_days", "covered", "days"]
+
+BACKTEST_MATRIX = None  # (series x day) matrix of the worker process, set by share_matrix()
+
+
+def share_matrix(values):
+    """Process pool initializer: keep the series matrix in the worker"""
+    global BACKTEST_MATRIX
+    BACKTEST_MATRIX = values
+
+
+def cutoff_days(days, horizon, min_history=56, cutoff_step=7):
+    """Day indexes of the cutoffs: forecasts start the day after, and a full horizon of actuals follows"""
+    return list(range(min_history, days - horizon + 1, cutoff_step))
+
+
+def backtest_unit(cutoff, first_series, last_series, horizon, interval_width=0.95):
+    """Error sums (len(ERROR_SUMS) x series x horizon) of the forecasts made at one cutoff for a block of series"""
+    values = BACKTEST_MATRIX[first_series:last_series]
+    forecast, lower, upper = holt_winters_forecast(values[:, :cutoff], horizon, interval_width=interval_width)
+    actual = values[:, cutoff:cutoff + horizon]
+    observed = ~np.isnan(actual)  # a series that had not started yet has no actuals
+    actual = np.nan_to_num(actual)
+    nonzero = observed & (actual != 0)
+    abs_error = np.where(observed, np.abs(forecast - actual), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        abs_pct_error = np.where(nonzero, abs_error / np.abs(actual), 0.0)
+    covered = observed & (lower <= actual) & (actual <= upper)
+    return first_series, np.stack([
+        abs_error, np.where(observed, np.abs(actual), 0.0), abs_pct_error, nonzero, covered, observed,
+    ]).astype(float)
+
+
+def run_backtest(values, horizon, cutoffs, workers=1, series_per_unit=500, interval_width=0.95):
+    """Error sums (len(ERROR_SUMS) x series x horizon) over every cutoff, run on `workers` processes"""
+    series = values.shape[0]
+    units = [
+        (cutoff, first, min(first + series_per_unit, series), horizon, interval_width)
+        for cutoff in cutoffs for first in range(0, series, series_per_unit)
+    ]
+    sums = np.zeros((len(ERROR_SUMS), series, horizon))
+    if workers <= 1:
+        share_matrix(values)
+        pool = contextlib.nullcontext()
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+            initializer=share_matrix, initargs=(values,),
+        )
+    with pool:
+        run_units = pool.map if workers > 1 else map
+        for first, unit_sums in run_units(backtest_unit, *zip(*units)):
+            sums[:, first:first + unit_sums.shape[1]] += unit_sums
+    return sums
+
+
+def backtest_frame(history, time_col, value_col, group_cols, horizon=30, min_history=56, cutoff_step=7,
+                   workers=1, series_per_unit=500, interval_width=0.95):
+    """MAPE, WAPE and coverage per group and horizon day (1 = the day after the cutoff) of a long table"""
+    keys, days, values = series_matrix(history, time_col, value_col, group_cols)
+    cutoffs = cutoff_days(len(days), horizon, min_history, cutoff_step)
+    if not cutoffs:
+        return pd.DataFrame()
+    sums = dict(zip(ERROR_SUMS, run_backtest(values, horizon, cutoffs, workers, series_per_unit, interval_width)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics = {
+            "mape": 100 * sums["abs_pct_error"] / sums["pct_error_days"],
+            "wape": 100 * sums["abs_error"] / sums["abs_actual"],
+            "coverage": sums["covered"] / sums["days"],
+        }
+    result = pd.DataFrame({column: np.repeat(keys.get_level_values(column), horizon) for column in group_cols})
+    result["horizon_days"] = np.tile(np.arange(1, horizon + 1), len(keys))
+    result["cutoffs"] = sums["days"].ravel().astype(int)
+    result["first_cutoff"] = days[cutoffs[0] - 1].date()
+    result["last_cutoff"] = days[cutoffs[-1] - 1].date()
+    for metric, matrix in metrics.items():
+        result[metric] = np.round(np.where(np.isfinite(matrix), matrix, np.nan).ravel(), 4)
+    result["interval_width"] = interval_width
+    return result
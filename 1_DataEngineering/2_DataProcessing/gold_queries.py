@@ -0,0 +1,153 @@
+"""
+Query builders for gold tables with more than one physical plan.
+
+gold_daily_revenue can be built two ways with identical results:
+- "join": aggregate each silver fact table separately, then stitch the three results together with
+  FULL OUTER JOINs on COALESCE(...) keys (the original plan; one shuffle per aggregate plus the joins)
+- "union": UNION ALL the three streams with a revenue-stream tag and run a single grouped aggregation
+  with per-stream FILTER sums (one shuffle, no joins)
+
+Both plans also keep a HyperLogLog sketch of the customer_ids of each stream (see customer_sketches.py), NULL
+where the slice has no rows of that stream.
+
+3_load_gold_tables.py builds the table with DAILY_REVENUE_PLANS[plan], and
+benchmark_gold_daily_revenue.py compares the plans.
+"""
+
+SILVER_SOURCES = {
+    "ticket": "silver_ticket_sales",
+    "fnb": "silver_fnb_sales",
+    "retail": "silver_retail_sales",
+}
+
+
+def daily_revenue_join_sql(slice_filter="TRUE", sources=SILVER_SOURCES):
+    """gold_daily_revenue as three aggregates stitched together with FULL OUTER JOINs"""
+    return f"""
+    SELECT
+        COALESCE(t.transaction_date, f.transaction_date, r.transaction_date) as transaction_date,
+        COALESCE(t.facility_id, f.facility_id, r.facility_id) as facility_id,
+        COALESCE(t.facility_name, f.facility_name, r.facility_name) as facility_name,
+        COALESCE(t.partner_name, f.partner_name, r.partner_name) as partner_name,
+        COALESCE(t.market, f.market, r.market) as market,
+        COALESCE(t.ticket_revenue, 0) as ticket_revenue,
+        COALESCE(t.ticket_transactions, 0) as ticket_transactions,
+        COALESCE(t.total_visitors, 0) as total_visitors,
+        COALESCE(t.repeat_visitors, 0) as repeat_visitors,
+        COALESCE(f.fnb_revenue, 0) as fnb_revenue,
+        COALESCE(f.fnb_transactions, 0) as fnb_transactions,
+        COALESCE(r.retail_revenue, 0) as retail_revenue,
+        COALESCE(r.retail_transactions, 0) as retail_transactions,
+        t.customers_sketch as ticket_customers_sketch,
+        f.customers_sketch as fnb_customers_sketch,
+        r.customers_sketch as retail_customers_sketch,
+        (COALESCE(t.ticket_revenue, 0) + COALESCE(f.fnb_revenue, 0) + COALESCE(r.retail_revenue, 0)) as total_revenue,
+        YEAR(COALESCE(t.transaction_date, f.transaction_date, r.transaction_date)) as year,
+        MONTH(COALESCE(t.transaction_date, f.transaction_date, r.transaction_date)) as month,
+        GREATEST(t.last_ingestion_timestamp, f.last_ingestion_timestamp, r.last_ingestion_timestamp) as last_ingestion_timestamp
+    FROM (
+        SELECT
+            transaction_date, facility_id, facility_name, partner_name, market,
+            SUM(total_amount) as ticket_revenue,
+            COUNT(*) as ticket_transactions,
+            SUM(quantity) as total_visitors,
+            SUM(CASE WHEN is_repeat_visitor THEN quantity ELSE 0 END) as repeat_visitors,
+            hll_sketch_agg(customer_id) as customers_sketch,
+            MAX(ingestion_timestamp) as last_ingestion_timestamp
+        FROM {sources["ticket"]}
+        WHERE {slice_filter}
+        GROUP BY transaction_date, facility_id, facility_name, partner_name, market
+    ) t
+    FULL OUTER JOIN (
+        SELECT
+            transaction_date, facility_id, facility_name, partner_name, market,
+            SUM(total_amount) as fnb_revenue,
+            COUNT(*) as fnb_transactions,
+            hll_sketch_agg(customer_id) as customers_sketch,
+            MAX(ingestion_timestamp) as last_ingestion_timestamp
+        FROM {sources["fnb"]}
+        WHERE {slice_filter}
+        GROUP BY transaction_date, facility_id, facility_name, partner_name, market
+    ) f ON t.transaction_date = f.transaction_date AND t.facility_id = f.facility_id
+    FULL OUTER JOIN (
+        SELECT
+            transaction_date, facility_id, facility_name, partner_name, market,
+            SUM(total_amount) as retail_revenue,
+            COUNT(*) as retail_transactions,
+            hll_sketch_agg(customer_id) as customers_sketch,
+            MAX(ingestion_timestamp) as last_ingestion_timestamp
+        FROM {sources["retail"]}
+        WHERE {slice_filter}
+        GROUP BY transaction_date, facility_id, facility_name, partner_name, market
+    ) r ON COALESCE(t.transaction_date, f.transaction_date) = r.transaction_date
+           AND COALESCE(t.facility_id, f.facility_id) = r.facility_id
+    """
+
+
+def daily_revenue_union_sql(slice_filter="TRUE", sources=SILVER_SOURCES):
+    """gold_daily_revenue as one grouped aggregation over the UNION ALL of the tagged streams"""
+    return f"""
+    SELECT
+        transaction_date,
+        facility_id,
+        facility_name,
+        partner_name,
+        market,
+        ticket_revenue,
+        ticket_transactions,
+        total_visitors,
+        repeat_visitors,
+        fnb_revenue,
+        fnb_transactions,
+        retail_revenue,
+        retail_transactions,
+        ticket_customers_sketch,
+        fnb_customers_sketch,
+        retail_customers_sketch,
+        (ticket_revenue + fnb_revenue + retail_revenue) as total_revenue,
+        YEAR(transaction_date) as year,
+        MONTH(transaction_date) as month,
+        last_ingestion_timestamp
+    FROM (
+        SELECT
+            transaction_date, facility_id, facility_name, partner_name, market,
+            COALESCE(SUM(total_amount) FILTER (WHERE stream = 'ticket'), 0) as ticket_revenue,
+            COUNT(*) FILTER (WHERE stream = 'ticket') as ticket_transactions,
+            COALESCE(SUM(quantity) FILTER (WHERE stream = 'ticket'), 0) as total_visitors,
+            COALESCE(SUM(CASE WHEN is_repeat_visitor THEN quantity ELSE 0 END) FILTER (WHERE stream = 'ticket'), 0) as repeat_visitors,
+            COALESCE(SUM(total_amount) FILTER (WHERE stream = 'fnb'), 0) as fnb_revenue,
+            COUNT(*) FILTER (WHERE stream = 'fnb') as fnb_transactions,
+            COALESCE(SUM(total_amount) FILTER (WHERE stream = 'retail'), 0) as retail_revenue,
+            COUNT(*) FILTER (WHERE stream = 'retail') as retail_transactions,
+            CASE WHEN COUNT(*) FILTER (WHERE stream = 'ticket') > 0
+                 THEN hll_sketch_agg(CASE WHEN stream = 'ticket' THEN customer_id END) END as ticket_customers_sketch,
+            CASE WHEN COUNT(*) FILTER (WHERE stream = 'fnb') > 0
+                 THEN hll_sketch_agg(CASE WHEN stream = 'fnb' THEN customer_id END) END as fnb_customers_sketch,
+            CASE WHEN COUNT(*) FILTER (WHERE stream = 'retail') > 0
+                 THEN hll_sketch_agg(CASE WHEN stream = 'retail' THEN customer_id END) END as retail_customers_sketch,
+            MAX(ingestion_timestamp) as last_ingestion_timestamp
+        FROM (
+            SELECT 'ticket' as stream, transaction_date, facility_id, facility_name, partner_name, market,
+                   total_amount, quantity, is_repeat_visitor, customer_id, ingestion_timestamp
+            FROM {sources["ticket"]}
+            WHERE {slice_filter}
+            UNION ALL
+            SELECT 'fnb' as stream, transaction_date, facility_id, facility_name, partner_name, market,
+                   total_amount, NULL as quantity, NULL as is_repeat_visitor, customer_id, ingestion_timestamp
+            FROM {sources["fnb"]}
+            WHERE {slice_filter}
+            UNION ALL
+            SELECT 'retail' as stream, transaction_date, facility_id, facility_name, partner_name, market,
+                   total_amount, NULL as quantity, NULL as is_repeat_visitor, customer_id, ingestion_timestamp
+            FROM {sources["retail"]}
+            WHERE {slice_filter}
+        )
+        GROUP BY transaction_date, facility_id, facility_name, partner_name, market
+    )
+    """
+
+
+DAILY_REVENUE_PLANS = {
+    "union": daily_revenue_union_sql,
+    "join": daily_revenue_join_sql,
+}
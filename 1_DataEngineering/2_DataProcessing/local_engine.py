@@ -0,0 +1,597 @@
+"""
+Local stand-ins for the Databricks runtime objects used by the pipeline notebooks.
+
+LocalSparkSession runs the notebooks' Spark SQL on an embedded DuckDB database: catalogs become
+DuckDB database files under the local root and the few Databricks-only constructs are translated
+per statement:
+- read_files('<path>', format => ..., schema => ...) reads the matching local files with the declared
+  schema, a NULL rescued-data column and a hidden _metadata.file_path
+- INSERT INTO ... REPLACE WHERE becomes a DELETE plus INSERT in one transaction
+- AI_FORECAST(TABLE(...), ...) is answered by the batch Holt-Winters forecaster (batch_forecaster.py) on the driver
+- CREATE CATALOG / USE CATALOG attach <root>/<catalog>.duckdb, CREATE VOLUME creates <root>/Volumes/...
+- DESCRIBE HISTORY lists the writes made through the session, with numOutputRows as their only metric
+- CREATE TABLE ... CLUSTER BY / PARTITIONED BY (...) AS writes the rows sorted on those columns (so DuckDB's
+  row-group min/max skipping stands in for Delta data skipping) and keeps the clause as the table comment;
+  OPTIMIZE [ZORDER BY (...)] re-sorts the table on it, ANALYZE TABLE ... COMPUTE STATISTICS runs ANALYZE
+- `identifier` quoting becomes "identifier" quoting and SELECT * EXCEPT (...) becomes SELECT * EXCLUDE (...)
+- current_timestamp(), unix_millis(), timestamp_millis(), DAYOFWEEK(), sequence() of dates and explode() get
+  Spark semantics as macros
+- hll_sketch_agg(), hll_union_agg(), hll_union() and hll_sketch_estimate() work on a local HyperLogLog sketch:
+  a BLOB of 2^12 one-byte registers (lgConfigK = 12, the Databricks default), merged and estimated by Python
+  UDFs; sketches are not byte-compatible with Databricks ones
+
+Statements may run concurrently from several threads: each thread gets its own DuckDB cursor, with the
+session's USE, temp macros and temp views replayed on it.
+
+LocalDbutils covers the widgets, dbutils.fs and dbutils.notebook.exit() calls the notebooks make. run_local_pipeline.py
+wires both into the notebooks.
+"""
+
+import datetime
+import glob
+import os
+import re
+import threading
+from collections import namedtuple
+from dataclasses import dataclass
+from functools import partial
+
+import duckdb
+import numpy as np
+import pandas as pd
+from batch_forecaster import batch_forecast
+
+# Local HyperLogLog sketches have 2^HLL_LG_K registers, indexed by the top HLL_LG_K bits of a 64-bit hash
+HLL_LG_K = 12
+HLL_RANK_BITS = 64 - HLL_LG_K
+HLL_RANK_HASH = f"(hash(x) & {(1 << HLL_RANK_BITS) - 1}::UBIGINT)"
+
+# Spark SQL functions whose DuckDB namesakes are missing or differ, redefined as temp macros
+SPARK_FUNCTION_MACROS = {
+    "current_timestamp()": "current_localtimestamp()",
+    "unix_millis(ts)": "epoch_ms(ts)",
+    "timestamp_millis(ms)": "epoch_ms(ms)",
+    "dayofweek(d)": "isodow(d) % 7 + 1",  # 1 = Sunday ... 7 = Saturday
+    "sequence(start, stop)": "list_transform(generate_series(CAST(start AS TIMESTAMP), CAST(stop AS TIMESTAMP), "
+                             "INTERVAL 1 DAY), day -> CAST(day AS DATE))",  # the days from start to stop
+    "explode(x)": "unnest(x)",
+    # HyperLogLog: a row's (register, rank) entry is register * 64 + rank, with the register from the top
+    # HLL_LG_K bits of its 64-bit hash and the rank from the position of the first 1 bit in the rest
+    "hll_entry(x)": f"CASE WHEN x IS NOT NULL THEN CAST(hash(x) >> {HLL_RANK_BITS} AS BIGINT) * 64 + CASE WHEN {HLL_RANK_HASH} = 0 "
+                    f"THEN {HLL_RANK_BITS + 1} ELSE {HLL_RANK_BITS} - CAST(floor(log2({HLL_RANK_HASH})) AS BIGINT) END END",
+    "hll_sketch_agg(x)": "hll_sketch_from_entries(list(DISTINCT hll_entry(x)))",
+    "hll_union_agg(sketch)": "hll_union_sketches(list(sketch))",
+    "hll_union(first, second)": "hll_union_sketches([first, second])",
+}
+
+# CLUSTER BY (...) / PARTITIONED BY (...) clause of a CREATE TABLE
+LAYOUT_CLAUSE = r"(?:(?:CLUSTER|PARTITIONED)\s+BY\s*\([^)]*\)\s+)?"
+
+# Statements that commit to a table, with the Delta history operation they are recorded as
+WRITE_OPERATIONS = [
+    (r"CREATE\s+OR\s+REPLACE\s+TABLE\s+([\w.]+)\s+" + LAYOUT_CLAUSE + r"AS\b", "CREATE OR REPLACE TABLE AS SELECT"),
+    (r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)\s+" + LAYOUT_CLAUSE + r"AS\b", "CREATE TABLE AS SELECT"),
+    (r"OPTIMIZE\s+([\w.]+)", "OPTIMIZE"),
+    (r"INSERT\s+(?:INTO|OVERWRITE)\s+(?:TABLE\s+)?([\w.]+)", "WRITE"),
+    (r"MERGE\s+INTO\s+([\w.]+)", "MERGE"),
+    (r"DELETE\s+FROM\s+([\w.]+)", "DELETE"),
+    (r"UPDATE\s+([\w.]+)", "UPDATE"),
+]
+
+# DuckDB statements that change per-connection state rather than the database
+SESSION_STATEMENT = r"\s*(USE\b|CREATE\s+(OR\s+REPLACE\s+)?TEMP(ORARY)?\s)"
+
+QUERY_PREFIXES = ("SELECT", "WITH", "FROM", "SHOW", "DESCRIBE", "EXPLAIN", "VALUES")
+
+
+def execute_on(cursor, statement):
+    """Execute a statement on a DuckDB cursor"""
+    cursor.execute(statement)
+
+
+def split_statements(sql):
+    """SQL statements of a script, split on semicolons outside string literals, without full-line comments"""
+    sql = "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--"))
+    statements, current, in_string = [], [], False
+    for char in sql:
+        if char == "'":
+            in_string = not in_string
+        if char == ";" and not in_string:
+            statements.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    statements.append("".join(current))
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def split_args(args):
+    """Top-level comma-separated arguments of a call, ignoring commas inside parentheses and strings"""
+    parts, current, depth, in_string = [], [], 0, False
+    for char in args:
+        if char == "'":
+            in_string = not in_string
+        elif not in_string and char == "(":
+            depth += 1
+        elif not in_string and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not in_string:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def find_call(sql, function):
+    """(start, end, args) of the first call of a function in sql, or None"""
+    match = re.search(rf"\b{function}\s*\(", sql, flags=re.IGNORECASE)
+    if not match:
+        return None
+    depth, in_string = 1, False
+    for end in range(match.end(), len(sql)):
+        char = sql[end]
+        if char == "'":
+            in_string = not in_string
+        elif not in_string and char == "(":
+            depth += 1
+        elif not in_string and char == ")":
+            depth -= 1
+            if depth == 0:
+                return match.start(), end + 1, sql[match.end():end]
+    raise ValueError(f"Unbalanced parentheses in {function}(...) call")
+
+
+def named_args(args):
+    """Positional and `name => value` arguments of a call, with string literals unquoted"""
+    positional, named = [], {}
+    for arg in split_args(args):
+        name, arrow, value = arg.partition("=>")
+        if arrow:
+            named[name.strip().lower()] = unquote(value.strip())
+        else:
+            positional.append(unquote(arg))
+    return positional, named
+
+
+def unquote(value):
+    """Value of a SQL string literal, or the expression unchanged"""
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == "'" else value
+
+
+def expand_path(path):
+    """Local files matching a read_files() path: a file, a directory (recursively) or a glob with {a,b} sets"""
+    match = re.search(r"\{([^{}]*)\}", path)
+    if match:
+        return sorted({
+            file
+            for option in match.group(1).split(",")
+            for file in expand_path(path[:match.start()] + option + path[match.end():])
+        })
+    if os.path.isdir(path):
+        path = os.path.join(path, "**", "*")
+    return sorted(
+        file for file in glob.glob(path, recursive=True)
+        if os.path.isfile(file) and not os.path.basename(file).startswith(("_", "."))
+    )
+
+
+def quote_identifiers(sql):
+    """Spark `identifier` quoting as DuckDB "identifier" quoting, leaving string literals alone"""
+    quoted, in_string = [], False
+    for char in sql:
+        if char == "'":
+            in_string = not in_string
+        quoted.append('"' if char == "`" and not in_string else char)
+    return "".join(quoted)
+
+
+def schema_columns(ddl):
+    """(name, type) pairs of a Spark DDL schema string such as '`id` STRING, `amount` DECIMAL(10,2)'"""
+    return re.findall(r"`([^`]+)`\s+(\w+(?:\(\s*\d+\s*(?:,\s*\d+\s*)?\))?)", ddl)
+
+
+def hll_sketch_from_entries(entries):
+    """Register array of the hll_entry() values of a group: the highest rank seen per register"""
+    registers = np.zeros(1 << HLL_LG_K, dtype=np.uint8)
+    entries = np.array([entry for entry in entries if entry is not None], dtype=np.int64)
+    np.maximum.at(registers, entries >> 6, (entries & 63).astype(np.uint8))
+    return registers.tobytes()
+
+
+def hll_union_sketches(sketches):
+    """Register-wise maximum of sketches, ignoring NULLs; an empty sketch if there are none"""
+    registers = np.zeros(1 << HLL_LG_K, dtype=np.uint8)
+    for sketch in sketches:
+        if sketch is not None:
+            np.maximum(registers, np.frombuffer(sketch, dtype=np.uint8), out=registers)
+    return registers.tobytes()
+
+
+def hll_sketch_estimate(sketch):
+    """Distinct count estimate of a sketch: the HyperLogLog harmonic mean, with linear counting for small counts"""
+    registers = np.frombuffer(sketch, dtype=np.uint8)
+    size = len(registers)
+    estimate = 0.7213 / (1 + 1.079 / size) * size**2 / np.sum(np.ldexp(1.0, -registers.astype(np.int32)))
+    empty = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * size and empty:
+        estimate = size * np.log(size / empty)
+    return int(round(estimate))
+
+
+# Python UDFs behind the HyperLogLog macros: (function, parameter types, return type)
+HLL_FUNCTIONS = {
+    "hll_sketch_from_entries": (hll_sketch_from_entries, ["BIGINT[]"], "BLOB"),
+    "hll_union_sketches": (hll_union_sketches, ["BLOB[]"], "BLOB"),
+    "hll_sketch_estimate": (hll_sketch_estimate, ["BLOB"], "BIGINT"),
+}
+
+
+class LocalDataFrame:
+    """The slice of the pyspark DataFrame API the notebooks use, over a lazy DuckDB relation"""
+    def __init__(self, relation=None, session=None, name=None):
+        self.relation = relation
+        self.session = session
+        self.name = name  # set for DataFrames made by createDataFrame()
+
+    @property
+    def columns(self):
+        return list(self.relation.columns) if self.relation is not None else []
+
+    def collect(self):
+        if self.relation is None:
+            return []
+        row = namedtuple("Row", self.columns, rename=True)
+        return [row(*values) for values in self.relation.fetchall()]
+
+    def first(self):
+        rows = self.limit(1).collect()
+        return rows[0] if rows else None
+
+    def limit(self, num_rows):
+        return LocalDataFrame(self.relation.limit(num_rows) if self.relation is not None else None)
+
+    def count(self):
+        return self.relation.aggregate("COUNT(*)").fetchone()[0] if self.relation is not None else 0
+
+    def toPandas(self):
+        return self.relation.df() if self.relation is not None else pd.DataFrame()
+
+    def createOrReplaceTempView(self, view):
+        self.session.run(f"CREATE OR REPLACE TEMP VIEW {view} AS SELECT * FROM {self.name}")
+
+
+class LocalCatalog:
+    """spark.catalog stand-in"""
+    def __init__(self, session):
+        self.session = session
+
+    def tableExists(self, name):
+        *_, table = name.split(".")
+        # fetchall() closes the result: a partly fetched one keeps the cursor's transaction, and its snapshot, open
+        return self.session.cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_name = ? AND (table_catalog = 'temp'
+                OR (table_catalog = current_database() AND table_schema = current_schema()))
+        """, [table]).fetchall()[0][0] > 0
+
+
+class LocalSparkSession:
+    """spark stand-in that executes the notebooks' Spark SQL on DuckDB, with catalogs stored under root"""
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.connection = duckdb.connect()
+        for name, (function, parameters, return_type) in HLL_FUNCTIONS.items():
+            self.connection.create_function(name, function, parameters, return_type)
+        self.catalog = LocalCatalog(self)
+        self.forecasts = 0
+        self.frames = 0
+        self.history = {}
+        self.lock = threading.Lock()
+        # Each thread runs on its own cursor; USE, temp macros, temp views and registered DataFrames are
+        # per cursor in DuckDB, so they are kept here and replayed on every cursor before it runs a statement
+        self.session_state = [
+            partial(execute_on, statement=f"CREATE OR REPLACE TEMP MACRO {signature} AS {body}")
+            for signature, body in SPARK_FUNCTION_MACROS.items()
+        ]
+        self.threads = threading.local()
+
+    @property
+    def cursor(self):
+        """DuckDB cursor of the calling thread, in sync with the session state"""
+        if getattr(self.threads, "cursor", None) is None:
+            main = threading.current_thread() is threading.main_thread()
+            self.threads.cursor = self.connection if main else self.connection.cursor()
+            self.threads.replayed = 0
+        while self.threads.replayed < len(self.session_state):
+            self.session_state[self.threads.replayed](self.threads.cursor)
+            self.threads.replayed += 1
+        return self.threads.cursor
+
+    def add_session_state(self, action):
+        """Apply a cursor action (a callable taking the cursor) here and on every other thread's cursor"""
+        cursor = self.cursor
+        with self.lock:
+            self.session_state.append(action)
+        action(cursor)
+        self.threads.replayed += 1
+
+    def record_history(self, statement, rows_written):
+        """Add a Delta-style history entry for a statement that writes a table"""
+        for pattern, operation in WRITE_OPERATIONS:
+            match = re.match(pattern, statement, flags=re.IGNORECASE)
+            if match:
+                metrics = {"numOutputRows": str(rows_written)} if rows_written is not None else {}
+                with self.lock:
+                    entries = self.history.setdefault(match.group(1).split(".")[-1].lower(), [])
+                    entries.append((len(entries), datetime.datetime.now(), operation, metrics))
+                return
+
+    def describe_history(self, table, limit=None):
+        """DESCRIBE HISTORY of a table written in this session: version, timestamp, operation, operationMetrics"""
+        entries = sorted(self.history.get(table.split(".")[-1].lower(), []), reverse=True)[:limit]
+        if not entries:
+            return """
+                SELECT CAST(NULL AS BIGINT) as version, CAST(NULL AS TIMESTAMP) as timestamp,
+                       CAST(NULL AS STRING) as operation, CAST(NULL AS MAP(STRING, STRING)) as operationMetrics
+                WHERE false
+            """
+        values = []
+        for version, timestamp, operation, metrics in entries:
+            metrics_map = ", ".join(f"'{key}': '{value}'" for key, value in metrics.items())
+            values.append(f"({version}, TIMESTAMP '{timestamp}', '{operation}', MAP {{{metrics_map}}}::MAP(STRING, STRING))")
+        values = ", ".join(values)
+        return f"SELECT * FROM (VALUES {values}) history(version, timestamp, operation, operationMetrics) ORDER BY version DESC"
+
+    def sql(self, sql):
+        """Run a Spark SQL script; the last statement's result comes back as a LocalDataFrame if it is a query"""
+        result = LocalDataFrame()
+        for statement in split_statements(sql):
+            result = self.execute(statement)
+        return result
+
+    def execute(self, statement):
+        """Run one Spark SQL statement through its DuckDB translation and record it if it writes a table"""
+        translated = self.translate(statement)
+        if translated and translated[-1].lstrip("( \n").upper().startswith(QUERY_PREFIXES):
+            for part in translated[:-1]:
+                self.run(part)
+            return LocalDataFrame(self.cursor.sql(translated[-1]))
+        rows_written = None
+        for part in translated:
+            cursor = self.run(part)
+            if cursor.description and cursor.description[0][0] == "Count":
+                rows_written = next(iter(cursor.fetchall()), (rows_written,))[0]
+        self.record_history(statement, rows_written)
+        return LocalDataFrame()
+
+    def run(self, statement):
+        """Execute one DuckDB statement on the thread's cursor, sharing it with the other cursors if it is session state"""
+        if re.match(SESSION_STATEMENT, statement, flags=re.IGNORECASE):
+            self.add_session_state(partial(execute_on, statement=statement))
+            return self.cursor
+        return self.cursor.execute(statement)
+
+    def table(self, name):
+        return self.sql(f"SELECT * FROM {name}")
+
+    def createDataFrame(self, data):
+        """DataFrame over a pandas DataFrame, registered on every thread's cursor"""
+        with self.lock:
+            self.frames += 1
+            name = f"local_dataframe_{self.frames}"
+        self.add_session_state(lambda cursor: cursor.register(name, data))
+        return LocalDataFrame(self.cursor.table(name), self, name)
+
+    # Translation of one Spark SQL statement into DuckDB statements
+
+    def translate(self, statement):
+        statement = self.translate_read_files(statement)
+        statement = self.translate_ai_forecast(statement)
+        statement = quote_identifiers(statement)
+        statement = re.sub(r"\*\s+EXCEPT\s*\(", "* EXCLUDE (", statement, flags=re.IGNORECASE)
+
+        match = re.fullmatch(r"CREATE\s+CATALOG\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", statement, flags=re.IGNORECASE)
+        if match:
+            return [self.attach(match.group(1))]
+        match = re.fullmatch(r"USE\s+CATALOG\s+(\w+)", statement, flags=re.IGNORECASE)
+        if match:
+            return [self.attach(match.group(1)), f"USE {match.group(1)}"]
+        match = re.fullmatch(r"USE\s+(?:SCHEMA|DATABASE)\s+(\w+)", statement, flags=re.IGNORECASE)
+        if match:
+            return [f"USE {match.group(1)}"]
+        match = re.fullmatch(r"CREATE\s+VOLUME\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)", statement, flags=re.IGNORECASE)
+        if match:
+            os.makedirs(os.path.join(self.root, "Volumes", *match.group(1).split(".")), exist_ok=True)
+            return []
+        match = re.fullmatch(r"SHOW\s+TABLES\s+IN\s+(?:(\w+)\.)?(\w+)", statement, flags=re.IGNORECASE)
+        if match:
+            catalog = f"'{match.group(1)}'" if match.group(1) else "current_database()"
+            return [f"""
+                SELECT table_schema as database, table_name as tableName, false as isTemporary
+                FROM information_schema.tables
+                WHERE table_catalog = {catalog} AND table_schema = '{match.group(2)}'
+                ORDER BY table_name
+            """]
+        match = re.fullmatch(r"DESCRIBE\s+HISTORY\s+([\w.]+)(?:\s+LIMIT\s+(\d+))?", statement, flags=re.IGNORECASE)
+        if match:
+            return [self.describe_history(match.group(1), int(match.group(2)) if match.group(2) else None)]
+        match = re.fullmatch(r"INSERT\s+INTO\s+([\w.]+)\s+REPLACE\s+WHERE\s+(.*?)\s+(SELECT\b.*)", statement,
+                             flags=re.IGNORECASE | re.DOTALL)
+        if match:
+            table, predicate, select = match.groups()
+            return ["BEGIN TRANSACTION", f"DELETE FROM {table} WHERE {predicate}", f"INSERT INTO {table} {select}", "COMMIT"]
+        match = re.fullmatch(r"(CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+))\s+"
+                             r"((?:CLUSTER|PARTITIONED)\s+BY)\s*\(([^)]*)\)\s+AS\s+(.*)", statement,
+                             flags=re.IGNORECASE | re.DOTALL)
+        if match:
+            create, table, layout, columns, select = match.groups()
+            layout = f"{' '.join(layout.upper().split())} ({columns.strip()})"
+            return [f"{create} AS SELECT * FROM ({select}) ORDER BY {columns}", f"COMMENT ON TABLE {table} IS '{layout}'"]
+        match = re.fullmatch(r"OPTIMIZE\s+([\w.]+)(?:\s+ZORDER\s+BY\s*\(([^)]*)\))?", statement, flags=re.IGNORECASE)
+        if match:
+            return self.optimize(*match.groups())
+        match = re.fullmatch(r"ANALYZE\s+TABLE\s+([\w.]+)\s+COMPUTE\s+(?:DELTA\s+)?STATISTICS\b.*", statement,
+                             flags=re.IGNORECASE | re.DOTALL)
+        if match:
+            return [f"ANALYZE {match.group(1)}"]
+        return [statement]
+
+    def optimize(self, table, zorder_columns=None):
+        """Statements re-sorting a table on its CLUSTER BY columns, or its partition then ZORDER BY columns"""
+        name = table.split(".")[-1]
+        layout = self.cursor.execute("""
+            SELECT comment FROM duckdb_tables()
+            WHERE database_name = current_database() AND schema_name = current_schema() AND table_name = ?
+        """, [name]).fetchone()
+        layout = (layout[0] if layout else None) or ""
+        match = re.fullmatch(r"(CLUSTER|PARTITIONED) BY \((.*)\)", layout)
+        columns = [match.group(2)] if match else []
+        if zorder_columns and (not match or match.group(1) == "PARTITIONED"):
+            columns.append(zorder_columns)
+        if not columns:
+            return []  # nothing to cluster on; DuckDB has no small files to compact
+        statements = ["BEGIN TRANSACTION", f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {table} ORDER BY {', '.join(columns)}"]
+        if layout:
+            statements.append(f"COMMENT ON TABLE {table} IS '{layout}'")
+        return statements + ["COMMIT"]
+
+    def attach(self, catalog):
+        """ATTACH statement for a catalog stored as <root>/<catalog>.duckdb"""
+        return f"ATTACH IF NOT EXISTS '{os.path.join(self.root, catalog)}.duckdb' AS {catalog}"
+
+    def translate_read_files(self, statement):
+        """Replace read_files() calls with reads of the local files; SELECT * leaves out the hidden _metadata"""
+        if find_call(statement, "read_files") is None:
+            return statement
+        statement = re.sub(r"\bSELECT\s+\*(?!\s*EXCLUDE)", "SELECT * EXCLUDE (_metadata)", statement, flags=re.IGNORECASE)
+        call = find_call(statement, "read_files")
+        while call is not None:
+            start, end, args = call
+            statement = statement[:start] + self.read_files_source(args) + statement[end:]
+            call = find_call(statement, "read_files")
+        return statement
+
+    def read_files_source(self, args):
+        """DuckDB subquery reading the files of a read_files() call with its declared schema"""
+        (path, *_), options = named_args(args)
+        files = expand_path(path)
+        if not files:
+            raise FileNotFoundError(f"read_files: no files match {path}")
+        file_format = options.get("format", "csv")
+        columns = schema_columns(options.get("schema", ""))
+        file_list = "[" + ", ".join(f"'{file}'" for file in files) + "]"
+        if file_format == "csv":
+            header = options.get("header", "false").lower() == "true"
+            if columns:
+                types = ", ".join(f"'{name}': '{data_type}'" for name, data_type in columns)
+                reader = f"read_csv({file_list}, header = {header}, columns = {{{types}}}, auto_detect = false, filename = true)"
+            else:
+                reader = f"read_csv({file_list}, header = {header}, filename = true)"
+        elif file_format == "parquet":
+            reader = f"read_parquet({file_list}, hive_partitioning = false, filename = true)"
+        else:
+            raise ValueError(f"read_files: unsupported format {file_format}")
+        selected = ", ".join(f'CAST("{name}" AS {data_type}) as "{name}"' for name, data_type in columns) or "* EXCLUDE (filename)"
+        rescued = options.get("rescueddatacolumn")
+        if rescued:
+            selected += f', CAST(NULL AS STRING) as "{rescued}"'
+        return f"(SELECT {selected}, struct_pack(file_path := filename) as _metadata FROM {reader})"
+
+    def translate_ai_forecast(self, statement):
+        """Replace an AI_FORECAST() call with a temp view of the local forecast"""
+        call = find_call(statement, "AI_FORECAST")
+        if call is None:
+            return statement
+        start, end, args = call
+        (source, *_), options = named_args(args)
+        table = re.fullmatch(r"TABLE\s*\(\s*(.+?)\s*\)", source, flags=re.IGNORECASE | re.DOTALL).group(1)
+        history = self.sql(f"SELECT * FROM {table}").toPandas()
+        horizon = self.sql(f"SELECT CAST({options['horizon']} AS DATE) as horizon").first().horizon
+        group_col = options.get("group_col")
+        if group_col and re.match(r"array\s*\(", group_col, flags=re.IGNORECASE):
+            group_col = re.findall(r"'([^']*)'", group_col)
+        forecast = batch_forecast(history, options["time_col"], options["value_col"], group_col, horizon)
+        self.forecasts += 1
+        view = f"local_ai_forecast_{self.forecasts}"
+        self.createDataFrame(forecast).createOrReplaceTempView(view)
+        return statement[:start] + view + statement[end:]
+
+
+@dataclass
+class FileInfo:
+    """dbutils.fs.ls() entry; directory paths and names end with '/'"""
+    path: str
+    name: str
+    size: int
+    modificationTime: int
+
+    def isDir(self):
+        return self.name.endswith("/")
+
+
+class LocalFs:
+    """dbutils.fs stand-in over the local filesystem"""
+    def ls(self, path):
+        entries = []
+        for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+            suffix = "/" if entry.is_dir() else ""
+            stat = entry.stat()
+            entries.append(FileInfo(
+                os.path.join(path, entry.name) + suffix, entry.name + suffix,
+                0 if suffix else stat.st_size, int(stat.st_mtime * 1000),
+            ))
+        return entries
+
+    def mkdirs(self, path):
+        os.makedirs(path, exist_ok=True)
+        return True
+
+
+class LocalWidgets:
+    """dbutils.widgets stand-in: declared defaults, overridden by the params given to the runner"""
+    def __init__(self, params=None):
+        self.params = {name: str(value) for name, value in (params or {}).items()}
+        self.values = {}
+
+    def text(self, name, default_value, label=None):
+        self.values[name] = self.params.get(name, default_value)
+
+    def dropdown(self, name, default_value, choices, label=None):
+        value = self.params.get(name, default_value)
+        if value not in choices:
+            raise ValueError(f"Widget {name}: {value!r} is not one of {choices}")
+        self.values[name] = value
+
+    def get(self, name):
+        return self.values[name]
+
+
+class NotebookExit(Exception):
+    """Raised by dbutils.notebook.exit(); the runner stops the notebook there"""
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
+
+
+class LocalNotebook:
+    """dbutils.notebook stand-in"""
+    def exit(self, value):
+        raise NotebookExit(value)
+
+
+class LocalDbutils:
+    """dbutils stand-in with widgets, fs and notebook.exit()"""
+    def __init__(self, params=None):
+        self.widgets = LocalWidgets(params)
+        self.fs = LocalFs()
+        self.notebook = LocalNotebook()
+
+
+def display(data, max_rows=20):
+    """Print the first rows of a LocalDataFrame or pandas DataFrame"""
+    if hasattr(data, "toPandas"):
+        data = data.limit(max_rows).toPandas()
+    print(data.head(max_rows).to_string(index=False) if isinstance(data, pd.DataFrame) else data)
@@ -0,0 +1,108 @@
+"""
+Dependency-aware, concurrent execution of a notebook's table-writing statements.
+
+The notebooks add their statements to a PipelineDag instead of running them one by one. Each statement
+writes one table and references others (FROM / JOIN / USING / INTO / UPDATE / TABLE(...)); a statement
+depends on the latest earlier statement that writes a table it reads or writes, and on the earlier
+statements that read a table it writes, so every table sees the same sequence of reads and writes as a
+sequential run. Extra ordering that the SQL does not show (e.g. a manifest update that must follow a
+load) is declared with `after`.
+
+run() executes the DAG on a bounded thread pool through PipelineMetrics.sql(), so Spark runs independent
+statements as concurrent jobs, then prints the critical path: the chain of dependent statements whose
+durations add up to the longest time, which bounds the wall time however many workers are used.
+"""
+
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN|USING|INTO|UPDATE)\s+([A-Za-z_][\w.]*)|\bTABLE\s*\(\s*([A-Za-z_][\w.]*)",
+    flags=re.IGNORECASE,
+)
+
+
+def table_key(name):
+    """Unqualified, lower-case table name"""
+    return name.split(".")[-1].lower()
+
+
+def referenced_tables(sql):
+    """Unqualified names of the tables a statement reads from or writes to"""
+    return {table_key(name) for match in TABLE_REFERENCE.findall(sql) for name in match if name}
+
+
+class PipelineDag:
+    """Collects table-writing statements and runs them concurrently in dependency order"""
+    def __init__(self, metrics, max_workers=4):
+        self.metrics = metrics
+        self.max_workers = max(1, max_workers)
+        self.nodes = []
+
+    def add(self, table_name, sql, after=()):
+        """Add a statement writing table_name, returning its node id for use in `after`"""
+        writes = table_key(table_name)
+        reads = referenced_tables(sql) - {writes}
+        depends_on = set(after)
+        last_writer = {}
+        for node in self.nodes:
+            if node["writes"] in reads or node["writes"] == writes:
+                last_writer[node["writes"]] = node["id"]  # read-after-write and write-after-write
+            if writes in node["reads"]:
+                depends_on.add(node["id"])  # write-after-read
+        depends_on |= set(last_writer.values())
+        node_id = len(self.nodes)
+        self.nodes.append({
+            "id": node_id, "table": table_name, "sql": sql, "writes": writes, "reads": reads,
+            "depends_on": depends_on, "seconds": None,
+        })
+        return node_id
+
+    def run(self):
+        """Run every added statement with at most max_workers at a time, print the critical path and reset the DAG"""
+        nodes, self.nodes = self.nodes, []
+        if not nodes:
+            return []
+        start = time.perf_counter()
+        done, running = set(), {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(done) < len(nodes):
+                for node in nodes:
+                    if node["id"] not in done and node["id"] not in running.values() and node["depends_on"] <= done:
+                        running[pool.submit(self.run_node, node)] = node["id"]
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()  # re-raises a failed statement; queued statements are not started
+                    done.add(running.pop(future))
+        wall_s = time.perf_counter() - start
+        self.report(nodes, wall_s)
+        return nodes
+
+    def run_node(self, node):
+        node_start = time.perf_counter()
+        self.metrics.sql(node["table"], node["sql"])
+        node["seconds"] = time.perf_counter() - node_start
+
+    @staticmethod
+    def critical_path(nodes):
+        """Longest chain of dependent nodes by total duration, as a list of nodes"""
+        finish, previous = {}, {}
+        for node in nodes:  # nodes are in insertion order, which is a topological order
+            parent = max(node["depends_on"], key=lambda node_id: finish[node_id], default=None)
+            finish[node["id"]] = node["seconds"] + (finish[parent] if parent is not None else 0)
+            previous[node["id"]] = parent
+        node_id = max(finish, key=finish.get)
+        path = []
+        while node_id is not None:
+            path.append(nodes[node_id])
+            node_id = previous[node_id]
+        return path[::-1]
+
+    def report(self, nodes, wall_s):
+        path = self.critical_path(nodes)
+        total_s = sum(node["seconds"] for node in nodes)
+        path_s = sum(node["seconds"] for node in path)
+        print(f"🕸️ {len(nodes)} statements in {wall_s:.1f}s wall with {self.max_workers} worker(s): "
+              f"{total_s:.1f}s sequential, {path_s:.1f}s critical path")
+        print("   Critical path: " + " → ".join(f"{node['table']} ({node['seconds']:.1f}s)" for node in path))
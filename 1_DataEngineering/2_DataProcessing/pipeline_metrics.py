@@ -0,0 +1,115 @@
+"""
+Per-statement instrumentation of the medallion notebooks.
+
+Each table-writing statement runs through PipelineMetrics.sql(), which times it and reads what the write
+did from the table's latest Delta commit (DESCRIBE HISTORY ... LIMIT 1) instead of re-scanning the table
+with COUNT(*). Rows, bytes and files come from the commit's operationMetrics:
+
+| Operation | input_rows | output_rows | bytes_written | files_written |
+|---|---|---|---|---|
+| CREATE OR REPLACE TABLE AS SELECT / WRITE | - | numOutputRows | numOutputBytes | numFiles |
+| MERGE | numSourceRows | numTargetRowsInserted + numTargetRowsUpdated | numTargetBytesAdded | numTargetFilesAdded |
+| DELETE | - | numDeletedRows | numAddedBytes | numAddedFiles |
+
+Metrics missing from a commit are left NULL. The rows are buffered and appended to
+pipeline_run_metrics by flush(), keyed by run_id: pass the same run_id (e.g. {{job.run_id}}) to
+every notebook of a job run to group its stages.
+"""
+
+import datetime
+import threading
+import uuid
+
+METRICS_TABLE = "pipeline_run_metrics"
+
+METRICS_COLUMNS = [
+    ("run_id", "STRING"),
+    ("notebook", "STRING"),
+    ("table_name", "STRING"),
+    ("operation", "STRING"),
+    ("table_version", "BIGINT"),
+    ("started_at", "TIMESTAMP"),
+    ("ended_at", "TIMESTAMP"),
+    ("duration_s", "DOUBLE"),
+    ("input_rows", "BIGINT"),
+    ("output_rows", "BIGINT"),
+    ("bytes_written", "BIGINT"),
+    ("files_written", "BIGINT"),
+]
+
+# operationMetrics keys per measure, first match wins (MERGE keys come first)
+OPERATION_METRICS = {
+    "input_rows": [["numSourceRows"]],
+    "output_rows": [["numTargetRowsInserted", "numTargetRowsUpdated"], ["numOutputRows"], ["numDeletedRows"]],
+    "bytes_written": [["numTargetBytesAdded"], ["numOutputBytes"], ["numAddedBytes"]],
+    "files_written": [["numTargetFilesAdded"], ["numFiles"], ["numAddedFiles"]],
+}
+
+
+def commit_measure(operation_metrics, measure):
+    """Sum of the first set of operationMetrics keys recorded for a measure, or None"""
+    for keys in OPERATION_METRICS[measure]:
+        if all(key in operation_metrics for key in keys):
+            return sum(int(operation_metrics[key]) for key in keys)
+    return None
+
+
+def sql_literal(value):
+    """SQL literal of a metrics value"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, datetime.datetime):
+        return f"TIMESTAMP'{value.isoformat(sep=' ')}'"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+class PipelineMetrics:
+    """Runs a notebook's table-writing statements and records their timing and Delta commit metrics"""
+    def __init__(self, spark, notebook, run_id=None):
+        self.spark = spark
+        self.notebook = notebook
+        self.run_id = run_id or uuid.uuid4().hex
+        self.rows = []
+        self.lock = threading.Lock()  # statements may run on PipelineDag worker threads
+
+    def sql(self, table_name, sql):
+        """Run a statement that writes table_name, record its metrics and print a one-line summary"""
+        started_at = datetime.datetime.now()
+        self.spark.sql(sql)
+        ended_at = datetime.datetime.now()
+        commit = self.spark.sql(f"DESCRIBE HISTORY {table_name} LIMIT 1").first()
+        operation_metrics = dict(commit.operationMetrics or {}) if commit else {}
+        row = {
+            "run_id": self.run_id,
+            "notebook": self.notebook,
+            "table_name": table_name,
+            "operation": commit.operation if commit else None,
+            "table_version": commit.version if commit else None,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "duration_s": round((ended_at - started_at).total_seconds(), 3),
+            **{measure: commit_measure(operation_metrics, measure) for measure in OPERATION_METRICS},
+        }
+        rows_written = "?" if row["output_rows"] is None else f"{row['output_rows']:,}"
+        with self.lock:
+            self.rows.append(row)
+            print(f"📊 {table_name}: {row['operation']} wrote {rows_written} rows in {row['duration_s']:.1f}s")
+        return row
+
+    def flush(self):
+        """Append the buffered rows to pipeline_run_metrics"""
+        self.spark.sql(f"""
+            CREATE TABLE IF NOT EXISTS {METRICS_TABLE} (
+                {", ".join(f"{name} {data_type}" for name, data_type in METRICS_COLUMNS)}
+            )
+        """)
+        if self.rows:
+            values = ", ".join(
+                "(" + ", ".join(sql_literal(row[name]) for name, _ in METRICS_COLUMNS) + ")"
+                for row in self.rows
+            )
+            self.spark.sql(f"INSERT INTO {METRICS_TABLE} VALUES {values}")
+            self.rows = []
+        return self.spark.sql(f"SELECT * FROM {METRICS_TABLE} WHERE run_id = '{self.run_id}' ORDER BY started_at")
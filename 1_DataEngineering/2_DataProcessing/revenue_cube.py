@@ -0,0 +1,136 @@
+"""
+Multi-grain revenue rollup cube over gold_daily_revenue.
+
+gold_revenue_cube pre-aggregates gold_daily_revenue in one GROUPING SETS pass over
+- date grain: day / week (starting Monday) / month / quarter, as date_grain plus the period_start date
+- geography: facility / partner / market, as geo_level plus the facility_id, facility_name, partner_name
+  and market columns of that level (NULL above it; partners can span markets)
+- revenue stream: ticket / fnb / retail, plus 'all' for the three together
+so questions at any of these grains (market x quarter, partner x week, ...) read a handful of cube rows
+instead of gold_daily_revenue or silver.
+
+Revenue, transactions, visitors and repeat_visitors are additive. Attendance comes from
+tickets, so visitors are 0 on the fnb and retail rows and complete on the ticket and 'all' rows. Ratio
+KPIs are ratios of sums, e.g. the F&B per-capita of a market-quarter is the revenue of its fnb row over the
+visitors of its 'all' row, and coarser geographies can be summed from finer ones.
+
+Distinct customers are not additive: each row also carries customers_sketch, the HyperLogLog sketch merged from
+the gold_daily_revenue sketches of its days, facilities and streams (customer_sketches.py), and its estimate
+unique_customers. Sketches of several cube rows merge with hll_union_agg() for groupings the cube lacks.
+
+Incremental gold runs recompute only the periods that overlap the affected months: affected_periods_predicate()
+selects those cube rows and cube_source_range() the gold_daily_revenue days they are built from.
+"""
+
+import datetime
+
+from customer_sketches import CUSTOMER_SKETCHES
+
+DATE_GRAINS = {
+    "day": "transaction_date",
+    "week": "CAST(DATE_TRUNC('WEEK', transaction_date) AS DATE)",
+    "month": "CAST(DATE_TRUNC('MONTH', transaction_date) AS DATE)",
+    "quarter": "CAST(DATE_TRUNC('QUARTER', transaction_date) AS DATE)",
+}
+
+# Columns grouped at each geography level, finest first
+GEO_LEVELS = {
+    "facility": ["facility_id", "facility_name", "partner_name", "market"],
+    "partner": ["partner_name"],
+    "market": ["market"],
+}
+
+# gold_daily_revenue columns behind each stream's revenue, transactions, visitors, repeat_visitors and customers_sketch
+REVENUE_STREAMS = {
+    "ticket": ("ticket_revenue", "ticket_transactions", "total_visitors", "repeat_visitors", CUSTOMER_SKETCHES["ticket"]),
+    "fnb": ("fnb_revenue", "fnb_transactions", "0", "0", CUSTOMER_SKETCHES["fnb"]),
+    "retail": ("retail_revenue", "retail_transactions", "0", "0", CUSTOMER_SKETCHES["retail"]),
+}
+
+
+def revenue_cube_select(date_filter="TRUE", source="gold_daily_revenue"):
+    """gold_revenue_cube rows for the days of source matching date_filter"""
+    streams = " UNION ALL ".join(
+        f"""
+        SELECT transaction_date, facility_id, facility_name, partner_name, market, '{stream}' as revenue_stream,
+               {revenue} as revenue, {transactions} as transactions, {visitors} as visitors, {repeat_visitors} as repeat_visitors,
+               {customers_sketch} as customers_sketch
+        FROM {source} WHERE {date_filter}"""
+        for stream, (revenue, transactions, visitors, repeat_visitors, customers_sketch) in REVENUE_STREAMS.items()
+    )
+    periods = ", ".join(f"{expression} as {grain}_start" for grain, expression in DATE_GRAINS.items())
+    grouping_sets = ", ".join(
+        f"({', '.join([f'{grain}_start', *columns, *stream])})"
+        for grain in DATE_GRAINS
+        for columns in GEO_LEVELS.values()
+        for stream in (["revenue_stream"], [])
+    )
+    date_grain = " ".join(f"WHEN GROUPING({grain}_start) = 0 THEN '{grain}'" for grain in DATE_GRAINS)
+    geo_level = " ".join(f"WHEN GROUPING({columns[0]}) = 0 THEN '{level}'" for level, columns in GEO_LEVELS.items())
+    return f"""
+    SELECT
+        CASE {date_grain} END as date_grain,
+        COALESCE({", ".join(f"{grain}_start" for grain in DATE_GRAINS)}) as period_start,
+        CASE {geo_level} END as geo_level,
+        facility_id,
+        facility_name,
+        partner_name,
+        market,
+        CASE WHEN GROUPING(revenue_stream) = 1 THEN 'all' ELSE revenue_stream END as revenue_stream,
+        SUM(revenue) as revenue,
+        SUM(transactions) as transactions,
+        SUM(visitors) as visitors,
+        SUM(repeat_visitors) as repeat_visitors,
+        hll_union_agg(customers_sketch) as customers_sketch,
+        hll_sketch_estimate(hll_union_agg(customers_sketch)) as unique_customers
+    FROM (SELECT *, {periods} FROM ({streams}) streams) periods
+    GROUP BY GROUPING SETS ({grouping_sets})
+    """
+
+
+def month_end(first_day):
+    """Last day of the month starting at first_day"""
+    return (first_day + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+
+
+def period_end(date_grain, period_start):
+    """Last day of a cube period"""
+    if date_grain == "day":
+        return period_start
+    if date_grain == "week":
+        return period_start + datetime.timedelta(days=6)
+    if date_grain == "month":
+        return month_end(period_start)
+    return month_end(period_start.replace(month=period_start.month + 2))
+
+
+def affected_periods(months):
+    """(date_grain, first period_start, last period_start) of the cube periods overlapping the (year, month)s"""
+    periods = set()
+    for year, month in months:
+        first = datetime.date(year, month, 1)
+        quarter = datetime.date(year, 3 * ((month - 1) // 3) + 1, 1)
+        periods |= {
+            ("day", first, month_end(first)),
+            ("week", first - datetime.timedelta(days=first.weekday()), month_end(first)),
+            ("month", first, first),
+            ("quarter", quarter, quarter),
+        }
+    return sorted(periods)
+
+
+def affected_periods_predicate(months):
+    """SQL predicate on gold_revenue_cube matching the periods that overlap the (year, month)s"""
+    return " OR ".join(
+        f"(date_grain = '{grain}' AND period_start BETWEEN DATE'{first}' AND DATE'{last}')"
+        for grain, first, last in affected_periods(months)
+    )
+
+
+def cube_source_range(months):
+    """First and last day of the days that make up the periods overlapping the (year, month)s"""
+    periods = affected_periods(months)
+    return (
+        min(first for _, first, _ in periods),
+        max(period_end(grain, last) for grain, _, last in periods),
+    )
@@ -0,0 +1,143 @@
+"""
+Run the generator and the bronze/silver/gold notebooks locally, without a Databricks workspace.
+
+Each notebook's source is split into its `# COMMAND ----------` cells: `%sql` cells go through
+LocalSparkSession.sql(), Python cells are executed with the local spark, dbutils and display stand-ins
+from local_engine.py, and `%md` cells are skipped. Python cells run in a module registered as __main__, as
+in a notebook, so the generator's process pools can pickle the functions the notebook defines. Absolute /Volumes/... paths are redirected under
+--root, so the generator writes the partner files where the bronze notebook's read_files() finds them.
+
+Every cell is timed; the per-stage and slowest-cell timings are printed at the end and can be written
+as JSON with --timings-json.
+
+Example:
+    python run_local_pipeline.py --root /tmp/entertainment_co --param scale_factor=0.1
+    python run_local_pipeline.py --root /tmp/entertainment_co --stages bronze,silver,gold --param load_mode=incremental
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import types
+
+from local_engine import LocalDbutils, LocalSparkSession, NotebookExit, display
+
+DATA_ENGINEERING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NOTEBOOKS = {
+    "generate": os.path.join(DATA_ENGINEERING_DIR, "1_FakeDataGeneration", "generate_synthetic_csv_data.py"),
+    "bronze": os.path.join(DATA_ENGINEERING_DIR, "2_DataProcessing", "1_load_sheets_to_bronze_tables.py"),
+    "silver": os.path.join(DATA_ENGINEERING_DIR, "2_DataProcessing", "2_load_silver_tables.py"),
+    "gold": os.path.join(DATA_ENGINEERING_DIR, "2_DataProcessing", "3_load_gold_tables.py"),
+}
+
+
+def notebook_cells(path, root):
+    """(kind, title, source) of every cell of a Databricks source notebook, with /Volumes/ paths under root"""
+    with open(path) as notebook:
+        source = notebook.read()
+    source = re.sub(r"(?<=[\"'])/Volumes/", f"{root}/Volumes/", source)
+    cells, title = [], ""
+    for cell in source.split("# COMMAND ----------"):
+        lines = cell.strip().splitlines()
+        if lines and lines[0].startswith("# MAGIC"):
+            lines = [re.sub(r"^# MAGIC ?", "", line) for line in lines]
+            magic, body = lines[0].strip(), "\n".join(lines[1:])
+            if magic == "%md":
+                title = next((line.lstrip("# ").strip() for line in lines[1:] if line.startswith("#")), title)
+            elif magic == "%sql":
+                cells.append(("sql", title, body))
+        elif lines:
+            cells.append(("python", title, "\n".join(lines)))
+    return cells
+
+
+def run_notebook(stage, session, params, root, namespace=None):
+    """Execute one notebook cell by cell as __main__, with its globals copied to namespace, and return the timing of every cell"""
+    path = NOTEBOOKS[stage]
+    notebook_dir = os.path.dirname(path)
+    notebook = types.ModuleType("__main__")
+    notebook.__dict__.update(namespace or {})
+    notebook.__dict__.update({"__file__": path, "spark": session, "dbutils": LocalDbutils(params), "display": display})
+    timings = []
+    previous_dir, previous_main = os.getcwd(), sys.modules["__main__"]
+    os.chdir(notebook_dir)  # notebooks import their sibling modules and resolve paths like a workspace would
+    sys.path.insert(0, notebook_dir)
+    # Pickled functions are looked up by module name, and forked pool workers inherit sys.modules
+    sys.modules["__main__"] = notebook
+    try:
+        for index, (kind, title, source) in enumerate(notebook_cells(path, root)):
+            start = time.perf_counter()
+            exited = False
+            if kind == "sql":
+                result = session.sql(source)
+                if result.columns:
+                    display(result)
+            else:
+                try:
+                    exec(compile(source, f"{path}[cell {index}]", "exec"), notebook.__dict__)
+                except NotebookExit as exit_call:  # dbutils.notebook.exit() skips the remaining cells
+                    print(f"⏹️ {stage} exited: {exit_call.value}")
+                    exited = True
+            timings.append({
+                "stage": stage, "cell": index, "kind": kind, "title": title,
+                "seconds": round(time.perf_counter() - start, 3),
+            })
+            if exited:
+                break
+    finally:
+        sys.modules["__main__"] = previous_main
+        sys.path.remove(notebook_dir)
+        os.chdir(previous_dir)
+        if namespace is not None:
+            namespace.update(vars(notebook))
+    return timings
+
+
+def run_pipeline(root, stages=tuple(NOTEBOOKS), params=None):
+    """Run the given stages in order on one local session and return the timings of every cell"""
+    root = os.path.abspath(root)
+    session = LocalSparkSession(root)
+    timings = []
+    for stage in stages:
+        print(f"▶️ {stage}: {os.path.basename(NOTEBOOKS[stage])}")
+        timings.extend(run_notebook(stage, session, params or {}, root))
+    return timings
+
+
+def print_timings(timings, slowest=10):
+    """Per-stage totals and the slowest cells"""
+    print("\n⏱️ Stage timings:")
+    for stage in dict.fromkeys(timing["stage"] for timing in timings):
+        print(f"   {stage:<10} {sum(t['seconds'] for t in timings if t['stage'] == stage):>9.2f}s")
+    print(f"\n🐢 Slowest {slowest} cells:")
+    for timing in sorted(timings, key=lambda t: t["seconds"], reverse=True)[:slowest]:
+        print(f"   {timing['seconds']:>9.2f}s  {timing['stage']} cell {timing['cell']} ({timing['kind']}) {timing['title']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Entertainment Co. pipeline notebooks on a local DuckDB engine")
+    parser.add_argument("--root", required=True, help="Local directory holding the Volumes/ files and catalog databases")
+    parser.add_argument("--stages", default=",".join(NOTEBOOKS), help=f"Comma-separated stages out of {','.join(NOTEBOOKS)}")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="Notebook widget value, e.g. scale_factor=0.1 (repeatable)")
+    parser.add_argument("--timings-json", help="Write the cell timings to this JSON file")
+    args = parser.parse_args(argv)
+    args.stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in args.stages if stage not in NOTEBOOKS]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    args.params = dict(param.split("=", 1) for param in args.param)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    timings = run_pipeline(args.root, args.stages, args.params)
+    print_timings(timings)
+    if args.timings_json:
+        with open(args.timings_json, "w") as output:
+            json.dump(timings, output, indent=2)
@@ -0,0 +1,290 @@
+# Databricks notebook source
+# MAGIC %md
+# MAGIC # ⚡ Real-Time Peak Times: Streaming Bronze → Silver → Gold
+# MAGIC 
+# MAGIC The batch notebooks refresh gold once per partner delivery. For operators reacting to peak times, this notebook
+# MAGIC runs the ticket path to `gold_hourly_patterns` as Structured Streaming over the real-time event files of
+# MAGIC `generate_synthetic_csv_data.py` (`generation_mode = stream`):
+# MAGIC - **Bronze** — Auto Loader reads `raw_files/stream/<fact>/` with the `<fact>_stream` feed schemas into
+# MAGIC   `bronze_<fact>_stream`, adding the source file and ingestion time like the batch bronze load
+# MAGIC - **Silver** — ticket events get a `watermark_minutes` event-time watermark on `event_timestamp`: a
+# MAGIC   `transaction_id` seen again within it is dropped, and events arriving later than it are dropped as late.
+# MAGIC   Facility attributes are joined from `silver_dim_facilities` into `silver_ticket_sales_stream`
+# MAGIC - **Gold** — every micro-batch recomputes the `(event_hour, facility_id)` slices it touched from
+# MAGIC   `silver_ticket_sales_stream` and merges them into `gold_hourly_patterns_live`, so a retried batch writes
+# MAGIC   the same rows. The table has the `gold_hourly_patterns` columns per clock hour (`event_hour`); grouping it
+# MAGIC   by facility, `visit_hour`, `day_of_week`, `year` and `month` gives the batch table's grain
+# MAGIC 
+# MAGIC Once a gold merge has committed, the micro-batch's events are visible, and `stream_latency_metrics` gets their
+# MAGIC count and their latency from `event_timestamp` to that commit (mean, p50, p95, max), next to the bronze and
+# MAGIC silver lags. After `run_seconds` the streams stop and the notebook reports end-to-end latency and sustained
+# MAGIC throughput per stage.
+# MAGIC 
+# MAGIC **Prerequisites:** Run `2_load_silver_tables.py` once (for `silver_dim_facilities`), and run the simulator
+# MAGIC alongside this notebook, e.g. as a separate task of the same job, with the same file format.
+
+# COMMAND ----------
+
+# MAGIC %sql
+# MAGIC USE CATALOG pedroz_catalog;
+# MAGIC USE SCHEMA entertainment_co;
+
+# COMMAND ----------
+
+import datetime
+import time
+
+from feed_schemas import FACT_FEEDS, RESCUED_DATA_COLUMN, schema_ddl
+from pyspark.sql import functions as F
+from table_layouts import layout_clause
+
+# File format of the simulator's output_format (parquet_partitioned writes parquet stream files too)
+dbutils.widgets.dropdown("source_format", "csv", ["csv", "parquet"], "Stream file format")
+SOURCE_FORMAT = dbutils.widgets.get("source_format")
+dbutils.widgets.text("trigger_seconds", "5", "Micro-batch interval (seconds)")
+TRIGGER = f"{int(dbutils.widgets.get('trigger_seconds'))} seconds"
+dbutils.widgets.text("watermark_minutes", "10", "Event-time watermark (minutes)")
+WATERMARK = f"{int(dbutils.widgets.get('watermark_minutes'))} minutes"
+dbutils.widgets.text("run_seconds", "300", "Run time before the report (0 = until cancelled)")
+RUN_SECONDS = int(dbutils.widgets.get("run_seconds"))
+dbutils.widgets.dropdown("reset", "no", ["no", "yes"], "Drop the streaming tables and checkpoints first")
+RESET = dbutils.widgets.get("reset") == "yes"
+
+RAW_FILES_PATH = "/Volumes/pedroz_catalog/entertainment_co/raw_files"
+STREAM_PATH = f"{RAW_FILES_PATH}/stream"
+CHECKPOINT_PATH = f"{RAW_FILES_PATH}/_checkpoints/stream_hourly_patterns"
+STREAM_TABLES = [*(f"bronze_{feed}_stream" for feed in FACT_FEEDS), "silver_ticket_sales_stream", "gold_hourly_patterns_live"]
+
+# COMMAND ----------
+
+if RESET:
+    for table_name in [*STREAM_TABLES, "stream_latency_metrics"]:
+        spark.sql(f"DROP TABLE IF EXISTS {table_name}")
+    dbutils.fs.rm(CHECKPOINT_PATH, True)
+    print("🧹 Streaming tables and checkpoints dropped")
+
+spark.sql("""
+    CREATE TABLE IF NOT EXISTS stream_latency_metrics (
+        stream_run_id STRING,
+        batch_id BIGINT,
+        visible_at TIMESTAMP,
+        events BIGINT,
+        first_event_timestamp TIMESTAMP,
+        last_event_timestamp TIMESTAMP,
+        p50_bronze_lag_s DOUBLE,
+        p50_silver_lag_s DOUBLE,
+        mean_latency_s DOUBLE,
+        p50_latency_s DOUBLE,
+        p95_latency_s DOUBLE,
+        max_latency_s DOUBLE
+    )
+""")
+STREAM_RUN_ID = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d%H%M%S")
+
+def checkpoint(query_name):
+    """Checkpoint location of one streaming query"""
+    return f"{CHECKPOINT_PATH}/{query_name}"
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🥉 Bronze: Auto Loader
+
+# COMMAND ----------
+
+def start_bronze_stream(feed):
+    """Append every new event file of a fact feed to bronze_<feed>_stream"""
+    table_name = f"bronze_{feed}_stream"
+    reader = (
+        spark.readStream.format("cloudFiles")
+        .option("cloudFiles.format", SOURCE_FORMAT)
+        .option("rescuedDataColumn", RESCUED_DATA_COLUMN)
+        .schema(schema_ddl(f"{feed}_stream"))
+    )
+    if SOURCE_FORMAT == "csv":
+        reader = reader.option("header", "true")
+    return (
+        reader.load(f"{STREAM_PATH}/{feed}/")
+        .select("*", F.col("_metadata.file_path").alias("source_file"), F.current_timestamp().alias("ingestion_timestamp"))
+        .writeStream.queryName(table_name)
+        .option("checkpointLocation", checkpoint(table_name))
+        .trigger(processingTime=TRIGGER)
+        .toTable(table_name)
+    )
+
+queries = [start_bronze_stream(feed) for feed in FACT_FEEDS]
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🥈 Silver: Watermarked Ticket Events
+# MAGIC 
+# MAGIC The same columns as `silver_ticket_sales`, plus `event_timestamp`, its `event_hour` and the silver processing
+# MAGIC time. The facilities join is stream-static: each micro-batch reads the latest `silver_dim_facilities`.
+
+# COMMAND ----------
+
+def wait_for_table(table_name, timeout_s=600):
+    """Wait until the streaming query writing table_name has created it"""
+    deadline = time.time() + timeout_s
+    while not spark.catalog.tableExists(table_name):
+        if time.time() > deadline:
+            raise TimeoutError(f"{table_name} was not created within {timeout_s}s - is the simulator running?")
+        time.sleep(5)
+
+wait_for_table("bronze_ticket_sales_stream")
+facilities = spark.table("silver_dim_facilities").select("facility_id", "facility_name", "partner_name", "market", "experience_type")
+
+silver_tickets = (
+    spark.readStream.table("bronze_ticket_sales_stream")
+    .withWatermark("event_timestamp", WATERMARK)
+    .dropDuplicatesWithinWatermark(["transaction_id"])
+    .join(F.broadcast(facilities), "facility_id", "left")
+    .selectExpr(
+        "transaction_id", "transaction_date", "facility_id", "facility_name", "partner_name", "market",
+        "experience_type", "ip_name", "ticket_type", "quantity", "unit_price", "discount_pct", "total_amount",
+        "customer_id", "is_repeat_visitor", "visit_hour", "channel",
+        "YEAR(transaction_date) as year", "MONTH(transaction_date) as month", "QUARTER(transaction_date) as quarter",
+        "event_timestamp", "date_trunc('HOUR', event_timestamp) as event_hour",
+        "ingestion_timestamp", "current_timestamp() as silver_timestamp",
+    )
+)
+queries.append(
+    silver_tickets.writeStream.queryName("silver_ticket_sales_stream")
+    .option("checkpointLocation", checkpoint("silver_ticket_sales_stream"))
+    .trigger(processingTime=TRIGGER)
+    .toTable("silver_ticket_sales_stream")
+)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## 🥇 Gold: Live Hourly Patterns
+# MAGIC 
+# MAGIC Silver is appended in event-time order, so its files' `event_hour` statistics let the recompute of the
+# MAGIC touched slices skip all but the latest files.
+
+# COMMAND ----------
+
+def hourly_patterns_select(changed_slices):
+    """gold_hourly_patterns_live rows of the (event_hour, facility_id) slices in changed_slices"""
+    return f"""
+    SELECT
+        event_hour,
+        facility_id,
+        facility_name,
+        partner_name,
+        market,
+        HOUR(event_hour) as visit_hour,
+        DAYOFWEEK(event_hour) as day_of_week,
+        CASE WHEN DAYOFWEEK(event_hour) IN (1, 7) THEN 'Weekend' ELSE 'Weekday' END as day_type,
+        YEAR(event_hour) as year,
+        MONTH(event_hour) as month,
+        COUNT(*) as transactions,
+        SUM(quantity) as visitors,
+        SUM(total_amount) as revenue,
+        MAX(event_timestamp) as last_event_timestamp,
+        current_timestamp() as updated_at
+    FROM silver_ticket_sales_stream
+    WHERE event_hour >= (SELECT MIN(event_hour) FROM {changed_slices})
+      AND (event_hour, facility_id) IN (SELECT event_hour, facility_id FROM {changed_slices})
+    GROUP BY event_hour, facility_id, facility_name, partner_name, market
+    """
+
+def publish_hourly_patterns(batch_df, batch_id):
+    """Merge the gold slices touched by a silver micro-batch, then record its events' latency to gold visibility"""
+    if batch_df.isEmpty():
+        return
+    session = batch_df.sparkSession
+    batch_df.createOrReplaceTempView("stream_ticket_batch")
+    changed = "(SELECT DISTINCT event_hour, facility_id FROM stream_ticket_batch)"
+    if not session.catalog.tableExists("gold_hourly_patterns_live"):
+        session.sql(f"""
+            CREATE TABLE gold_hourly_patterns_live {layout_clause("gold_hourly_patterns_live")}
+            AS {hourly_patterns_select(changed)}
+        """)
+    else:
+        session.sql(f"""
+            MERGE INTO gold_hourly_patterns_live g
+            USING ({hourly_patterns_select(changed)}) u
+            ON g.event_hour = u.event_hour AND g.facility_id = u.facility_id
+            WHEN MATCHED THEN UPDATE SET *
+            WHEN NOT MATCHED THEN INSERT *
+        """)
+    # The merge has committed: this batch's events are visible in gold from now on
+    session.sql(f"""
+        INSERT INTO stream_latency_metrics
+        SELECT
+            '{STREAM_RUN_ID}', {batch_id}, visible_at, COUNT(*),
+            MIN(event_timestamp), MAX(event_timestamp),
+            percentile_approx(bronze_lag_s, 0.5), percentile_approx(silver_lag_s, 0.5),
+            AVG(latency_s), percentile_approx(latency_s, 0.5), percentile_approx(latency_s, 0.95), MAX(latency_s)
+        FROM (
+            SELECT
+                visible_at,
+                event_timestamp,
+                (unix_micros(ingestion_timestamp) - unix_micros(event_timestamp)) / 1e6 as bronze_lag_s,
+                (unix_micros(silver_timestamp) - unix_micros(event_timestamp)) / 1e6 as silver_lag_s,
+                (unix_micros(visible_at) - unix_micros(event_timestamp)) / 1e6 as latency_s
+            FROM (SELECT *, current_timestamp() as visible_at FROM stream_ticket_batch)
+        )
+        GROUP BY visible_at
+    """)
+
+wait_for_table("silver_ticket_sales_stream")
+queries.append(
+    spark.readStream.table("silver_ticket_sales_stream")
+    .writeStream.queryName("gold_hourly_patterns_live")
+    .foreachBatch(publish_hourly_patterns)
+    .option("checkpointLocation", checkpoint("gold_hourly_patterns_live"))
+    .trigger(processingTime=TRIGGER)
+    .start()
+)
+print(f"⚡ {len(queries)} streaming queries running every {TRIGGER} (run {STREAM_RUN_ID})")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ## ⏱️ Run and Report
+# MAGIC 
+# MAGIC Throughput per stage is the rows processed over the span of the query's recent progress updates; rows dropped
+# MAGIC by the watermark are events that arrived more than `watermark_minutes` late.
+
+# COMMAND ----------
+
+if not RUN_SECONDS:
+    spark.streams.awaitAnyTermination()
+
+time.sleep(RUN_SECONDS)
+progress = {query.name: query.recentProgress for query in queries}
+for query in queries:
+    query.stop()
+
+def stage_throughput(updates):
+    """(rows, rows/s) of a query's progress updates"""
+    rows = sum(update["numInputRows"] for update in updates)
+    if len(updates) < 2:
+        return rows, None
+    first, last = (datetime.datetime.fromisoformat(updates[i]["timestamp"].replace("Z", "+00:00")) for i in (0, -1))
+    span_s = (last - first).total_seconds() + updates[-1]["durationMs"].get("triggerExecution", 0) / 1000
+    return rows, rows / span_s if span_s else None
+
+print(f"📈 Sustained throughput over the last {RUN_SECONDS}s:")
+for name, updates in progress.items():
+    rows, rows_per_s = stage_throughput(updates)
+    late = sum(operator.get("numRowsDroppedByWatermark", 0) for update in updates for operator in update.get("stateOperators", []))
+    print(f"   {name:<30} {rows:>10,} rows  {rows_per_s or 0:>10,.0f} rows/s" + (f"  ({late:,} late rows dropped)" if late else ""))
+
+display(spark.sql(f"""
+SELECT
+    SUM(events) as events,
+    ROUND(SUM(events) / NULLIF(unix_millis(MAX(visible_at)) - unix_millis(MIN(visible_at)), 0) * 1000, 1) as events_per_second,
+    ROUND(SUM(mean_latency_s * events) / SUM(events), 2) as mean_latency_s,
+    ROUND(percentile(p50_latency_s, 0.5), 2) as median_batch_p50_latency_s,
+    ROUND(MAX(p95_latency_s), 2) as max_batch_p95_latency_s,
+    ROUND(MAX(max_latency_s), 2) as max_latency_s,
+    ROUND(percentile(p50_bronze_lag_s, 0.5), 2) as median_bronze_lag_s,
+    ROUND(percentile(p50_silver_lag_s, 0.5), 2) as median_silver_lag_s
+FROM stream_latency_metrics
+WHERE stream_run_id = '{STREAM_RUN_ID}'
+"""))
@@ -0,0 +1,61 @@
+"""
+Physical layout of the silver fact and gold tables.
+
+Downstream queries (Genie, the AI/BI dashboard, the gold builds) filter and group by transaction_date,
+year/month, facility_id, partner_name and market, so each table is clustered on the keys its readers
+filter by. The silver and gold notebooks apply the layout when they create a table:
+- "cluster_by": liquid clustering keys (CREATE TABLE ... CLUSTER BY), the default for every table
+- "partition_by": Hive-style partition columns for the large silver facts, used instead of liquid
+  clustering when the silver notebook's fact_layout widget is "partitioned"; the clustering keys are then
+  applied with OPTIMIZE ... ZORDER BY within each partition
+
+Liquid clustering only clusters what OPTIMIZE rewrites, so after their loads the notebooks run the
+maintenance_statements() of every table they wrote: OPTIMIZE, then ANALYZE for the column statistics
+used by data skipping and the optimizer. benchmark_table_layout.py measures the file pruning on typical
+dashboard filters.
+"""
+
+TABLE_LAYOUTS = {
+    # Silver facts: dashboard filters are date ranges and single facilities / partners / markets;
+    # partner_name and market are attributes of facility_id, so facility clustering prunes them too
+    "silver_ticket_sales": {"cluster_by": ["transaction_date", "facility_id"], "partition_by": ["year", "month"]},
+    "silver_fnb_sales": {"cluster_by": ["transaction_date", "facility_id"], "partition_by": ["year", "month"]},
+    "silver_retail_sales": {"cluster_by": ["transaction_date", "facility_id"], "partition_by": ["year", "month"]},
+    # Gold: the grain of each table, month first for the month-grained ones
+    "gold_daily_revenue": {"cluster_by": ["transaction_date", "facility_id"]},
+    "gold_monthly_partner_performance": {"cluster_by": ["year", "month", "partner_name"]},
+    "gold_ip_performance": {"cluster_by": ["year", "month", "market"]},
+    "gold_fnb_item_performance": {"cluster_by": ["year", "month", "market"]},
+    "gold_hourly_patterns": {"cluster_by": ["year", "month", "facility_id"]},
+    "gold_daily_revenue_ts": {"cluster_by": ["partner_name", "transaction_date"]},
+    "gold_facility_revenue_ts": {"cluster_by": ["facility_id", "revenue_stream", "transaction_date"]},
+    # Cube queries pick one grain and geography level, then a period range
+    "gold_revenue_cube": {"cluster_by": ["date_grain", "geo_level", "period_start"]},
+    "gold_campaign_performance": {"cluster_by": ["campaign_id", "facility_id"]},
+    # Written by stream_hourly_patterns.py, read for the latest hours
+    "gold_hourly_patterns_live": {"cluster_by": ["event_hour", "facility_id"]},
+}
+
+
+def is_partitioned(layout, partitioned):
+    """Whether a table with this layout is partitioned rather than liquid-clustered"""
+    return partitioned and "partition_by" in layout
+
+
+def layout_clause(table_name, partitioned=False, layout=None):
+    """CLUSTER BY or PARTITIONED BY clause for the CREATE TABLE of table_name (or of a copy with its layout)"""
+    layout = layout or TABLE_LAYOUTS.get(table_name)
+    if not layout:
+        return ""
+    if is_partitioned(layout, partitioned):
+        return f"PARTITIONED BY ({', '.join(layout['partition_by'])})"
+    return f"CLUSTER BY ({', '.join(layout['cluster_by'])})"
+
+
+def maintenance_statements(table_name, partitioned=False, layout=None):
+    """OPTIMIZE and ANALYZE statements for a table created with layout_clause(table_name, partitioned, layout)"""
+    layout = layout or TABLE_LAYOUTS.get(table_name)
+    optimize = f"OPTIMIZE {table_name}"
+    if layout and is_partitioned(layout, partitioned):
+        optimize += f" ZORDER BY ({', '.join(layout['cluster_by'])})"
+    return [optimize, f"ANALYZE TABLE {table_name} COMPUTE STATISTICS FOR ALL COLUMNS"]